@@ -5,20 +5,537 @@ UDP Image-Sending Module
 
 import cv2
 import socket
+import struct
+import threading
 import numpy as np
 import time
 
+from ar_system.mailbox import LatestValueMailbox
 
 
 
-# Each packet has a maximum size of 8,192 bytes == 8KB
-SAFE_CHUNK_SIZE=8192
+
+IP_UDP_HEADER_SIZE = 28  # 20字节IPv4头 + 8字节UDP头
+PACKET_HEADER_SIZE = 3   # 1字节类型 + 2字节包序号
+
+# Linux UDP generic segmentation offload: one sendmsg() carries many equal-size datagrams
+UDP_SEGMENT = getattr(socket, "UDP_SEGMENT", 103)
+UDP_MAX_SEGMENTS = 64
 
 # 协议设计如下：
 # b'\x01' - 开始包: [类型0x01 (1字节)] + [总包数 (2字节)]
 # b'\x02' - 结束包: [类型0x02 (1字节)]
 # b'\x00' - 数据包: [类型0x00 (1字节)] + [包序号 (2字节)] + [数据内容]
 
+# 协议v2：每个包都自带完整帧头，无开始/结束包，所有包等长（最后一个数据包补零）
+# [类型 (1字节): 0x10数据包 / 0x11校验包] + [帧ID (4字节)] + [采集时间戳us (8字节)]
+# + [包序号/校验组序号 (2字节)] + [数据包总数 (2字节)] + [帧字节数 (4字节)]
+# + [校验组大小 (1字节, 0表示无FEC)] + [内容类型 (1字节)] + [数据内容]
+# 校验包 g 是数据包 g*N ... g*N+N-1 的逐字节异或，每组可恢复任意一个丢失的数据包。
+V2_DATA = 0x10
+V2_PARITY = 0x11
+V2_HEADER = struct.Struct('>BIQHHIBB')
+KIND_JPEG = 0   # payload is one complete JPEG image
+KIND_TILES = 1  # payload is the changed tiles of the previous frame, see ar_system/tile_codec.py
+KIND_FOVEATED = 2  # payload is a gaze ROI + downscaled periphery, see ar_system/foveated_codec.py
+KIND_WEBP = 3   # payload is one complete WebP image
+KIND_RAW = 4    # payload is raw, optionally LZ4-compressed pixels, see ar_system/image_codecs.py
+
+
+def build_packets_v1(img_bytes, packet_size):
+    """Lay out every v1 data packet back to back in one buffer: [0x00][index][chunk]..."""
+    chunk_size = packet_size - PACKET_HEADER_SIZE
+    data = memoryview(img_bytes).cast('B')
+    size = len(data)
+    num_packets = (size + chunk_size - 1) // chunk_size
+    buf = bytearray(size + PACKET_HEADER_SIZE * num_packets)
+    for i in range(num_packets):
+        off = i * packet_size
+        chunk = data[i * chunk_size:(i + 1) * chunk_size]
+        buf[off + 1:off + 3] = i.to_bytes(2, 'big')  # buf[off] is already 0x00
+        buf[off + 3:off + 3 + len(chunk)] = chunk
+    return buf, num_packets
+
+
+def build_packets_v2(img_bytes, packet_size, frame_id, capture_ts_us, fec_group=0, kind=KIND_JPEG):
+    """
+    Lay out every v2 packet (data, then XOR parity) back to back, all exactly packet_size long
+    Args:
+        img_bytes (bytes-like): frame payload
+        packet_size (int): UDP payload size of every packet
+        frame_id (int): 32-bit frame sequence number
+        capture_ts_us (int): capture time of the frame in microseconds
+        fec_group (int): data packets per XOR parity packet, 0 disables FEC
+        kind (int): payload content type
+    Returns:
+        (bytearray, int): packet buffer, number of packets
+    """
+    chunk_size = packet_size - V2_HEADER.size
+    data = np.frombuffer(img_bytes, dtype=np.uint8)
+    size = len(data)
+    num_data = max(1, (size + chunk_size - 1) // chunk_size)
+    num_parity = (num_data + fec_group - 1) // fec_group if fec_group else 0
+    packets = np.zeros((num_data + num_parity, packet_size), dtype=np.uint8)
+
+    chunks = np.zeros((num_data, chunk_size), dtype=np.uint8)
+    chunks.reshape(-1)[:size] = data
+    packets[:num_data, V2_HEADER.size:] = chunks
+    if num_parity:
+        groups = np.zeros((num_parity * fec_group, chunk_size), dtype=np.uint8)
+        groups[:num_data] = chunks
+        packets[num_data:, V2_HEADER.size:] = np.bitwise_xor.reduce(
+            groups.reshape(num_parity, fec_group, chunk_size), axis=1)
+
+    buf = bytearray(packets.data)
+    for i in range(num_data + num_parity):
+        packet_type, index = (V2_DATA, i) if i < num_data else (V2_PARITY, i - num_data)
+        V2_HEADER.pack_into(buf, i * packet_size, packet_type, frame_id & 0xFFFFFFFF, capture_ts_us,
+                            index, num_data, size, fec_group, kind)
+    return buf, num_data + num_parity
+
+
+def encode_frame(image, quality, scale=1.0, codec=None, frame_encoder=None):
+    """
+    Downscale and encode one frame
+    Args:
+        image (np.array): BGR frame
+        quality (int): JPEG quality 0-100
+        scale (float): downscale factor applied first
+        codec: whole-frame codec (ar_system/image_codecs.py), cv2 JPEG if None
+        frame_encoder: TileDeltaEncoder / FoveatedEncoder, takes precedence over codec
+    Returns:
+        (bytes-like, int): payload and its content type, (None, None) on failure
+    """
+    if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if frame_encoder:
+        return frame_encoder.encode(image, quality)
+    if codec:
+        encoded = codec.encode(image, quality)
+        return (encoded, codec.kind) if encoded is not None else (None, None)
+    ok, encoded = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return (encoded, KIND_JPEG) if ok else (None, None)
+
+
+class TokenBucket:
+    def __init__(self, rate_bps, burst_bytes):
+        """
+        Token bucket pacer
+        Args:
+            rate_bps (float): sustained link rate in bits per second
+            burst_bytes (int): bytes that may be sent back to back without waiting
+        """
+        self.rate = rate_bps / 8.0  # bytes per second
+        self.burst = burst_bytes
+        self.tokens = float(burst_bytes)
+        self.last = time.perf_counter()
+        self.waited = 0.0  # total seconds spent sleeping, i.e. send-buffer pressure
+
+    def consume(self, n_bytes):
+        """Take n_bytes from the bucket, sleeping until enough tokens have accumulated"""
+        now = time.perf_counter()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= n_bytes
+        if self.tokens < 0:
+            wait = -self.tokens / self.rate
+            self.waited += wait
+            time.sleep(wait)
+
+
+class ImageSender:
+    def __init__(self, host, port, mtu=1500, rate_mbps=100.0, burst_bytes=64 * 1024,
+                 batch=False, jpeg_quality=10, controller=None, protocol=1, fec_group=0, frame_encoder=None,
+                 codec=None):
+        """
+        Persistent UDP image sender that owns one socket for the whole stream
+        Args:
+            host (str): 目标主机的IP地址 (例如HoloLens的IP)。
+            port (int): 目标主机的端口号。
+            mtu (int): link MTU, every datagram fits into one IP packet (no fragmentation)
+            rate_mbps (float): link rate used for pacing; None disables pacing
+            burst_bytes (int): bytes sent back to back before pacing kicks in
+            batch (bool): hand all data packets of a frame to the kernel in batches (Linux UDP GSO),
+                falls back to one sendto() per packet where unsupported
+            jpeg_quality (int): JPEG quality 0-100, used when no controller is given
+            controller (AdaptiveQualityController): picks quality and downscale factor per frame
+                from the measured encode time, frame size and pacing pressure
+            protocol (int): 1 = start/data/end packets (UDPImageReceiver.cs default),
+                2 = self-describing packets with frame ID, capture timestamp and optional FEC
+            fec_group (int): protocol 2 only, one XOR parity packet per fec_group data packets
+            frame_encoder (TileDeltaEncoder or FoveatedEncoder): protocol 2 only, replaces the plain
+                JPEG encoder, e.g. keyframes plus changed tiles or a gaze ROI plus a low-quality periphery
+            codec: whole-frame codec from ar_system/image_codecs.py (e.g. TurboJpegCodec), cv2 JPEG if None;
+                codecs other than JPEG need protocol 2, whose content type byte names the codec
+        """
+        if frame_encoder is not None and protocol != 2:
+            raise ValueError("frame_encoder requires protocol 2")
+        if codec is not None and codec.kind != KIND_JPEG and protocol != 2:
+            raise ValueError(f"codec {codec.name} requires protocol 2")
+        self.addr = (host, port)
+        self.jpeg_quality = jpeg_quality
+        self.packet_size = mtu - IP_UDP_HEADER_SIZE
+        self.protocol = protocol
+        self.fec_group = fec_group
+        self.frame_id = 0
+        self.batch = batch
+        self.controller = controller
+        self.frame_encoder = frame_encoder
+        self.codec = codec
+        self.pacer = TokenBucket(rate_mbps * 1e6, burst_bytes) if rate_mbps else None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        self.stats = {"frames": 0, "packets": 0, "bytes": 0, "encode_ms": 0.0, "send_ms": 0.0,
+                      "quality": jpeg_quality, "scale": 1.0}
+
+    def send_image(self, image_rgb, capture_ts_us=None):
+        """
+        Compress, segment, and transmit the image
+        Args:
+            image_rgb (np.array): 从cv2.imread()或Realsense获取的原始RGB图像 (NumPy array)。
+            capture_ts_us (int): capture time in microseconds (protocol 2), defaults to now
+        Returns:
+            bool: True if the frame was sent
+        """
+        quality, scale = self.controller.operating_point() if self.controller else (self.jpeg_quality, 1.0)
+        t0 = time.perf_counter()
+        img_encoded, kind = encode_frame(image_rgb, quality, scale, self.codec, self.frame_encoder)
+        if img_encoded is None:
+            print("图像编码失败！")
+            return False
+        t1 = time.perf_counter()
+        waited_before = self.pacer.waited if self.pacer else 0.0
+        sent = self.send_bytes(img_encoded, capture_ts_us, kind)
+        t2 = time.perf_counter()
+        self.stats.update(encode_ms=(t1 - t0) * 1000, send_ms=(t2 - t1) * 1000, quality=quality, scale=scale)
+        if self.controller and sent:
+            pace_wait_ms = ((self.pacer.waited if self.pacer else 0.0) - waited_before) * 1000
+            self.controller.update(self.stats["encode_ms"], len(img_encoded), self.stats["send_ms"], pace_wait_ms)
+        return sent
+
+    def send_bytes(self, img_bytes, capture_ts_us=None, kind=KIND_JPEG):
+        """
+        Segment and transmit an already encoded image
+        Args:
+            img_bytes (bytes-like): encoded image
+            capture_ts_us (int): capture time in microseconds (protocol 2), defaults to now
+            kind (int): payload content type (protocol 2)
+        Returns:
+            bool: True if the frame was sent
+        """
+        buf, num_packets = self.packetize(img_bytes, capture_ts_us, kind)
+        return self.send_packets(buf, num_packets)
+
+    def packetize(self, img_bytes, capture_ts_us=None, kind=KIND_JPEG):
+        """
+        Build the data packets of one frame with this sender's protocol, MTU and next frame ID
+        Returns:
+            (bytearray, int): packet buffer, number of packets
+        """
+        if self.protocol == 2:
+            if capture_ts_us is None:
+                capture_ts_us = time.monotonic_ns() // 1000
+            buf, num_packets = build_packets_v2(img_bytes, self.packet_size, self.frame_id,
+                                                capture_ts_us, self.fec_group, kind)
+            self.frame_id = (self.frame_id + 1) & 0xFFFFFFFF
+        else:
+            buf, num_packets = build_packets_v1(img_bytes, self.packet_size)
+        return buf, num_packets
+
+    def send_packets(self, buf, num_packets):
+        """
+        Transmit the packets of one frame, as built by packetize() of a sender with the same protocol and MTU
+        Returns:
+            bool: True if the frame was sent
+        """
+        if num_packets > 65535: # 2^16-1 = 65535
+            print("错误：图像太大，分割后的包数超过65535！")
+            return False
+        try:
+            if self.protocol != 2:
+                self._send(b'\x01' + num_packets.to_bytes(2, 'big'))
+            view = memoryview(buf)
+            if self.batch:
+                self._send_batched(view, num_packets)
+            else:
+                for i in range(num_packets):
+                    self._send(view[i * self.packet_size:(i + 1) * self.packet_size])
+            if self.protocol != 2:
+                self._send(b'\x02')
+        except OSError as e:
+            print(f"发送图像时发生错误: {e}")
+            return False
+        self.stats["frames"] += 1
+        self.stats["packets"] += num_packets + (0 if self.protocol == 2 else 2)
+        self.stats["bytes"] += len(buf) + (0 if self.protocol == 2 else 4)
+        return True
+
+    def request_keyframe(self):
+        """Ask the frame encoder for a full frame, e.g. when the receiver lost a delta frame"""
+        if self.frame_encoder:
+            self.frame_encoder.request_keyframe()
+
+    def _send(self, packet):
+        if self.pacer:
+            self.pacer.consume(len(packet) + IP_UDP_HEADER_SIZE)
+        self.sock.sendto(packet, self.addr)
+
+    def _send_batched(self, view, num_packets):
+        segments = min(UDP_MAX_SEGMENTS, 65000 // self.packet_size)
+        gso_size = [(socket.SOL_UDP, UDP_SEGMENT, struct.pack('H', self.packet_size))]
+        for first in range(0, num_packets, segments):
+            batch = view[first * self.packet_size:(first + segments) * self.packet_size]
+            if self.pacer:
+                self.pacer.consume(len(batch) + IP_UDP_HEADER_SIZE * segments)
+            try:
+                self.sock.sendmsg([batch], gso_size, 0, self.addr)
+            except OSError:
+                # No UDP GSO on this platform: fall back to one datagram per packet for good
+                print("[INFO] 系统不支持UDP批量发送，改为逐包发送。")
+                self.batch = False
+                for i in range(first, num_packets):
+                    self._send(view[i * self.packet_size:(i + 1) * self.packet_size])
+                return
+
+    def close(self):
+        self.sock.close()
+
+
+class AsyncImageSender:
+    def __init__(self, sender):
+        """
+        Runs JPEG encoding and sending of an ImageSender on a background worker
+        Args:
+            sender (ImageSender or FanoutImageSender): the sender used by the worker thread
+        """
+        self.sender = sender
+        # latest frame wins: a frame the worker has not picked up yet is replaced, never queued
+        self.mailbox = LatestValueMailbox()
+        self.is_running = True
+        self.frames_sent = 0
+        self.worker = threading.Thread(target=self._worker_loop, name="image-sender")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def submit(self, image, copy=True, capture_ts_us=None):
+        """
+        Hand a frame to the worker and return immediately
+        Args:
+            image (np.array): frame to send
+            copy (bool): copy the frame first; pass False only if the caller never modifies
+                the array afterwards (RealSense buffers are recycled and frames are drawn on)
+            capture_ts_us (int): capture time in microseconds, defaults to the time of submit()
+        Returns:
+            bool: True if an older frame that was not sent yet has been dropped
+        """
+        if capture_ts_us is None:
+            capture_ts_us = time.monotonic_ns() // 1000
+        return self.mailbox.put((image.copy() if copy else image, capture_ts_us))
+
+    @property
+    def frames_dropped(self):
+        return self.mailbox.overwritten
+
+    def _worker_loop(self):
+        while self.is_running:
+            item = self.mailbox.get(timeout=0.5)
+            if item is None:
+                continue
+            image, capture_ts_us = item
+            try:
+                if self.sender.send_image(image, capture_ts_us):
+                    self.frames_sent += 1
+            except Exception as e:
+                print(f"发送图像时发生错误: {e}")
+
+    def close(self):
+        """Stop the worker and close the underlying sender"""
+        self.is_running = False
+        self.mailbox.close()
+        self.worker.join()
+        self.sender.close()
+
+
+class _FanoutSubscriber:
+    def __init__(self, sender, tier):
+        """
+        One receiver of a FanoutImageSender: its own socket, pacer and send thread
+        Args:
+            sender (ImageSender): sends the packets to this receiver
+            tier (str): quality tier the receiver gets
+        """
+        self.sender = sender
+        self.tier = tier
+        self.last_waited = 0.0
+        # latest frame wins: a receiver that cannot keep up skips frames instead of delaying the others
+        self.mailbox = LatestValueMailbox()
+        self.is_running = True
+        self.thread = threading.Thread(target=self._send_loop, name=f"image-fanout-{sender.addr[0]}:{sender.addr[1]}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _send_loop(self):
+        while self.is_running:
+            item = self.mailbox.get(timeout=0.5)
+            if item is None:
+                continue
+            self.sender.send_packets(*item)
+
+    def pace_wait(self):
+        """Seconds this receiver's pacer has waited since the last call"""
+        waited = self.sender.pacer.waited if self.sender.pacer else 0.0
+        delta, self.last_waited = waited - self.last_waited, waited
+        return delta
+
+    def close(self):
+        self.is_running = False
+        self.mailbox.close()
+        self.thread.join()
+        self.sender.close()
+
+
+class FanoutImageSender:
+    def __init__(self, mtu=1500, protocol=2, fec_group=0, batch=False):
+        """
+        Encode every frame once per quality tier and send it to any number of receivers
+        Args:
+            mtu (int): link MTU of all receivers
+            protocol (int): packet protocol of all receivers, see ImageSender
+            fec_group (int): protocol 2 only, one XOR parity packet per fec_group data packets
+            batch (bool): send with Linux UDP GSO where available
+        """
+        self.mtu = mtu
+        self.packet_size = mtu - IP_UDP_HEADER_SIZE
+        self.protocol = protocol
+        self.fec_group = fec_group
+        self.batch = batch
+        self.lock = threading.Lock()
+        self.tiers = {}
+        self.subscribers = {}  # (host, port) -> _FanoutSubscriber
+        self.stats = {"frames": 0, "encodes": 0, "encode_ms": 0.0}
+
+    def add_tier(self, name, quality=50, scale=1.0, codec=None, frame_encoder=None, controller=None):
+        """
+        Define how the receivers of one tier get their frames
+        Args:
+            name (str): tier name used by subscribe()
+            quality (int): JPEG quality, used when no controller is given
+            scale (float): downscale factor, used when no controller is given
+            codec: whole-frame codec (ar_system/image_codecs.py), cv2 JPEG if None
+            frame_encoder: TileDeltaEncoder / FoveatedEncoder of this tier (protocol 2); a receiver that
+                skips frames is repaired by the encoder's tile refresh and keyframes
+            controller (AdaptiveQualityController): adapts quality and scale to the encode time,
+                frame size and the pacing pressure of the slowest receiver in the tier
+        """
+        if self.protocol != 2 and (frame_encoder is not None or (codec is not None and codec.kind != KIND_JPEG)):
+            raise ValueError("frame_encoder and non-JPEG codecs require protocol 2")
+        with self.lock:
+            self.tiers[name] = {"quality": quality, "scale": scale, "codec": codec,
+                                "frame_encoder": frame_encoder, "controller": controller, "frame_id": 0}
+
+    def subscribe(self, host, port, tier, rate_mbps=100.0, burst_bytes=64 * 1024):
+        """
+        Add a receiver, may be called at any time from any thread
+        Args:
+            host (str): 接收端的IP地址
+            port (int): 接收端的端口号
+            tier (str): a tier defined with add_tier()
+            rate_mbps (float): link rate to this receiver used for pacing; None disables pacing
+            burst_bytes (int): bytes sent back to back before pacing kicks in
+        """
+        if tier not in self.tiers:
+            raise ValueError(f"unknown tier '{tier}'")
+        sender = ImageSender(host, port, mtu=self.mtu, rate_mbps=rate_mbps, burst_bytes=burst_bytes,
+                             batch=self.batch, protocol=self.protocol, fec_group=self.fec_group)
+        with self.lock:
+            old = self.subscribers.pop((host, port), None)
+            self.subscribers[(host, port)] = _FanoutSubscriber(sender, tier)
+        if old:
+            old.close()
+        print(f"[INFO] 视频流新增接收端 {host}:{port} ({tier})")
+
+    def unsubscribe(self, host, port):
+        """
+        Remove a receiver
+        Returns:
+            bool: False if it was not subscribed
+        """
+        with self.lock:
+            subscriber = self.subscribers.pop((host, port), None)
+        if subscriber is None:
+            return False
+        subscriber.close()
+        print(f"[INFO] 视频流移除接收端 {host}:{port}")
+        return True
+
+    def subscriber_stats(self):
+        """Per receiver: tier, frames and bytes sent, frames skipped because it could not keep up"""
+        with self.lock:
+            subscribers = dict(self.subscribers)
+        return {f"{host}:{port}": {"tier": s.tier, "frames": s.sender.stats["frames"], "bytes": s.sender.stats["bytes"],
+                                   "skipped": s.mailbox.overwritten}
+                for (host, port), s in subscribers.items()}
+
+    def send_image(self, image_rgb, capture_ts_us=None):
+        """
+        Encode the frame once for every tier that has receivers and hand the packets to their send threads
+        Args:
+            image_rgb (np.array): BGR frame
+            capture_ts_us (int): capture time in microseconds (protocol 2), defaults to now
+        Returns:
+            bool: True if at least one receiver got the frame
+        """
+        if capture_ts_us is None:
+            capture_ts_us = time.monotonic_ns() // 1000
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        by_tier = {}
+        for subscriber in subscribers:
+            by_tier.setdefault(subscriber.tier, []).append(subscriber)
+        sent = False
+        for name, tier_subscribers in by_tier.items():
+            packets = self._encode_tier(self.tiers[name], image_rgb, capture_ts_us, tier_subscribers)
+            if packets is None:
+                continue
+            for subscriber in tier_subscribers:
+                subscriber.mailbox.put(packets)
+            sent = True
+        self.stats["frames"] += sent
+        return sent
+
+    def _encode_tier(self, tier, image_rgb, capture_ts_us, subscribers):
+        controller = tier["controller"]
+        quality, scale = controller.operating_point() if controller else (tier["quality"], tier["scale"])
+        t0 = time.perf_counter()
+        payload, kind = encode_frame(image_rgb, quality, scale, tier["codec"], tier["frame_encoder"])
+        if payload is None:
+            print("图像编码失败！")
+            return None
+        encode_ms = (time.perf_counter() - t0) * 1000
+        if self.protocol == 2:
+            packets = build_packets_v2(payload, self.packet_size, tier["frame_id"], capture_ts_us, self.fec_group, kind)
+            tier["frame_id"] = (tier["frame_id"] + 1) & 0xFFFFFFFF
+        else:
+            packets = build_packets_v1(payload, self.packet_size)
+        self.stats["encodes"] += 1
+        self.stats["encode_ms"] = encode_ms
+        if controller:
+            pace_wait_ms = max(s.pace_wait() for s in subscribers) * 1000
+            controller.update(encode_ms, len(payload), 0.0, pace_wait_ms)
+        return packets
+
+    def close(self):
+        """Stop all send threads and close their sockets"""
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+
+
+# One persistent sender per destination for the function interface below
+_senders = {}
+
 def send_image(image_rgb, host, port):
     """
     Compress, segment, and transmit the image
@@ -28,58 +545,10 @@ def send_image(image_rgb, host, port):
         host (str): 目标主机的IP地址 (例如 '192.168.1.100' 或 HoloLens的IP)。
         port (int): 目标主机的端口号。
     """
-
-    # Creating the socket inside the function guarantees a fresh intance on every call
-    # eliminating interference from any previously unclosed sockets
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock: # UDP
-        try:
-            # 1. Compress Image
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 10]
-            _, img_encoded = cv2.imencode('.jpg', image_rgb, encode_param)
-            
-            # 从一个装着字节的NumPy容器对象中，提取出纯粹的字节序列
-            img_bytes = img_encoded.tobytes()
-            
-            # 2. Data segment
-            size = len(img_bytes)
-            max_data_size = SAFE_CHUNK_SIZE - 3 # 减去1字节标志+两个字节的包序号
-            num_packets = (size + max_data_size - 1) // max_data_size
-
-                        
-            if num_packets > 65535: # 2^16-1 = 65535 
-                print("错误：图像太大，分割后的包数超过65535！")
-                return
-
-            # 发送一个“开始”信号，包含总包数
-            # 格式: b'\x01' (开始标志) + [包总数 (2字节)]
-            start_packet = b'\x01' + num_packets.to_bytes(2, 'big') # 大端字节序列
-            sock.sendto(start_packet, (host, port))
-            
-            # 循环发送每一个数据块
-            for i in range(num_packets):
-                start = i * max_data_size
-                end = start + max_data_size
-                
-                # [0x00 数据标志(1字节)] + [包序号 (2字节)] + [数据内容]
-                packet = b'\x00' +  i.to_bytes(2, 'big') + img_bytes[start:end]
-                
-                # 发送数据
-                sock.sendto(packet, (host, port))
-                # 短暂延时，防止接收端缓冲区溢出，这里很重要！！！
-                time.sleep(0.0001) 
-
-            # 发送一个“结束”信号
-            # 格式: b'\x02' (结束标志)
-            end_packet = b'\x02'
-            sock.sendto(end_packet, (host, port))
-
-            # print(f"图像已发送，大小: {size} 字节, 分为 {num_packets} 个包。")
-
-        except Exception as e:
-            print(f"发送图像时发生错误: {e}")
-        finally:
-            # 关闭socket
-            sock.close()
+    sender = _senders.get((host, port))
+    if sender is None:
+        sender = _senders[(host, port)] = ImageSender(host, port)
+    sender.send_image(image_rgb)
 
 
 if __name__ == '__main__':
@@ -94,10 +563,11 @@ if __name__ == '__main__':
             test_image = np.zeros((480, 640, 3), dtype=np.uint8)
 
         print(f"开始向 {HOLOLENS_IP}:{UDP_PORT} 发送图像...")
+        sender = ImageSender(HOLOLENS_IP, UDP_PORT)
         
         # Simulate a video stream and transmit continuosuly
         while True:
-            send_image(test_image, HOLOLENS_IP, UDP_PORT)
+            sender.send_image(test_image)
             # Control the transmission frame rate , 30fps
             time.sleep(1/30) 
 
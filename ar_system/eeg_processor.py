@@ -9,10 +9,22 @@ EEG Processor Module
 
 import time
 import numpy as np
-from scipy import signal
-from scipy.integrate import simps
 from neuracle_lib.dataServer import DataServerThread
 
+# scipy is imported lazily by _load_dsp(): it is only needed once a focus score
+# is actually computed, so importing this module stays cheap.
+signal = None
+simps = None
+
+
+def _load_dsp():
+    """Import the scipy signal-processing functions on first use."""
+    global signal, simps
+    if signal is None:
+        from scipy import signal as _signal
+        from scipy.integrate import simps as _simps
+        signal, simps = _signal, _simps
+
 class EEGProcessor:
     def __init__(self, srate=500, n_chan=9, t_buffer=15):
         """
@@ -47,6 +59,8 @@ class EEGProcessor:
         """
         print(f"[EEG] 正在连接到 {ip}:{port}...")
         try:
+            # Load scipy here rather than inside the first get_focus_score() call
+            _load_dsp()
             self.data_server = DataServerThread(device='Neuracle', n_chan=self.n_chan,
                                                 srate=self.srate, t_buffer=self.t_buffer)
             if self.data_server.connect(hostname=ip, port=port):
@@ -73,6 +87,7 @@ class EEGProcessor:
         if not self.is_connected:
             return 0.5  # Return a neutral default value if not connected
 
+        _load_dsp()
         eeg_data = self.data_server.GetBufferData()
         
         # Ensure sufficient data for analysis
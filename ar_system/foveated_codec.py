@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Gaze-foveated encoding for the UDP image stream (protocol v2 only)
+
+The user only sees detail where they are looking: the encoder sends a region of
+interest around the latest gaze point at high JPEG quality and the rest of the frame
+downscaled at the normal quality. The receiver stretches the periphery back to full
+size and lays the ROI on top of it.
+
+Payload of a KIND_FOVEATED frame, big endian:
+    [宽 (2字节)] + [高 (2字节)] + [ROI x (2字节)] + [ROI y (2字节)] + [ROI宽 (2字节)] + [ROI高 (2字节)]
+    + [外围JPEG字节数 (4字节)] + [外围JPEG, 缩小后的整帧] + [ROI JPEG, 原分辨率]
+"""
+
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from ar_system.Img_sender import KIND_JPEG, KIND_FOVEATED
+from ar_system.image_codecs import OpenCVJpegCodec
+
+FOVEA_HEADER = struct.Struct('>HHHHHHI')
+ROI_ALIGN = 16  # ROI corners on JPEG macroblock (and periphery pixel) boundaries
+
+
+class FoveatedEncoder:
+    def __init__(self, roi_fraction=0.35, periphery_scale=0.5, roi_quality_boost=30, max_quality=95,
+                 gaze_timeout=0.5, fallback=None, codec=None):
+        """
+        Args:
+            roi_fraction (float): ROI width and height as a fraction of the frame's
+            periphery_scale (float): downscale factor of the periphery layer
+            roi_quality_boost (int): ROI JPEG quality above the quality asked for, the periphery uses that quality
+            max_quality (int): upper bound of the ROI quality
+            gaze_timeout (float): seconds after the last gaze sample until the gaze counts as unknown
+            fallback (TileDeltaEncoder): encoder used while the gaze is unknown, plain JPEG if None
+            codec: JPEG codec for both layers (image_codecs), OpenCVJpegCodec if None
+        """
+        codec = codec or OpenCVJpegCodec()
+        if codec.kind != KIND_JPEG:
+            raise ValueError("foveated layers must be JPEG encoded")
+        self.codec = codec
+        self.roi_fraction = roi_fraction
+        self.periphery_scale = periphery_scale
+        self.roi_quality_boost = roi_quality_boost
+        self.max_quality = max_quality
+        self.gaze_timeout = gaze_timeout
+        self.fallback = fallback
+        self.gaze = None  # (x, y, time.monotonic()) in normalized image coordinates
+        self.foveated = False
+        self.stats = {"foveated_frames": 0, "roi_bytes": 0, "periphery_bytes": 0}
+
+    def set_gaze(self, x, y):
+        """
+        Latest gaze point, may be called from any thread
+        Args:
+            x, y (float): gaze position normalized to 0..1 of the frame width / height
+        """
+        if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0:
+            self.gaze = (x, y, time.monotonic())
+
+    def request_keyframe(self):
+        """Forwarded to the fallback encoder"""
+        if self.fallback:
+            self.fallback.request_keyframe()
+
+    def roi(self, width, height):
+        """ROI (x, y, w, h) in pixels for the current gaze point, None if the gaze is unknown"""
+        gaze = self.gaze
+        if gaze is None or time.monotonic() - gaze[2] > self.gaze_timeout:
+            return None
+        rw = max(ROI_ALIGN, int(width * self.roi_fraction) // ROI_ALIGN * ROI_ALIGN)
+        rh = max(ROI_ALIGN, int(height * self.roi_fraction) // ROI_ALIGN * ROI_ALIGN)
+        x = int(gaze[0] * width - rw / 2) // ROI_ALIGN * ROI_ALIGN
+        y = int(gaze[1] * height - rh / 2) // ROI_ALIGN * ROI_ALIGN
+        x = min(max(0, x), width - rw)
+        y = min(max(0, y), height - rh)
+        return x, y, min(rw, width), min(rh, height)
+
+    def encode(self, image, quality):
+        """
+        Encode one frame as ROI + periphery layers around the gaze point
+        Args:
+            image (np.array): BGR frame
+            quality (int): JPEG quality of the periphery, the ROI gets roi_quality_boost more
+        Returns:
+            (bytes-like, int): payload and its content type, (None, None) on failure
+        """
+        h, w = image.shape[:2]
+        roi = self.roi(w, h)
+        if roi is None:
+            if self.foveated:
+                # The receiver shows a composite now, tiles cannot be pasted onto it
+                self.foveated = False
+                self.request_keyframe()
+            if self.fallback:
+                return self.fallback.encode(image, quality)
+            encoded = self.codec.encode(image, quality)
+            return (encoded, KIND_JPEG) if encoded is not None else (None, None)
+
+        x, y, rw, rh = roi
+        periphery = cv2.resize(image, None, fx=self.periphery_scale, fy=self.periphery_scale,
+                               interpolation=cv2.INTER_AREA)
+        periphery_jpg = self.codec.encode(periphery, quality)
+        roi_quality = min(self.max_quality, quality + self.roi_quality_boost)
+        roi_jpg = self.codec.encode(image[y:y + rh, x:x + rw], roi_quality)
+        if periphery_jpg is None or roi_jpg is None:
+            return None, None
+        self.foveated = True
+        self.stats["foveated_frames"] += 1
+        self.stats["roi_bytes"] = len(roi_jpg)
+        self.stats["periphery_bytes"] = len(periphery_jpg)
+        header = FOVEA_HEADER.pack(w, h, x, y, rw, rh, len(periphery_jpg))
+        return b"".join((header, periphery_jpg, roi_jpg)), KIND_FOVEATED
+
+
+def composite_foveated(payload):
+    """
+    Decode a KIND_FOVEATED payload into one full-size image (Python reference of UDPImageReceiver.cs)
+    Returns:
+        np.array: composite image, None if a layer could not be decoded
+    """
+    data = memoryview(payload)
+    w, h, x, y, rw, rh, periphery_len = FOVEA_HEADER.unpack_from(data)
+    off = FOVEA_HEADER.size
+    periphery = cv2.imdecode(np.frombuffer(data[off:off + periphery_len], np.uint8), cv2.IMREAD_COLOR)
+    roi = cv2.imdecode(np.frombuffer(data[off + periphery_len:], np.uint8), cv2.IMREAD_COLOR)
+    if periphery is None or roi is None:
+        return None
+    image = cv2.resize(periphery, (w, h), interpolation=cv2.INTER_LINEAR)
+    image[y:y + rh, x:x + rw] = roi
+    return image
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Pipelined capture and inference stages for the interaction loop
+
+    RealSenseCapture --frames--> InferenceWorker --results--> render stage (caller's thread)
+
+Each stage runs on its own thread and hands over through a LatestValueMailbox, so the
+loop runs at the rate of its slowest stage instead of the sum of all stage times, and a
+slow stage skips stale frames instead of queueing them: end-to-end latency stays within
+about one capture interval plus one pass through each stage. Every frame carries a
+frame ID and its capture timestamp through the stages.
+
+The capture stage copies every frame out of the RealSense buffer once and marks the copy
+read-only; all stages and the sender share it, a stage that draws works on its own copy.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from ar_system.mailbox import LatestValueMailbox
+
+# image: read-only BGR frame shared by all stages; capture_ts_us: sensor time on the time.monotonic() clock
+CapturedFrame = namedtuple("CapturedFrame", ["frame_id", "capture_ts_us", "image"])
+# detections: whatever the inference function returned for frame
+InferenceResult = namedtuple("InferenceResult", ["frame", "detections", "infer_ms"])
+
+
+class RealSenseCapture:
+    def __init__(self, pipeline, on_frame=None, poll_interval=0.001):
+        """
+        Capture stage: polls the RealSense pipeline without blocking on a frame
+        Args:
+            pipeline (rs.pipeline): started RealSense pipeline; nothing else may read it while running
+            on_frame (function): called as on_frame(CapturedFrame) on the capture thread for every
+                frame, e.g. to stream the clean video at the camera rate; it may keep the image
+                without copying it, nothing writes to it
+            poll_interval (float): sleep between polls that returned no frame
+        """
+        self.pipeline = pipeline
+        self.on_frame = on_frame
+        self.poll_interval = poll_interval
+        self.frames = LatestValueMailbox()
+        self.frame_id = 0
+        self.is_running = False
+        self.thread = None
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        self.thread.start()
+        return self
+
+    def _capture_loop(self):
+        while self.is_running:
+            frames = self.pipeline.poll_for_frames()
+            color_frame = frames.get_color_frame() if frames else None
+            if not color_frame:
+                time.sleep(self.poll_interval)
+                continue
+            capture_ts_us = self._capture_ts_us(color_frame)
+            # RealSense recycles its frame buffers, the stages keep the image longer
+            image = np.asanyarray(color_frame.get_data()).copy()
+            image.flags.writeable = False
+            self.frame_id += 1
+            frame = CapturedFrame(self.frame_id, capture_ts_us, image)
+            if self.on_frame:
+                self.on_frame(frame)
+            self.frames.put(frame)
+
+    @staticmethod
+    def _capture_ts_us(color_frame, max_age_s=1.0):
+        """
+        Sensor capture time of a frame on the time.monotonic() clock
+        Args:
+            color_frame (rs.frame): frame whose get_timestamp() is in ms of the host system clock
+                (global_time / system_time domain, the default for D400 cameras)
+            max_age_s (float): an older or future timestamp means another domain (hardware_clock)
+        Returns:
+            int: capture time in microseconds, the time the frame was picked up if its
+                timestamp cannot be mapped
+        """
+        now_us = time.monotonic_ns() // 1000
+        age_us = time.time_ns() // 1000 - int(color_frame.get_timestamp() * 1000)
+        if 0 <= age_us <= max_age_s * 1e6:
+            return now_us - age_us
+        return now_us
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+        self.frames.close()
+
+
+class InferenceWorker:
+    def __init__(self, infer, frames):
+        """
+        Inference stage: runs infer() on the newest captured frame, frames that arrive
+        meanwhile are skipped
+        Args:
+            infer (function): infer(image) -> detections
+            frames (LatestValueMailbox): CapturedFrame source, e.g. RealSenseCapture.frames
+        """
+        self.infer = infer
+        self.frames = frames
+        self.results = LatestValueMailbox()
+        self.infer_ms = deque(maxlen=300)
+        self.is_running = False
+        self.thread = None
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self._inference_loop, name="inference", daemon=True)
+        self.thread.start()
+        return self
+
+    def _inference_loop(self):
+        while self.is_running:
+            frame = self.frames.get(timeout=0.5)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            try:
+                detections = self.infer(frame.image)
+            except Exception as e:
+                print(f"[ERROR] 推理失败: {e}")
+                continue
+            infer_ms = (time.perf_counter() - start) * 1000
+            self.infer_ms.append(infer_ms)
+            self.results.put(InferenceResult(frame, detections, infer_ms))
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+        self.results.close()
+
+
+class PipelineStats:
+    def __init__(self, maxlen=300):
+        """Per-frame timings of the render stage, summarised by report()"""
+        self.latency_ms = deque(maxlen=maxlen)
+        self.render_ms = deque(maxlen=maxlen)
+        self.rendered = 0
+        self.start = time.perf_counter()
+
+    def add(self, capture_ts_us, render_start):
+        """
+        Args:
+            capture_ts_us (int): capture time of the rendered frame
+            render_start (float): time.perf_counter() when the render stage got the frame
+        """
+        self.rendered += 1
+        self.render_ms.append((time.perf_counter() - render_start) * 1000)
+        self.latency_ms.append((time.monotonic_ns() // 1000 - capture_ts_us) / 1000.0)
+
+    def report(self, capture, inference):
+        """
+        Returns:
+            dict: captured / rendered fps, frames skipped between the stages, median
+                inference and render times and capture-to-render latency percentiles
+        """
+        elapsed = max(time.perf_counter() - self.start, 1e-6)
+        latency = np.percentile(self.latency_ms, [50, 90, 99]).round(1).tolist() if self.latency_ms else None
+        return {
+            "capture_fps": round(capture.frame_id / elapsed, 1),
+            "render_fps": round(self.rendered / elapsed, 1),
+            "skipped_before_inference": capture.frames.overwritten,
+            "skipped_before_render": inference.results.overwritten,
+            "infer_ms": round(float(np.median(inference.infer_ms)), 1) if inference.infer_ms else None,
+            "render_ms": round(float(np.median(self.render_ms)), 1) if self.render_ms else None,
+            "latency_ms_p50_p90_p99": latency,
+        }
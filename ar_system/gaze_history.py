@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Timestamped gaze history
+
+Gaze samples are kept in fixed-capacity NumPy ring buffers (time in the PC's monotonic
+clock, x, y in video pixels), so a frame can be hit-tested with the gaze point at the
+moment it was captured instead of the newest one, and fixations can be detected over
+the samples up to that moment without per-sample Python loops. A stalled gaze stream
+gives no gaze point rather than the last one.
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# x, y: centroid in video pixels; duration_us: time from the first to the last sample of the fixation
+Fixation = namedtuple("Fixation", ["x", "y", "duration_us", "samples"])
+
+
+class GazeHistory:
+    def __init__(self, capacity=512, max_age_us=200000):
+        """
+        Args:
+            capacity (int): samples kept, ~4 s at 120 Hz for the default
+            max_age_us (float): a query more than this past the newest sample finds no gaze
+        """
+        self.capacity = capacity
+        self.max_age_us = max_age_us
+        self.t = np.zeros(capacity, dtype=np.float64)  # microseconds, PC monotonic clock
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.head = 0   # next write position
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def push(self, t_us, x, y):
+        """
+        Append one sample, may be called from the TCP receive thread
+        Args:
+            t_us (float): sample time in the PC's monotonic clock (GazeSample.pc_time_us)
+            x, y (float): gaze position in video pixels
+        """
+        with self._lock:
+            if self.count:
+                # keep the timeline sorted when the clock offset estimate moves backwards
+                t_us = max(t_us, self.t[self.head - 1])
+            self.t[self.head] = t_us
+            self.x[self.head] = x
+            self.y[self.head] = y
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def push_sample(self, sample):
+        """Append a tcp_manager.GazeSample"""
+        self.push(sample.pc_time_us, sample.x, sample.y)
+
+    def last(self, n=None):
+        """
+        The newest n samples in chronological order (copies)
+        Returns:
+            (np.array, np.array, np.array): t, x, y
+        """
+        with self._lock:
+            n = self.count if n is None else min(n, self.count)
+            idx = (self.head - n + np.arange(n)) % self.capacity
+            return self.t[idx], self.x[idx], self.y[idx]
+
+    def at(self, t_us):
+        """
+        Gaze point at time t_us, linearly interpolated between the samples around it;
+        clamped to the oldest sample before the history and to the newest one for up
+        to max_age_us after it
+        Args:
+            t_us (float): e.g. the capture time of a video frame, PC monotonic clock
+        Returns:
+            (float, float): x, y in video pixels, None if the history is empty or the
+                newest sample is more than max_age_us older than t_us (stalled stream)
+        """
+        t, x, y = self.last()
+        if not len(t) or t_us - t[-1] > self.max_age_us:
+            return None
+        return float(np.interp(t_us, t, x)), float(np.interp(t_us, t, y))
+
+    def fixation(self, n=30, max_dispersion=30.0, min_duration_us=100000, t_us=None):
+        """
+        Dispersion-threshold (I-DT) fixation detection over the last n samples up to t_us:
+        the longest run of samples ending there whose bounding box (width + height) stays
+        within max_dispersion is a fixation if it lasts at least min_duration_us
+        Args:
+            n (int): samples to look back
+            max_dispersion (float): pixels
+            min_duration_us (float): minimum fixation duration
+            t_us (float): e.g. the capture time of a video frame, None for the newest sample
+        Returns:
+            Fixation: None if the user is not fixating, or no sample is within max_age_us before t_us
+        """
+        t, x, y = self.last()
+        end = len(t) if t_us is None else int(np.searchsorted(t, t_us, side="right"))
+        if end < 2 or (t_us is not None and t_us - t[end - 1] > self.max_age_us):
+            return None
+        t, x, y = t[max(0, end - n):end], x[max(0, end - n):end], y[max(0, end - n):end]
+        # running bounding box from the newest sample backwards
+        x, y = x[::-1], y[::-1]
+        dispersion = (np.maximum.accumulate(x) - np.minimum.accumulate(x)
+                      + np.maximum.accumulate(y) - np.minimum.accumulate(y))
+        # dispersion never shrinks, so the run ends at the first sample over the threshold
+        k = int(np.searchsorted(dispersion, max_dispersion, side="right"))
+        if k < 2:
+            return None
+        duration = t[-1] - t[-k]
+        if duration < min_duration_us:
+            return None
+        return Fixation(float(x[:k].mean()), float(y[:k].mean()), float(duration), k)
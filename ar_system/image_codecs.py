@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Image codecs for the UDP image stream
+
+Every codec encodes a BGR frame into one payload and names it with the protocol v2
+content type byte (Img_sender.KIND_*), so the receiver knows how to decode it:
+- OpenCVJpegCodec: cv2.imencode('.jpg'), always available
+- TurboJpegCodec: libjpeg-turbo through PyTurboJPEG (optional), same JPEG bytes on the wire
+- WebPCodec: cv2.imencode('.webp'), smaller frames; the Python receiver decodes it,
+  Unity's Texture2D.LoadImage does not
+- RawCodec: uncompressed or LZ4-compressed (optional lz4 package) pixels for loopback tests
+
+Payload of a KIND_RAW frame, big endian:
+    [宽 (2字节)] + [高 (2字节)] + [通道数 (1字节)] + [压缩 (1字节): 0无 / 1 LZ4] + [像素数据]
+
+Use tests/bench_codecs.py to pick the fastest codec for a machine.
+"""
+
+import struct
+
+import cv2
+import numpy as np
+
+from ar_system.Img_sender import KIND_JPEG, KIND_WEBP, KIND_RAW
+
+RAW_HEADER = struct.Struct('>HHBB')
+RAW_NONE = 0
+RAW_LZ4 = 1
+
+
+class OpenCVJpegCodec:
+    name = "jpeg"
+    kind = KIND_JPEG
+
+    def encode(self, image, quality):
+        """
+        Args:
+            image (np.array): BGR frame
+            quality (int): 0-100
+        Returns:
+            bytes-like: encoded frame, None on failure
+        """
+        ok, encoded = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return encoded if ok else None
+
+    def decode(self, data):
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class TurboJpegCodec:
+    name = "turbojpeg"
+    kind = KIND_JPEG
+
+    def __init__(self, lib_path=None):
+        """
+        Args:
+            lib_path (str): path of the libjpeg-turbo shared library, None searches the default locations
+        Raises:
+            ImportError: PyTurboJPEG is not installed
+            RuntimeError: libjpeg-turbo could not be loaded
+        """
+        import turbojpeg
+        try:
+            self.jpeg = turbojpeg.TurboJPEG(lib_path)
+        except OSError as e:
+            raise RuntimeError(f"无法加载libjpeg-turbo: {e}")
+        self.pixel_format = turbojpeg.TJPF_BGR
+        self.subsample = turbojpeg.TJSAMP_420
+
+    def encode(self, image, quality):
+        return self.jpeg.encode(np.ascontiguousarray(image), quality=quality,
+                                pixel_format=self.pixel_format, jpeg_subsample=self.subsample)
+
+    def decode(self, data):
+        return self.jpeg.decode(bytes(data), pixel_format=self.pixel_format)
+
+
+class WebPCodec:
+    name = "webp"
+    kind = KIND_WEBP
+
+    def encode(self, image, quality):
+        ok, encoded = cv2.imencode('.webp', image, [int(cv2.IMWRITE_WEBP_QUALITY), max(1, quality)])
+        return encoded if ok else None
+
+    def decode(self, data):
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class RawCodec:
+    name = "raw"
+    kind = KIND_RAW
+
+    def __init__(self, compress=True):
+        """
+        Args:
+            compress (bool): LZ4-compress the pixels if the lz4 package is installed
+        """
+        self.lz4 = None
+        if compress:
+            try:
+                import lz4.block
+                self.lz4 = lz4.block
+            except ImportError:
+                print("[INFO] 未安装lz4，原始图像将不压缩发送。")
+        if self.lz4:
+            self.name = "raw+lz4"
+
+    def encode(self, image, quality=None):
+        """quality is ignored, the pixels are sent losslessly"""
+        h, w = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        pixels = np.ascontiguousarray(image).data
+        if self.lz4:
+            return RAW_HEADER.pack(w, h, channels, RAW_LZ4) + self.lz4.compress(pixels, store_size=False)
+        return RAW_HEADER.pack(w, h, channels, RAW_NONE) + bytes(pixels)
+
+    def decode(self, data):
+        data = memoryview(data)
+        w, h, channels, compression = RAW_HEADER.unpack_from(data)
+        pixels = data[RAW_HEADER.size:]
+        if compression == RAW_LZ4:
+            if self.lz4 is None:
+                import lz4.block
+                self.lz4 = lz4.block
+            pixels = self.lz4.decompress(pixels, uncompressed_size=w * h * channels)
+        shape = (h, w) if channels == 1 else (h, w, channels)
+        return np.frombuffer(pixels, np.uint8).reshape(shape).copy()
+
+
+CODECS = {
+    "jpeg": OpenCVJpegCodec,
+    "turbojpeg": TurboJpegCodec,
+    "webp": WebPCodec,
+    "raw": RawCodec,
+}
+
+
+def create_codec(name):
+    """
+    Args:
+        name (str): one of CODECS
+    Returns:
+        codec instance
+    Raises:
+        ImportError / RuntimeError: the codec's optional dependency is missing
+    """
+    return CODECS[name]()
+
+
+def available_codecs():
+    """Instances of every codec whose dependencies are installed"""
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(create_codec(name))
+        except (ImportError, RuntimeError):
+            pass
+    return codecs
+
+
+def fastest_jpeg_codec():
+    """libjpeg-turbo when PyTurboJPEG is installed, OpenCV otherwise; both produce plain JPEG"""
+    try:
+        return TurboJpegCodec()
+    except (ImportError, RuntimeError):
+        return OpenCVJpegCodec()
+
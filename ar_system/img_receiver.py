@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+UDP Image-Receiving Module (Python reference receiver)
+
+Reassembles the packets produced by Img_sender back into frames the same way
+unity/UDPImageReceiver.cs does, so the stream can be verified and measured on
+the PC, e.g. under simulated loss (tests/sim_fec_loss.py) or over loopback
+(tests/bench_image_stream.py). FrameDecoder turns the frames into images for every
+payload kind (JPEG, tile deltas, foveated layers, WebP, raw).
+"""
+
+import socket
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from ar_system.Img_sender import V2_DATA, V2_PARITY, V2_HEADER, KIND_JPEG, KIND_TILES, KIND_FOVEATED, \
+    KIND_WEBP, KIND_RAW
+from ar_system.image_codecs import OpenCVJpegCodec, WebPCodec, RawCodec
+from ar_system.mailbox import LatestValueMailbox
+from ar_system.tile_codec import apply_tiles
+from ar_system.foveated_codec import composite_foveated
+
+# capture_ts_us: sender's capture timestamp, recovered: True if FEC restored at least one packet
+Frame = namedtuple("Frame", ["frame_id", "capture_ts_us", "kind", "data", "recovered"])
+
+# Packets at most this many frames behind the last delivered frame are late (reordered)
+# packets; a frame ID further back means the sender restarted, however short its last run was
+REORDER_WINDOW = 8
+
+
+class FrameAssemblerV1:
+    def __init__(self):
+        """Reassemble protocol v1 packets (start 0x01, data 0x00, end 0x02) like UDPImageReceiver.cs"""
+        self.chunks = {}
+        self.expected = 0
+        self.frame_id = 0  # v1 has no frame ID, frames are numbered on arrival
+        self.stats = {"frames": 0, "dropped": 0, "bad_packets": 0}
+
+    def push(self, packet):
+        """
+        Feed one UDP datagram
+        Returns:
+            Frame: the frame this packet completed, otherwise None
+        """
+        packet_type = packet[0]
+        if packet_type == 0x01 and len(packet) == 3:  # --- 开始信号 ---
+            if self.expected:
+                self.stats["dropped"] += 1  # the previous frame never saw its end packet
+            self.chunks.clear()
+            self.expected = (packet[1] << 8) | packet[2]
+        elif packet_type == 0x02 and len(packet) == 1:  # --- 结束信号 ---
+            complete = self.expected > 0 and all(i in self.chunks for i in range(self.expected))
+            frame = None
+            if complete:
+                frame = Frame(self.frame_id, None, 0, b"".join(self.chunks[i] for i in range(self.expected)), False)
+                self.frame_id += 1
+                self.stats["frames"] += 1
+            elif self.expected:
+                self.stats["dropped"] += 1
+            self.chunks.clear()
+            self.expected = 0
+            return frame
+        elif packet_type == 0x00 and len(packet) > 3:  # --- 数据包 ---
+            self.chunks[(packet[1] << 8) | packet[2]] = bytes(packet[3:])
+        else:
+            self.stats["bad_packets"] += 1
+        return None
+
+
+class FrameAssemblerV2:
+    def __init__(self, max_pending=4):
+        """
+        Reassemble protocol v2 packets into frames
+        Args:
+            max_pending (int): incomplete frames kept at once, the oldest is dropped beyond that
+        """
+        self.max_pending = max_pending
+        # frame_id -> reassembly state of an incomplete frame
+        self.pending = {}
+        self.last_frame_id = -1
+        self.stats = {"frames": 0, "recovered": 0, "dropped": 0, "stale_packets": 0, "bad_packets": 0}
+
+    def push(self, packet):
+        """
+        Feed one UDP datagram
+        Returns:
+            Frame: the frame this packet completed, otherwise None
+        """
+        if len(packet) <= V2_HEADER.size or packet[0] not in (V2_DATA, V2_PARITY):
+            self.stats["bad_packets"] += 1
+            return None
+        packet_type, frame_id, capture_ts_us, index, num_data, frame_size, fec_group, kind = \
+            V2_HEADER.unpack_from(packet)
+        if frame_id <= self.last_frame_id:
+            if self.last_frame_id - frame_id <= REORDER_WINDOW:
+                # a newer frame has already been delivered
+                self.stats["stale_packets"] += 1
+                return None
+            # the frame ID jumped back beyond any reordering: the sender was restarted
+            self.pending.clear()
+            self.last_frame_id = -1
+
+        state = self.pending.get(frame_id)
+        if state is None:
+            if len(self.pending) >= self.max_pending:
+                del self.pending[min(self.pending)]
+                self.stats["dropped"] += 1
+            state = self.pending[frame_id] = {
+                "ts": capture_ts_us, "kind": kind, "num_data": num_data, "size": frame_size,
+                "group": fec_group, "data": {}, "parity": {}, "recovered": False,
+            }
+        payload = bytes(packet[V2_HEADER.size:])
+        if packet_type == V2_DATA:
+            state["data"][index] = payload
+            group = index // fec_group if fec_group else None
+        else:
+            state["parity"][index] = payload
+            group = index
+        if group is not None:
+            self._recover(state, group)
+
+        if len(state["data"]) < num_data:
+            return None
+        return self._deliver(frame_id, state)
+
+    def _recover(self, state, group):
+        """Rebuild the single missing data packet of a parity group, if possible"""
+        parity = state["parity"].get(group)
+        if parity is None:
+            return
+        members = range(group * state["group"], min((group + 1) * state["group"], state["num_data"]))
+        missing = [i for i in members if i not in state["data"]]
+        if len(missing) != 1:
+            return
+        acc = np.frombuffer(parity, dtype=np.uint8).copy()
+        for i in members:
+            if i != missing[0]:
+                acc ^= np.frombuffer(state["data"][i], dtype=np.uint8)
+        state["data"][missing[0]] = acc.tobytes()
+        state["recovered"] = True
+
+    def _deliver(self, frame_id, state):
+        data = b"".join(state["data"][i] for i in range(state["num_data"]))[:state["size"]]
+        # Older incomplete frames can only be delivered out of order now: drop them
+        for old_id in [f for f in self.pending if f <= frame_id]:
+            if old_id != frame_id:
+                self.stats["dropped"] += 1
+            del self.pending[old_id]
+        self.last_frame_id = frame_id
+        self.stats["frames"] += 1
+        self.stats["recovered"] += state["recovered"]
+        return Frame(frame_id, state["ts"], state["kind"], data, state["recovered"])
+
+
+class FrameDecoder:
+    def __init__(self):
+        """Turn reassembled frames into the image UDPImageReceiver.cs would show, for every payload kind"""
+        self.image = None
+        self.last_frame_id = None
+        # whole-frame codecs by content type
+        self.codecs = {KIND_JPEG: OpenCVJpegCodec(), KIND_WEBP: WebPCodec(), KIND_RAW: RawCodec(compress=False)}
+        # True until a keyframe arrives after a lost frame; the sender can be asked for one
+        self.needs_keyframe = True
+
+    def decode(self, frame):
+        """
+        Apply one received frame
+        Args:
+            frame (Frame): reassembled frame
+        Returns:
+            np.array: the current image (tile frames update it in place), None if there is nothing to show yet
+        """
+        if self.last_frame_id is not None and frame.frame_id != (self.last_frame_id + 1) & 0xFFFFFFFF:
+            # A skipped frame may have carried tiles: the image can be stale until they are refreshed
+            self.needs_keyframe = True
+        self.last_frame_id = frame.frame_id
+
+        if frame.kind in self.codecs:
+            image = self.codecs[frame.kind].decode(frame.data)
+            if image is not None:
+                self.image = image
+                self.needs_keyframe = False
+        elif frame.kind == KIND_TILES:
+            if self.image is None or not apply_tiles(self.image, frame.data):
+                self.needs_keyframe = True
+        elif frame.kind == KIND_FOVEATED:
+            image = composite_foveated(frame.data)
+            if image is not None:
+                self.image = image
+        return self.image
+
+
+class ImageReceiver:
+    def __init__(self, port=9999, host="0.0.0.0", on_frame=None, rcvbuf=4 << 20):
+        """
+        UDP receiver for both protocol versions, dispatching on the first byte like UDPImageReceiver.cs
+        Args:
+            port (int): UDP port to listen on (0 picks a free port, see self.port)
+            host (str): local address to bind
+            on_frame (function): called as on_frame(frame, recv_ns) on the receive thread,
+                recv_ns is time.monotonic_ns() when the frame was completed
+            rcvbuf (int): socket receive buffer size in bytes
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.on_frame = on_frame
+        self.v1 = FrameAssemblerV1()
+        self.v2 = FrameAssemblerV2()
+        # (frame, recv_ns) of the newest complete frame
+        self.latest = LatestValueMailbox()
+        self.packets = 0
+        self.is_running = False
+        self.thread = None
+
+    def start(self):
+        self.is_running = True
+        self.thread = threading.Thread(target=self._receive_loop, name="image-receiver")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def _receive_loop(self):
+        buf = bytearray(65536)
+        view = memoryview(buf)
+        while self.is_running:
+            try:
+                n = self.sock.recv_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if n == 0:
+                continue
+            self.packets += 1
+            packet = view[:n]
+            if packet[0] in (V2_DATA, V2_PARITY):
+                frame = self.v2.push(packet)
+            else:
+                frame = self.v1.push(packet)
+            if frame is not None:
+                recv_ns = time.monotonic_ns()
+                self.latest.put((frame, recv_ns))
+                if self.on_frame:
+                    self.on_frame(frame, recv_ns)
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+        self.sock.close()
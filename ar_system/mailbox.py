@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Single-slot "latest value wins" mailbox shared between threads
+
+The producer never blocks: a value that has not been taken yet is overwritten,
+so a slow consumer can never build up a backlog of stale data.
+"""
+
+import threading
+
+
+class LatestValueMailbox:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self._seq = 0        # number of values put so far
+        self._taken_seq = 0  # seq of the value last returned by get()
+        self._closed = False
+        self.overwritten = 0
+
+    def put(self, value):
+        """
+        Store a value, replacing any value that has not been taken yet
+        Returns:
+            bool: True if an untaken value was overwritten
+        """
+        with self._cond:
+            overwritten = self._seq > self._taken_seq
+            if overwritten:
+                self.overwritten += 1
+            self._value = value
+            self._seq += 1
+            self._cond.notify()
+            return overwritten
+
+    def get(self, timeout=None):
+        """
+        Wait for a value that has not been taken yet and take it
+        Returns:
+            The newest value, or None on timeout or after close()
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._taken_seq or self._closed, timeout):
+                return None
+            if self._seq == self._taken_seq:
+                return None
+            self._taken_seq = self._seq
+            return self._value
+
+    def peek(self):
+        """Return the newest value without waiting or taking it (None if nothing was put yet)"""
+        return self._value
+
+    def close(self):
+        """Wake up every waiting get()"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
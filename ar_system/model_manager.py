@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Segmentation model manager
+
+Loads the YOLO segmentation model once per process and warms it up with a few
+inferences at the production input size, so the first Phase 4 frame of every task
+runs as fast as the hundredth (CUDA context, cuDNN algorithm selection and memory
+pools are set up by the first inferences, not by loading the weights). Every task
+gets the same instance. ultralytics (torch) is imported in load(), not at import time.
+A load that failed is retried by the next get(), like the per-task load it replaces.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class SegmentationModelManager:
+    def __init__(self, weights="assets/yolov8n-seg.pt", width=640, height=480, warmup_runs=3):
+        """
+        Args:
+            weights (str): YOLO segmentation weights
+            width, height (int): production frame size, the warmup runs at this size
+            warmup_runs (int): warmup inferences after loading
+        """
+        self.weights = weights
+        self.width = width
+        self.height = height
+        self.warmup_runs = warmup_runs
+        self.model = None
+        self.load_ms = None
+        self.warmup_ms = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Load and warm up the model, only the first call does the work (thread-safe)
+        Returns:
+            ultralytics.YOLO: the loaded model
+        """
+        with self._lock:
+            if self.model is not None:
+                return self.model
+            from ultralytics import YOLO
+            self.warmup_ms = []  # a failed earlier attempt may have left some
+            start = time.perf_counter()
+            model = YOLO(self.weights)
+            self.load_ms = (time.perf_counter() - start) * 1000
+
+            # A textured frame rather than zeros, closer to what the camera delivers
+            rng = np.random.default_rng(0)
+            frame = rng.integers(0, 256, (self.height, self.width, 3), dtype=np.uint8)
+            for _ in range(self.warmup_runs):
+                start = time.perf_counter()
+                model(frame, verbose=False)
+                self.warmup_ms.append((time.perf_counter() - start) * 1000)
+            self.model = model
+            print(f"[INFO] 分割模型{self.weights}加载并预热成功！{self.stats()}")
+            return model
+
+    def get(self):
+        """
+        The loaded model; if no load() is running and none succeeded (it failed, e.g. the
+        weights or the GPU were not available at startup), loads it now, blocking
+        Returns:
+            ultralytics.YOLO: None while load() is still running on another thread or if it fails again
+        """
+        if self.model is not None:
+            return self.model
+        if not self._lock.acquire(blocking=False):
+            return None  # still loading, past its startup timeout
+        self._lock.release()
+        try:
+            return self.load()
+        except Exception as e:
+            print(f"[ERROR] 分割模型加载失败: {e}")
+            return None
+
+    def stats(self):
+        """
+        Returns:
+            dict: load time and the time of every warmup inference in milliseconds;
+                the last warmup time is what a Phase 4 frame should cost
+        """
+        return {
+            "load_ms": None if self.load_ms is None else round(self.load_ms, 1),
+            "warmup_ms": [round(ms, 1) for ms in self.warmup_ms],
+        }
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+IoU object tracker for the segmentation detections of the interaction loop
+
+Tracks are kept in parallel arrays (IDs, boxes, frames since last seen, hits). Every
+frame the IoU of all tracks against all detections is computed in one NumPy broadcast
+and matched with an optimal assignment (scipy.optimize.linear_sum_assignment) instead
+of a greedy, order-dependent scan, so crowded scenes with 50+ objects stay cheap.
+
+Masks are kept cropped to their box (CroppedMask) instead of at full frame size, and
+the masks of one frame are fused into a single int16 label image (LabelMap), so the
+gaze hit test is one array read however many objects are tracked.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# scipy is imported lazily by _load_assignment(): importing this module stays cheap
+linear_sum_assignment = None
+
+# x, y: frame position of the top-left pixel of mask; mask: bool crop of the object's box
+CroppedMask = namedtuple("CroppedMask", ["x", "y", "mask"])
+
+
+def _load_assignment():
+    """Import the assignment solver on first use."""
+    global linear_sum_assignment
+    if linear_sum_assignment is None:
+        from scipy.optimize import linear_sum_assignment as _linear_sum_assignment
+        linear_sum_assignment = _linear_sum_assignment
+
+
+def iou_matrix(a, b):
+    """
+    Pairwise IoU of two sets of boxes
+    Args:
+        a (np.array): (N, 4) boxes x1, y1, x2, y2
+        b (np.array): (M, 4) boxes x1, y1, x2, y2
+    Returns:
+        np.array: (N, M) IoU, 0 where the union is empty
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter, dtype=np.float64), where=union > 0)
+
+
+def crop_mask(mask, box):
+    """
+    Crop a full-frame mask to its detection box
+    Args:
+        mask (np.array): HxW bool mask
+        box (np.array): x1, y1, x2, y2, clipped to the frame
+    Returns:
+        CroppedMask: owns its pixels (at least 1x1), the full mask can be freed
+    """
+    h, w = mask.shape
+    x1 = min(max(int(box[0]), 0), w - 1)
+    y1 = min(max(int(box[1]), 0), h - 1)
+    x2 = max(min(int(np.ceil(box[2])), w), x1 + 1)
+    y2 = max(min(int(np.ceil(box[3])), h), y1 + 1)
+    return CroppedMask(x1, y1, mask[y1:y2, x1:x2].copy())
+
+
+class ObjectTracker:
+    def __init__(self, iou_threshold=0.3, patience=15, min_hits=3):
+        """
+        Args:
+            iou_threshold (float): a detection continues a track only above this IoU
+            patience (int): frames a track survives without a matching detection
+            min_hits (int): matched frames before a track counts as stable (confirmed())
+        """
+        self.iou_threshold = iou_threshold
+        self.patience = patience
+        self.min_hits = min_hits
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.last_seen = np.zeros(0, dtype=np.int32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.masks = []  # per-track mask, row-aligned with the arrays
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def reset(self):
+        """Drop every track, e.g. at the start of a new task"""
+        self.__init__(self.iou_threshold, self.patience, self.min_hits)
+
+    def update(self, boxes, masks):
+        """
+        Associate one frame's detections with the tracks
+        Args:
+            boxes (np.array): (D, 4) detection boxes x1, y1, x2, y2
+            masks (list): D detection masks (CroppedMask), stored with the track they are assigned to
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.last_seen += 1
+
+        matched_dets = np.zeros(len(boxes), dtype=bool)
+        if len(self.ids) and len(boxes):
+            _load_assignment()
+            iou = iou_matrix(self.boxes, boxes)
+            # pairs under the threshold can not be matched, their cost adds nothing
+            rows, cols = linear_sum_assignment(np.where(iou > self.iou_threshold, -iou, 0.0))
+            valid = iou[rows, cols] > self.iou_threshold
+            rows, cols = rows[valid], cols[valid]
+            self.boxes[rows] = boxes[cols]
+            self.last_seen[rows] = 0
+            self.hits[rows] += 1
+            for r, c in zip(rows, cols):
+                self.masks[r] = masks[c]
+            matched_dets[cols] = True
+
+        # Delete old tracks
+        alive = self.last_seen <= self.patience
+        if not alive.all():
+            self.ids, self.boxes = self.ids[alive], self.boxes[alive]
+            self.last_seen, self.hits = self.last_seen[alive], self.hits[alive]
+            self.masks = [m for m, keep in zip(self.masks, alive) if keep]
+
+        # Start tracks for the unmatched detections
+        new = np.flatnonzero(~matched_dets)
+        if len(new):
+            self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + len(new))))
+            self.next_id += len(new)
+            self.boxes = np.concatenate((self.boxes, boxes[new]))
+            self.last_seen = np.concatenate((self.last_seen, np.zeros(len(new), dtype=np.int32)))
+            self.hits = np.concatenate((self.hits, np.ones(len(new), dtype=np.int32)))
+            self.masks.extend(masks[i] for i in new)
+
+    def confirmed(self):
+        """
+        Tracks matched in at least min_hits frames
+        Returns:
+            list: (track ID, box, mask) tuples
+        """
+        rows = np.flatnonzero(self.hits >= self.min_hits)
+        return [(int(self.ids[r]), self.boxes[r], self.masks[r]) for r in rows]
+
+
+class LabelMap:
+    def __init__(self, width, height):
+        """
+        The masks of one frame fused into an int16 label image
+        Args:
+            width, height (int): frame size
+        """
+        # index into self.tracks per pixel, -1 for background; an index rather than the
+        # track ID itself, so the label fits int16 however long the tracker runs
+        self.labels = np.full((height, width), -1, dtype=np.int16)
+        self.tracks = []
+
+    def update(self, tracks):
+        """
+        Paint the masks of a frame's tracks; where masks overlap the smaller one wins, so an
+        object in front of a larger one stays selectable
+        Args:
+            tracks (list): (track ID, box, CroppedMask) tuples, e.g. ObjectTracker.confirmed()
+        """
+        self.labels.fill(-1)
+        self.tracks = tracks
+        for i in sorted(range(len(tracks)), key=lambda i: -tracks[i][2].mask.size):
+            crop = tracks[i][2]
+            h, w = crop.mask.shape
+            self.labels[crop.y:crop.y + h, crop.x:crop.x + w][crop.mask] = i
+
+    def at(self, x, y):
+        """
+        Args:
+            x, y (int): frame pixel, e.g. the gaze point
+        Returns:
+            tuple: the (track ID, box, CroppedMask) covering the pixel, None for background
+                or a pixel outside the frame
+        """
+        h, w = self.labels.shape
+        if not (0 <= x < w and 0 <= y < h):
+            return None
+        i = self.labels[y, x]
+        return self.tracks[i] if i >= 0 else None
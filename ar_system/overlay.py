@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Vector overlay for the HoloLens video stream
+
+Instead of burning contours, the highlight and the dwell progress bar into the video
+pixels (blurred by JPEG, expensive to encode, a full-frame resend on every change),
+the PC sends the clean video plus one small "overlay" TCP message per frame that the
+headset draws on top of it. render_overlay() draws the same message with OpenCV, for
+the PC preview window and for burning it in when the headset does not support it.
+
+Overlay payload (JSON, coordinates in video pixels):
+    {"ts": capture timestamp us of the video frame it belongs to, "w": width, "h": height,
+     "tracks": [{"id": track ID, "poly": [x0, y0, x1, y1, ...], "hl": highlighted}, ...],
+     "progress": {"active": true, "id": track ID, "x": x, "y": y, "value": 0..1, "armed": bool}}  (only while dwelling)
+A track can appear more than once, one entry per outer contour. "active" is explicit because
+Unity's JsonUtility fills in a default progress object when the key is missing.
+"""
+
+import json
+
+import cv2
+import numpy as np
+
+CONTOUR_COLOR = (255, 0, 0)      # blue
+HIGHLIGHT_COLOR = (0, 255, 0)    # green
+LINE_WIDTH, HIGHLIGHT_LINE_WIDTH = 2, 4  # video pixels, as OverlayRenderer.cs lineWidth / highlightLineWidth
+BAR_WIDTH, BAR_HEIGHT = 100, 10
+
+
+class OverlayFrame:
+    def __init__(self, capture_ts_us, width, height, epsilon=1.5, min_area=25.0):
+        """
+        Overlay of one video frame
+        Args:
+            capture_ts_us (int): capture timestamp of the video frame, matches the protocol v2 header
+            width, height (int): video frame size
+            epsilon (float): polygon simplification tolerance in pixels (cv2.approxPolyDP)
+            min_area (float): contours smaller than this are not sent
+        """
+        self.capture_ts_us = capture_ts_us
+        self.width = width
+        self.height = height
+        self.epsilon = epsilon
+        self.min_area = min_area
+        self.tracks = []
+        self.progress = None
+
+    def add_track(self, track_id, contours, highlighted=False):
+        """
+        Args:
+            track_id (int): tracker ID
+            contours (list): outer contours of the object's mask from cv2.findContours
+            highlighted (bool): the user has dwelled on the object long enough to highlight it
+        """
+        for contour in contours:
+            if cv2.contourArea(contour) < self.min_area:
+                continue
+            poly = cv2.approxPolyDP(contour, self.epsilon, True)
+            self.tracks.append({"id": int(track_id), "poly": poly.reshape(-1).tolist(), "hl": bool(highlighted)})
+
+    def set_progress(self, track_id, x, y, value, armed):
+        """
+        Dwell progress bar next to the gaze point
+        Args:
+            x, y (int): gaze point in video pixels
+            value (float): 0..1 of the selection time
+            armed (bool): past the highlight time, the bar turns green
+        """
+        self.progress = {"active": True, "id": int(track_id), "x": int(x), "y": int(y),
+                         "value": round(float(value), 3), "armed": bool(armed)}
+
+    def to_dict(self):
+        overlay = {"ts": self.capture_ts_us, "w": self.width, "h": self.height, "tracks": self.tracks}
+        if self.progress:
+            overlay["progress"] = self.progress
+        return overlay
+
+    def to_json(self):
+        """Compact JSON for the "overlay" TCP message"""
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+
+def render_overlay(image, overlay):
+    """
+    Draw an overlay onto a video frame in place, the way the headset renders it
+    Args:
+        image (np.array): BGR frame the overlay belongs to
+        overlay (dict or str): OverlayFrame.to_dict() or the JSON payload
+    Returns:
+        np.array: image
+    """
+    if isinstance(overlay, str):
+        overlay = json.loads(overlay)
+    polys = [(np.array(t["poly"], dtype=np.int32).reshape(-1, 1, 2), t["hl"]) for t in overlay["tracks"]]
+    # outlines only, highlighted objects thicker and green, like OverlayRenderer.cs
+    cv2.polylines(image, [p for p, hl in polys if not hl], True, CONTOUR_COLOR, LINE_WIDTH)
+    cv2.polylines(image, [p for p, hl in polys if hl], True, HIGHLIGHT_COLOR, HIGHLIGHT_LINE_WIDTH)
+
+    progress = overlay.get("progress")
+    if progress and progress.get("active"):
+        bar_x, bar_y = progress["x"] + 20, progress["y"] - 20
+        fill_color = HIGHLIGHT_COLOR if progress["armed"] else (255, 255, 255)
+        cv2.rectangle(image, (bar_x, bar_y), (bar_x + BAR_WIDTH, bar_y + BAR_HEIGHT), (100, 100, 100), -1)
+        cv2.rectangle(image, (bar_x, bar_y), (bar_x + int(BAR_WIDTH * progress["value"]), bar_y + BAR_HEIGHT), fill_color, -1)
+    return image
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive JPEG quality / resolution controller for the HoloLens video stream
+
+- Measures encode time, bytes per frame, send-buffer pressure (time spent waiting
+  in the sender's pacer) and optional receiver feedback (loss rate).
+- Raises JPEG quality and resolution while the stream stays under the target
+  bitrate and per-frame time budget, backs off multiplicatively as soon as it
+  does not, so the HoloLens gets the best image the link can carry.
+"""
+
+
+class AdaptiveQualityController:
+    def __init__(self, target_kbps=20000, frame_budget_ms=15.0, fps=30,
+                 min_quality=10, max_quality=90, scales=(0.5, 0.75, 1.0),
+                 initial_quality=50, smoothing=0.3, hold_frames=5):
+        """
+        Args:
+            target_kbps (float): bitrate the stream should stay under
+            frame_budget_ms (float): encode + send time allowed per frame
+            fps (float): nominal frame rate, converts bytes per frame into a bitrate
+            min_quality, max_quality (int): JPEG quality range
+            scales (tuple): allowed downscale factors, ascending, the last one is full size
+            initial_quality (int): quality of the first frames
+            smoothing (float): weight of the newest sample in the moving averages
+            hold_frames (int): frames to observe after a change before the next step up
+        """
+        self.target_kbps = target_kbps
+        self.frame_budget_ms = frame_budget_ms
+        self.fps = fps
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.scales = tuple(scales)
+        self.quality = initial_quality
+        self.scale_idx = len(self.scales) - 1
+        self.alpha = smoothing
+        self.hold_frames = hold_frames
+        self._hold = 0
+
+        self.avg_bytes = None
+        self.avg_frame_ms = None
+        self.avg_encode_ms = None
+        self.pressure = 0.0       # fraction of a frame interval spent waiting for the pacer
+        self.receiver_loss = 0.0  # last loss rate reported by the receiver
+        self._loss_reported = False  # a report arrived that update() has not acted on yet
+
+    @property
+    def scale(self):
+        return self.scales[self.scale_idx]
+
+    def operating_point(self):
+        """Return the (JPEG quality, downscale factor) to encode the next frame with"""
+        return self.quality, self.scale
+
+    def _ema(self, avg, sample):
+        return sample if avg is None else avg + self.alpha * (sample - avg)
+
+    def update(self, encode_ms, frame_bytes, send_ms, pace_wait_ms=0.0):
+        """
+        Feed the measurements of the frame just sent and adapt the operating point
+        Args:
+            encode_ms (float): time spent in the encoder
+            frame_bytes (int): encoded frame size
+            send_ms (float): time spent handing the packets to the socket
+            pace_wait_ms (float): part of send_ms spent waiting for the pacer (send-buffer pressure)
+        """
+        self.avg_bytes = self._ema(self.avg_bytes, frame_bytes)
+        self.avg_encode_ms = self._ema(self.avg_encode_ms, encode_ms)
+        self.avg_frame_ms = self._ema(self.avg_frame_ms, encode_ms + send_ms)
+        self.pressure = self._ema(self.pressure, pace_wait_ms * self.fps / 1000.0)
+
+        if self._hold > 0:
+            self._hold -= 1
+        bitrate = self.bitrate_kbps()
+        # a loss report steps down once, on the first frame after it arrived, not on every
+        # frame until the next one; while it is the newest report quality does not go up
+        lossy = self.receiver_loss > 0.02
+        congested = self.pressure > 0.1 or (lossy and self._loss_reported)
+        self._loss_reported = False
+        if bitrate > self.target_kbps * 1.05 or self.avg_frame_ms > self.frame_budget_ms or congested:
+            self._step_down()
+        elif self._hold == 0 and not lossy and bitrate < self.target_kbps * 0.8 \
+                and self.avg_frame_ms < self.frame_budget_ms * 0.7:
+            self._step_up()
+
+    def on_receiver_feedback(self, loss=None):
+        """Receiver-side feedback, e.g. the loss rate the headset observed over the last second"""
+        if loss is not None:
+            self.receiver_loss = loss
+            self._loss_reported = True
+
+    def _step_down(self):
+        # Multiplicative decrease, resolution goes down only once quality is exhausted
+        if self.quality > self.min_quality:
+            self.quality = max(self.min_quality, int(self.quality * 0.85))
+        elif self.scale_idx > 0:
+            self.scale_idx -= 1
+            self.quality = (self.min_quality + self.max_quality) // 2
+        # The averages belong to the old operating point
+        self.avg_bytes = self.avg_frame_ms = None
+        self._hold = self.hold_frames
+
+    def _step_up(self):
+        # Additive increase, full resolution is restored before quality goes past the middle
+        if self.scale_idx < len(self.scales) - 1 and self.quality >= (self.min_quality + self.max_quality) // 2:
+            self.scale_idx += 1
+            self.quality = self.min_quality + 10
+            self.avg_bytes = self.avg_frame_ms = None
+            self._hold = self.hold_frames
+        elif self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + 2)
+            self._hold = 1
+
+    def bitrate_kbps(self):
+        return 0.0 if self.avg_bytes is None else self.avg_bytes * 8 * self.fps / 1000.0
+
+    def stats(self):
+        """Current operating point and the measurements it is based on"""
+        return {
+            "quality": self.quality,
+            "scale": self.scale,
+            "bitrate_kbps": round(self.bitrate_kbps(), 1),
+            "target_kbps": self.target_kbps,
+            "frame_ms": round(self.avg_frame_ms or 0.0, 2),
+            "encode_ms": round(self.avg_encode_ms or 0.0, 2),
+            "pressure": round(self.pressure, 3),
+            "receiver_loss": self.receiver_loss,
+        }
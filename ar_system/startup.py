@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Startup Orchestrator Module
+
+- Runs the independent subsystems (model, camera, EEG, HoloLens) concurrently.
+- Every subsystem has its own timeout, so launch time is bounded by the slowest
+  subsystem instead of the sum of all of them.
+- Prints a readiness report once every subsystem is ready, failed or timed out.
+- A subsystem that is ready only after its timeout is still taken over: result() returns
+  it from then on, and shutdown() stops it if nobody took it.
+"""
+
+import threading
+import time
+
+
+class StartupOrchestrator:
+    READY = "ready"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+
+    def __init__(self):
+        # name -> subsystem record, kept in registration order for the report
+        self._subsystems = {}
+        self.elapsed = 0.0
+        # guards the status of every subsystem: the worker and run()'s timeout both set it
+        self._lock = threading.Lock()
+        self._shut_down = False
+
+    def add(self, name, start_func, timeout, required=True, stop_func=None):
+        """
+        Register a subsystem to be started
+        Args:
+            name (str): subsystem name shown in the readiness report
+            start_func (function): callable without arguments that brings the subsystem up
+                and returns its handle (e.g. the loaded model or the started pipeline)
+            timeout (float): seconds to wait for start_func before reporting a timeout
+            required (bool): whether the system can not run without this subsystem
+            stop_func (function): called with the handle to release the subsystem if it is
+                ready but was never taken with result(), see shutdown()
+        """
+        self._subsystems[name] = {
+            "func": start_func, "timeout": timeout, "required": required, "stop": stop_func,
+            "status": None, "result": None, "error": None, "taken": False,
+            "elapsed": 0.0, "done": threading.Event(),
+        }
+
+    def _run_subsystem(self, name, sub):
+        start = time.perf_counter()
+        try:
+            result, error, status = sub["func"](), None, self.READY
+        except Exception as e:
+            result, error, status = None, e, self.FAILED
+        with self._lock:
+            late = sub["status"] == self.TIMEOUT
+            sub["result"], sub["error"], sub["status"] = result, error, status
+            sub["elapsed"] = time.perf_counter() - start
+            # shutdown() has already run: nobody will take the handle any more
+            orphaned = self._shut_down and status == self.READY and not sub["taken"]
+            if orphaned:
+                sub["taken"] = True
+        sub["done"].set()
+        if late:
+            print(f"[STARTUP] {name} 在超时后完成: {status} ({sub['elapsed']:.2f}s)")
+        if orphaned:
+            self._stop(name, sub)
+
+    def run(self):
+        """
+        Start all registered subsystems concurrently and wait for them
+        Returns:
+            bool: True if every required subsystem is ready
+        """
+        launch = time.perf_counter()
+        for name, sub in self._subsystems.items():
+            # Daemon threads: a subsystem that hangs past its timeout must not block exit
+            thread = threading.Thread(target=self._run_subsystem, args=(name, sub), name=f"startup-{name}")
+            thread.daemon = True
+            thread.start()
+
+        for sub in self._subsystems.values():
+            remaining = sub["timeout"] - (time.perf_counter() - launch)
+            if not sub["done"].wait(timeout=max(remaining, 0)):
+                with self._lock:
+                    if sub["status"] is None:  # the worker may have finished meanwhile
+                        sub["status"] = self.TIMEOUT
+                        sub["elapsed"] = sub["timeout"]
+        self.elapsed = time.perf_counter() - launch
+
+        self.print_report()
+        return self.all_required_ready()
+
+    def result(self, name):
+        """
+        Return the handle of a subsystem, or None if it is not ready.
+        A subsystem that completes after its timeout becomes available here later on.
+        """
+        sub = self._subsystems[name]
+        with self._lock:
+            if sub["status"] != self.READY:
+                return None
+            sub["taken"] = True  # the caller releases it now
+            return sub["result"]
+
+    def shutdown(self):
+        """
+        Stop every subsystem that is ready but was never taken with result(), e.g. one that
+        came up after its timeout; one still starting is stopped as soon as it is ready
+        """
+        with self._lock:
+            self._shut_down = True
+            leftovers = [(name, sub) for name, sub in self._subsystems.items()
+                         if sub["status"] == self.READY and not sub["taken"]]
+            for _, sub in leftovers:
+                sub["taken"] = True
+        for name, sub in leftovers:
+            self._stop(name, sub)
+
+    def _stop(self, name, sub):
+        if sub["stop"] is None:
+            return
+        try:
+            sub["stop"](sub["result"])
+            print(f"[STARTUP] 已停止未被使用的子系统 {name}")
+        except Exception as e:
+            print(f"[STARTUP] 停止子系统 {name} 失败: {e}")
+
+    def is_ready(self, name):
+        return self._subsystems[name]["status"] == self.READY
+
+    def all_required_ready(self):
+        return all(sub["status"] == self.READY
+                   for sub in self._subsystems.values() if sub["required"])
+
+    def report(self):
+        """Readiness report as a dict: name -> (status, elapsed seconds, error)"""
+        return {name: (sub["status"], sub["elapsed"], sub["error"])
+                for name, sub in self._subsystems.items()}
+
+    def print_report(self):
+        print("[STARTUP] ---------------- 启动就绪报告 ----------------")
+        for name, sub in self._subsystems.items():
+            line = f"[STARTUP] {name:10s} {sub['status']:8s} {sub['elapsed']:6.2f}s"
+            if not sub["required"]:
+                line += " (可选)"
+            if sub["error"] is not None:
+                line += f"  错误: {sub['error']}"
+            elif sub["status"] == self.TIMEOUT:
+                line += f"  超过{sub['timeout']:g}s未完成"
+            print(line)
+        serial_sum = sum(sub["elapsed"] for sub in self._subsystems.values())
+        print(f"[STARTUP] 总耗时 {self.elapsed:.2f}s (串行启动约需 {serial_sum:.2f}s)")
@@ -2,39 +2,312 @@
 """
 TCP client for bidirectional data transfer
 双向传输的数据格式一定都是信封，即{type:, payload:}
+例外: 眼动坐标可以用固定长度的二进制消息发送，大端:
+    [类型 0x01 (1字节)] + [时间戳 微秒, HoloLens时钟 (8字节)] + [x (float)] + [y (float)] + [置信度 (float)]
+JSON信封总是以'{'开头，因此两者可以按第一个字节区分。
+
+Clock synchronisation: the PC sends {"type": "ping", "payload": {"seq", "t0"}} every
+ping_interval seconds, the headset answers {"type": "pong", "payload": {"seq", "t0", "t1", "t2"}}
+with t1 / t2 its receive / send time in its own microsecond clock; see ClockSync.
 """
 
 import socket
+import struct
 import threading
 import time
 import json
+from collections import deque, namedtuple
+
+from ar_system.mailbox import LatestValueMailbox
+
+LENGTH_PREFIX = struct.Struct('>I')
+GAZE_MESSAGE = struct.Struct('>Bqfff')
+MSG_GAZE_BINARY = 0x01
+
+# x, y in video pixels; timestamp_us is the sender's clock (None for JSON gaze);
+# received_ns is time.monotonic_ns() when the sample was read from the socket;
+# pc_time_us is when the sample was taken, in the PC's time.monotonic() clock (microseconds):
+# timestamp_us through the clock offset once it is known, else the receive time minus half the RTT
+GazeSample = namedtuple("GazeSample", ["x", "y", "confidence", "timestamp_us", "received_ns", "pc_time_us"])
+
+# Outgoing message type -> (priority, coalesce); lower priorities are sent first. A coalesced
+# type keeps only its newest unsent message, in the place of the first one.
+PRIORITY_CONTROL, PRIORITY_NORMAL, PRIORITY_BULK = 0, 1, 2
+SEND_POLICIES = {
+    "start_signal": (PRIORITY_CONTROL, False),
+    "selection_confirmed": (PRIORITY_CONTROL, False),
+    "subtitle": (PRIORITY_NORMAL, True),
+    "overlay": (PRIORITY_BULK, True),
+}
+DEFAULT_SEND_POLICY = (PRIORITY_NORMAL, False)
+
+
+class MessageFramer:
+    def __init__(self, buffer_size=65536, max_message_size=16 * 1024 * 1024):
+        """
+        Length-prefixed message framing over a stream socket: [长度 (4字节, 大端)] + [消息]
+        Every read goes into one reusable buffer and all complete messages in it are
+        returned at once, so a burst of small messages costs one recv and no copies.
+        Args:
+            buffer_size (int): initial receive buffer size, grows for larger messages
+            max_message_size (int): longer length prefixes are treated as a broken stream
+        """
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.max_message_size = max_message_size
+        self.start = 0  # first byte not consumed yet
+        self.end = 0    # end of the received data
+        self.stats = {"reads": 0, "messages": 0}
+
+    def recv(self, sock):
+        """
+        Read once from the socket
+        Args:
+            sock (socket.socket): connected stream socket
+        Returns:
+            list: memoryviews of every complete message, only valid until the next call
+        Raises:
+            ConnectionError: the peer closed the connection or sent an invalid length
+        """
+        self._make_room()
+        n = sock.recv_into(self.view[self.end:])
+        if n == 0:
+            raise ConnectionError("服务器已关闭连接。")
+        self.end += n
+        self.stats["reads"] += 1
+        return self._extract()
+
+    def _extract(self):
+        messages = []
+        start, end = self.start, self.end
+        while end - start >= LENGTH_PREFIX.size:
+            (length,) = LENGTH_PREFIX.unpack_from(self.buffer, start)
+            if length > self.max_message_size:
+                raise ConnectionError(f"消息长度异常: {length} 字节")
+            if end - start - LENGTH_PREFIX.size < length:
+                break
+            start += LENGTH_PREFIX.size
+            messages.append(self.view[start:start + length])
+            start += length
+        self.start = start
+        self.stats["messages"] += len(messages)
+        return messages
+
+    def _make_room(self):
+        """Move a partial message to the front of the buffer, grow it if the message does not fit"""
+        pending = self.end - self.start
+        needed = 0
+        if pending >= LENGTH_PREFIX.size:
+            needed = LENGTH_PREFIX.size + LENGTH_PREFIX.unpack_from(self.buffer, self.start)[0]
+        if needed > len(self.buffer):
+            buffer = bytearray(max(needed, 2 * len(self.buffer)))
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer, self.view = buffer, memoryview(buffer)
+        elif self.start == self.end:
+            pending = 0
+        elif self.end == len(self.buffer) or (needed and self.start + needed > len(self.buffer)):
+            self.view[:pending] = self.view[self.start:self.end]  # memmove
+        else:
+            return
+        self.start, self.end = 0, pending
+
+
+class SendQueue:
+    def __init__(self, max_depth=64, policies=None):
+        """
+        Thread-safe outgoing message queue with priorities, coalescing and a bounded depth
+        Args:
+            max_depth (int): pending messages; when full, the oldest message of the lowest
+                priority not above the new one's is dropped, or the new message if there is none
+            policies (dict): msg_type -> (priority, coalesce), SEND_POLICIES if None
+        """
+        self.max_depth = max_depth
+        self.policies = SEND_POLICIES if policies is None else policies
+        self._cond = threading.Condition()
+        self._queues = [deque() for _ in range(PRIORITY_BULK + 1)]  # entries: [msg_type, data]
+        self._coalesced = {}  # msg_type -> its pending entry
+        self._depth = 0
+        self._closed = False
+        self.stats = {"sent": 0, "coalesced": 0, "dropped": {}}
+
+    def put(self, msg_type, data):
+        """
+        Queue an encoded message, never blocks
+        Returns:
+            bool: False if the message was dropped
+        """
+        priority, coalesce = self.policies.get(msg_type, DEFAULT_SEND_POLICY)
+        with self._cond:
+            if self._closed:
+                return False
+            entry = self._coalesced.get(msg_type) if coalesce else None
+            if entry is not None:
+                entry[1] = data
+                self.stats["coalesced"] += 1
+                return True
+            if self._depth >= self.max_depth and not self._drop_below(priority):
+                self._count_drop(msg_type)
+                return False
+            entry = [msg_type, data]
+            self._queues[priority].append(entry)
+            self._depth += 1
+            if coalesce:
+                self._coalesced[msg_type] = entry
+            self._cond.notify()
+            return True
+
+    def _drop_below(self, priority):
+        for queue in reversed(self._queues[priority:]):
+            if queue:
+                msg_type, _ = queue.popleft()
+                self._forget(msg_type)
+                self._depth -= 1
+                self._count_drop(msg_type)
+                return True
+        return False
+
+    def _forget(self, msg_type):
+        """The entry of msg_type left the queue, later messages of the type start a new one"""
+        self._coalesced.pop(msg_type, None)
+
+    def _count_drop(self, msg_type):
+        dropped = self.stats["dropped"]
+        dropped[msg_type] = dropped.get(msg_type, 0) + 1
+
+    def get_batch(self, timeout=None, max_bytes=65536):
+        """
+        Wait for messages and take the most urgent ones, up to about max_bytes
+        Returns:
+            list: encoded messages in send order, empty on timeout or after close()
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._depth or self._closed, timeout):
+                return []
+            batch, size = [], 0
+            for queue in self._queues:
+                while queue:
+                    if batch and size + len(queue[0][1]) > max_bytes:
+                        break
+                    msg_type, data = queue.popleft()
+                    self._forget(msg_type)
+                    batch.append(data)
+                    size += len(data)
+                if queue:
+                    break  # the rest waits for the next batch, behind this priority
+            self._depth -= len(batch)
+            self.stats["sent"] += len(batch)
+            return batch
+
+    def clear(self):
+        with self._cond:
+            for queue in self._queues:
+                queue.clear()
+            self._coalesced.clear()
+            self._depth = 0
+            self._cond.notify_all()
+
+    def empty(self):
+        return self._depth == 0
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class ClockSync:
+    def __init__(self, window=8):
+        """
+        NTP-style estimate of the HoloLens clock relative to the PC's monotonic clock
+        Of the last `window` ping/pong exchanges the one with the smallest round trip was
+        least delayed by queueing on either side, its offset is used.
+        Args:
+            window (int): exchanges to choose from
+        """
+        self.samples = deque(maxlen=window)  # (rtt_us, offset_us)
+        self.estimate = None  # (rtt_us, offset_us), replaced as a whole so readers need no lock
+        self.last_rtt_us = None
+
+    def add(self, t0, t1, t2, t3):
+        """
+        Args:
+            t0, t3 (int): PC send / receive time, microseconds of the PC clock
+            t1, t2 (int): headset receive / send time, microseconds of the headset clock
+        """
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0  # headset clock minus PC clock
+        self.samples.append((rtt, offset))
+        self.last_rtt_us = rtt
+        self.estimate = min(self.samples)
+
+    def reset(self):
+        """Forget the estimate, e.g. after a reconnect (the headset app may have restarted)"""
+        self.samples.clear()
+        self.estimate = None
+        self.last_rtt_us = None
+
+    def to_local_us(self, remote_us):
+        """
+        Convert a headset timestamp into the PC's monotonic clock
+        Returns:
+            float: microseconds, None until the first pong arrived
+        """
+        estimate = self.estimate
+        return None if estimate is None else remote_us - estimate[1]
+
+    def stats(self):
+        estimate = self.estimate
+        if estimate is None:
+            return {"offset_ms": None, "rtt_ms": None, "last_rtt_ms": None, "samples": 0}
+        return {"offset_ms": round(estimate[1] / 1000.0, 3), "rtt_ms": round(estimate[0] / 1000.0, 3),
+                "last_rtt_ms": round(self.last_rtt_us / 1000.0, 3), "samples": len(self.samples)}
 
 
 class TCPClient:
-    def __init__(self, host, port=9998):
+    def __init__(self, host, port=9998, send_queue_depth=64, ping_interval=1.0):
         """
         Initialize TCP Client
         Args:
             host (str): HoloLens 2 (server) IP address
             port (int): Socket Port
+            send_queue_depth (int): outgoing messages that may wait for a slow HoloLens, see SendQueue
+            ping_interval (float): seconds between clock synchronisation pings, 0 disables them
         """
         self.host = host
         self.port = port
         self.client_socket = None
         self.is_running = False
         self.connection_thread = None
+        # send() only queues; the writer thread is the only one writing to the socket
+        self.send_queue = SendQueue(send_queue_depth)
+        self.writer_thread = None
+        self._write_lock = threading.Lock()  # held while writing, the socket is closed under it
         # Create a dictionary to store the callback functions
         self.callbacks = {}
+        self._timestamped = set()  # message types whose callback also gets the receive time
+        # Latest gaze sample, bursts are coalesced here only; read it with latest_gaze()
+        self.gaze = LatestValueMailbox()
+        # Headset clock offset and round-trip time, see clock_stats()
+        self.clock = ClockSync()
+        self.ping_interval = ping_interval
+        self._ping_seq = 0
 
     # Register the callback functions
-    def register_callback(self, msg_type, callback_func):
+    def register_callback(self, msg_type, callback_func, with_timestamp=False):
         """
         Register a function for the specified message type
         Args:
             msg_type (str): message type
-            callback_func (function): The function to be invoked upon receiving a message of this type
+            callback_func (function): The function to be invoked upon receiving a message of this type;
+                the "gaze" callback gets every GazeSample, in the order they were sent
+            with_timestamp (bool): call it as callback_func(payload, received_ns), received_ns being
+                time.monotonic_ns() when the message was read from the socket
         """
         self.callbacks[msg_type] = callback_func
+        if with_timestamp:
+            self._timestamped.add(msg_type)
+        else:
+            self._timestamped.discard(msg_type)
         print(f"已为消息类型 '{msg_type}' 注册回调函数: {callback_func.__name__}")
 
 
@@ -45,9 +318,13 @@ class TCPClient:
             return
             
         self.is_running = True
+        if self.send_queue._closed:  # restarted after stop()
+            self.send_queue = SendQueue(self.send_queue.max_depth, self.send_queue.policies)
         self.connection_thread = threading.Thread(target=self._connection_loop)
         self.connection_thread.daemon = True
         self.connection_thread.start()
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
 
     def _connection_loop(self):
         """
@@ -58,8 +335,11 @@ class TCPClient:
             try:
                 print(f"正在尝试连接到HoloLens服务器 {self.host}:{self.port}...")
                 
-                self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.client_socket.connect((self.host, self.port))
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.connect((self.host, self.port))
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.clock.reset()
+                self.client_socket = sock  # connected only after connect() returned
                 print(f"成功连接到HoloLens服务器！")
                 
                 self._receive_loop()
@@ -78,35 +358,23 @@ class TCPClient:
 
     def _receive_loop(self):
         """Handle incoming data from the server"""
+        sock = self.client_socket
+        framer = MessageFramer()
         while self.is_running and self.client_socket:
             try:
-                # Receive 4-byte length prefix firstly 
-                length_prefix = self.client_socket.recv(4)
-                if not length_prefix:
-                    print("服务器已关闭连接。")
-                    break
-                
-                message_length = int.from_bytes(length_prefix, 'big')
-                
-                # Receive the complete message based on the length prefix
-                data = b''
-                while len(data) < message_length:
-                    packet = self.client_socket.recv(message_length - len(data))
-                    if not packet:
-                        raise ConnectionError("收到的消息不完整，连接可能已丢失。")
-                    data += packet
-                
-                message_str = data.decode('utf-8')
-                envelope = json.loads(message_str)
-                msg_type = envelope.get("type")
-                payload = envelope.get("payload")
-                
-                # Invoke the registered callback function
-                if msg_type in self.callbacks:
-                    self.callbacks[msg_type](payload)
-                else:
-                    print(f"警告: 收到未注册回调的消息类型 '{msg_type}'")
-
+                # One read can hold several messages, or only part of one
+                gaze = []
+                messages = framer.recv(sock)
+                received_ns = time.monotonic_ns()  # every message of this read arrived by now
+                for message in messages:
+                    if len(message) == GAZE_MESSAGE.size and message[0] == MSG_GAZE_BINARY:
+                        gaze.append(message)
+                    else:
+                        self._dispatch(message, received_ns)
+                # every sample goes to the callback (gaze history), only the newest into the latest-value slot
+                for i, message in enumerate(gaze):
+                    _, timestamp_us, x, y, confidence = GAZE_MESSAGE.unpack(message)
+                    self._publish_gaze(x, y, confidence, timestamp_us, received_ns, latest=i == len(gaze) - 1)
             except (ConnectionResetError, ConnectionAbortedError, ConnectionError) as e:
                 print(f"连接已断开: {e}")
                 break
@@ -115,60 +383,189 @@ class TCPClient:
                 break
         
         # Clean up after the loop ends
-        if self.client_socket:
-            self.client_socket.close()
-            self.client_socket = None
+        self._close_socket()
         print("接收循环结束。将尝试重新连接。")
 
+    def _writer_loop(self):
+        """Drain the send queue, the most urgent messages first, several per sendall; also sends the pings"""
+        next_ping = 0.0
+        while self.is_running:
+            now = time.monotonic()
+            connected = self.client_socket is not None
+            ping = self.ping_interval > 0 and now >= next_ping and connected
+            # while disconnected no ping is due: wait for messages, do not spin on an old next_ping
+            wait = 0.5 if self.ping_interval <= 0 or not connected else min(0.5, max(0.0, next_ping - now))
+            batch = self.send_queue.get_batch(timeout=0 if ping else wait)
+            if ping:
+                next_ping = now + self.ping_interval
+            elif not batch:
+                continue
+            with self._write_lock:
+                sock = self.client_socket
+                if sock is None:
+                    continue  # disconnected meanwhile, the messages are lost as before
+                if ping:
+                    # t0 is taken right before the write, not when queued
+                    self._ping_seq += 1
+                    batch.insert(0, self._encode("ping", {"seq": self._ping_seq, "t0": time.monotonic_ns() // 1000}))
+                try:
+                    sock.sendall(b"".join(batch))
+                except OSError as e:
+                    print(f"发送数据时出错: {e}")
+                    # Assume the connection has been lost, wake up the receive loop to reconnect
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+
+    def _close_socket(self):
+        """Close the current connection without racing the writer thread"""
+        sock = self.client_socket
+        if sock is None:
+            return
+        self.client_socket = None  # send() refuses new messages from now on
+        try:
+            sock.shutdown(socket.SHUT_RDWR)  # unblocks a sendall stuck on a slow HoloLens
+        except OSError:
+            pass
+        with self._write_lock:
+            sock.close()
+        self.send_queue.clear()
+
+    def _dispatch(self, message, received_ns):
+        """Decode one envelope and invoke its callback; a bad message is skipped, the framing stays intact"""
+        try:
+            envelope = json.loads(str(message, 'utf-8'))
+            msg_type = envelope.get("type")
+            payload = envelope.get("payload")
+        except (UnicodeDecodeError, ValueError, AttributeError) as e:
+            print(f"警告: 无法解析的消息，已丢弃: {e}")
+            return
+
+        if msg_type == "gaze":
+            # JSON gaze, e.g. {"x": 320, "y": 240}
+            try:
+                pos = json.loads(payload)
+                self._publish_gaze(float(pos['x']), float(pos['y']), 1.0, None, received_ns)
+            except (TypeError, ValueError, KeyError) as e:
+                print(f"警告: 无法解析的眼动数据: {e}")
+            return
+        if msg_type == "pong":
+            try:
+                pong = json.loads(payload)
+                self.clock.add(pong['t0'], pong['t1'], pong['t2'], received_ns // 1000)
+            except (TypeError, ValueError, KeyError) as e:
+                print(f"警告: 无法解析的pong: {e}")
+            return
+
+        # Invoke the registered callback function
+        if msg_type in self.callbacks:
+            try:
+                if msg_type in self._timestamped:
+                    self.callbacks[msg_type](payload, received_ns)
+                else:
+                    self.callbacks[msg_type](payload)
+            except Exception as e:
+                print(f"处理消息 '{msg_type}' 时发生错误: {e}")
+        else:
+            print(f"警告: 收到未注册回调的消息类型 '{msg_type}'")
+
+    def _publish_gaze(self, x, y, confidence, timestamp_us, received_ns, latest=True):
+        pc_time_us = None if timestamp_us is None else self.clock.to_local_us(timestamp_us)
+        if pc_time_us is None:
+            estimate = self.clock.estimate
+            pc_time_us = received_ns / 1000.0 - (estimate[0] / 2.0 if estimate else 0.0)
+        sample = GazeSample(x, y, confidence, timestamp_us, received_ns, pc_time_us)
+        if latest:
+            self.gaze.put(sample)
+        callback = self.callbacks.get("gaze")
+        if callback:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"处理消息 'gaze' 时发生错误: {e}")
+
+    def latest_gaze(self):
+        """
+        Newest gaze sample, without waiting; safe to call from any thread
+        Returns:
+            GazeSample: None if no gaze has been received yet
+        """
+        return self.gaze.peek()
+
+    def clock_stats(self):
+        """
+        Returns:
+            dict: offset_ms (headset clock minus PC clock), rtt_ms (best recent round trip),
+                last_rtt_ms and the number of samples; None values until the first pong
+        """
+        return self.clock.stats()
+
+    @staticmethod
+    def _encode(msg_type, payload):
+        """Length-prefixed envelope"""
+        # 无论payload是什么，都先将其转换为字符串（如果是字典/列表，则转换为JSON字符串）
+        if isinstance(payload, (dict, list)):
+            payload_str = json.dumps(payload)
+        else:
+            payload_str = str(payload)
+
+        envelope = {
+            "type": msg_type,
+            "payload": payload_str
+        }
+        message = json.dumps(envelope)
+
+        encoded_message = message.encode('utf-8')
+        return LENGTH_PREFIX.pack(len(encoded_message)) + encoded_message
+
     def send(self, msg_type, payload):
         """
         Send data to the connected Hololens server (str, dict, list)。
+        Never blocks: the message is queued for the writer thread (see SEND_POLICIES)
+        Returns:
+            bool: False if not connected or the message was dropped because the queue is full
         """
         if not self.is_client_connected():
             print("无法发送数据，未连接到服务器。")
             return False
 
-        try:
-            # 无论payload是什么，都先将其转换为字符串（如果是字典/列表，则转换为JSON字符串）
-            if isinstance(payload, (dict, list)):
-                payload_str = json.dumps(payload)
-            else:
-                payload_str = str(payload)
-
-            envelope = {
-                "type": msg_type,
-                "payload": payload_str
-            }
-            message = json.dumps(envelope)
-            
-            encoded_message = message.encode('utf-8')
-            length_prefix = len(encoded_message).to_bytes(4, 'big')
+        return self.send_queue.put(msg_type, self._encode(msg_type, payload))
 
-            self.client_socket.sendall(length_prefix + encoded_message)
-            return True
-        except Exception as e:
-            print(f"发送数据时出错: {e}")
-            # Assume the connection has been lost
-            if self.client_socket:
-                self.client_socket.close()
-                self.client_socket = None
+    def flush(self, timeout=1.0):
+        """
+        Wait until the queued messages have been written
+        Returns:
+            bool: False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while not self.send_queue.empty():
+            if not self.is_client_connected() or time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        # the last batch may still be in sendall
+        if not self._write_lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
             return False
+        self._write_lock.release()
+        return True
 
     def is_client_connected(self):
         """Check whether any client is currently connected"""
         return self.client_socket is not None and self.is_running
     
     def stop(self):
-        """Stop the client and close the connection."""
+        """Stop the client and close the connection, a second call does nothing."""
+        if not self.is_running and self.connection_thread is None and self.writer_thread is None:
+            return
         print("正在停止TCP客户端...")
+        if self.is_client_connected():
+            self.flush(timeout=1.0)  # e.g. the last subtitle
         self.is_running = False
-        if self.client_socket:
-            try:
-                self.client_socket.shutdown(socket.SHUT_RDWR)
-                self.client_socket.close()
-            except OSError as e:
-                print(f"关闭套接字时出错: {e}")
+        self.send_queue.close()
+        self._close_socket()
         if self.connection_thread:
             self.connection_thread.join() # Wait for the thread to finish
-        self.client_socket = None
+        if self.writer_thread:
+            self.writer_thread.join()
+        self.connection_thread = self.writer_thread = None
         print("TCP客户端已停止。")
@@ -1,46 +1,59 @@
 # -*- coding: utf-8 -*-
 
-import pyrealsense2 as rs
 import numpy as np
 import cv2
 import time
 import json
 import threading
-from ultralytics import YOLO
 
 import ar_system.Img_sender as Img_sender
 from ar_system.tcp_manager import TCPClient
 from ar_system.eeg_processor import EEGProcessor  
+from ar_system.startup import StartupOrchestrator
+from ar_system.quality_controller import AdaptiveQualityController
+from ar_system.tile_codec import TileDeltaEncoder
+from ar_system.foveated_codec import FoveatedEncoder
+from ar_system.image_codecs import fastest_jpeg_codec
+from ar_system.overlay import OverlayFrame, render_overlay
+from ar_system.gaze_history import GazeHistory
+from ar_system.model_manager import SegmentationModelManager
+from ar_system.frame_pipeline import RealSenseCapture, InferenceWorker, PipelineStats
+from ar_system.object_tracker import ObjectTracker, LabelMap, crop_mask
 
 # please check the file path correctly
+# pyrealsense2 and ultralytics (torch) are imported where they are first used,
+# see tests/check_import_time.py for the import-time budget of each entry point
 
 
 USE_EEG = False # use EEG singal
+USE_TRIGGER = False # send event markers to the EEG recording through the Neuracle TriggerBox
+TRIGGER_PORT = "COM3"
+# Extra video viewers (operator monitor, recorder, ...) as (host, port); they get full frames
+# at a fixed quality, encoded once for all of them, and can also be added at runtime with video_stream.subscribe()
+MONITOR_VIEWERS = []
+# Send contours, highlight and dwell progress as a vector "overlay" TCP message the headset draws
+# (unity/OverlayRenderer.cs) and keep the video clean; False burns them into the video pixels
+VECTOR_OVERLAY = True
+
+# Event markers written into the EEG recording
+MARKER_TASK_START = 1
+MARKER_COMMAND_RECEIVED = 2
+MARKER_TARGET_SELECTED = 3
+MARKER_TASK_DONE = 4
 handshake_event = threading.Event()  
 hololens_command_received = None  
-gaze_position = (-1, -1)
-
-
-
-def calculate_iou(box1, box2):
-    """Calculate the IoU of two rectangles for target tracking"""
-    x1, y1, x2, y2 = box1
-    x3, y3, x4, y4 = box2
-    
-    xi1 = max(x1, x3)
-    yi1 = max(y1, y3)
-    xi2 = min(x2, x4)
-    yi2 = min(y2, y4)
-    
-    inter_area = max(0, xi2 - xi1) * max(0, yi2 - yi1)
-    
-    box1_area = (x2 - x1) * (y2 - y1)
-    box2_area = (x4 - x3) * (y4 - y3)
-    
-    union_area = box1_area + box2_area - inter_area
-    
-    iou = inter_area / union_area if union_area > 0 else 0
-    return iou
+quality_controller = AdaptiveQualityController(target_kbps=20000, frame_budget_ms=15.0, fps=30)
+# libjpeg-turbo when PyTurboJPEG is installed, see tests/bench_codecs.py
+jpeg_codec = fastest_jpeg_codec()
+# Static scenes only send the tiles that changed, plus a keyframe every 2 s
+tile_encoder = TileDeltaEncoder(tile_size=64, keyframe_interval=60, codec=jpeg_codec)
+# While gaze samples arrive, the area around the gaze point keeps full detail and the
+# periphery is sent downscaled; without them frames go through tile_encoder
+frame_encoder = FoveatedEncoder(roi_fraction=0.35, periphery_scale=0.5, fallback=tile_encoder, codec=jpeg_codec)
+# Recent gaze samples in the PC clock, so each frame is hit-tested with the gaze at its capture time
+gaze_history = GazeHistory(capacity=512)
+
+
 
 def handle_hololens_acknowledgment(payload):
     """Handle confirmation messages from Hololens2"""
@@ -54,17 +67,80 @@ def handle_hololens_command(payload):
     print(f"[CALLBACK] 收到HoloLens指令: '{payload}'")
     hololens_command_received = payload
 
-def handle_gaze_position(payload):
-    """Process gaze coordinate messages from Hololens2"""
-    global gaze_position
+def handle_gaze_position(sample):
+    """Process gaze samples from Hololens2 (GazeSample, every sample of a burst)"""
+    gaze_history.push_sample(sample)
+    frame_encoder.set_gaze(sample.x / WIDTH, sample.y / HEIGHT)
+
+def handle_stream_feedback(payload):
+    """
+    Process video stream feedback from Hololens2 (UDPImageReceiver.cs, once per second and on keyframe requests):
+    {"loss": frame loss of the last second, -1 if not measured, "keyframe": the headset needs a keyframe}
+    """
     try:
-        pos_data = json.loads(payload)
-        gaze_position = (pos_data['x'], pos_data['y'])
-    except (json.JSONDecodeError, KeyError):
+        feedback = json.loads(payload)
+        if feedback.get('keyframe'):
+            frame_encoder.request_keyframe()
+        if float(feedback.get('loss', -1)) >= 0:
+            quality_controller.on_receiver_feedback(loss=float(feedback['loss']))
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
         pass
 
 
 
+def start_camera(width, height, fps):
+    """Start the RealSense color stream and return the running pipeline"""
+    import pyrealsense2 as rs
+    pipeline = rs.pipeline()
+    config = rs.config()
+    config.enable_stream(rs.stream.color, width, height, rs.format.bgr8, fps)
+    pipeline.start(config)
+    return pipeline
+
+def detect_objects(seg_model, image):
+    """Segment one frame into [{"box": xyxy, "mask": CroppedMask}], runs on the inference thread"""
+    results = seg_model(image, verbose=False)[0]
+    if results.masks is None:
+        return []
+    # one device-to-host copy for all boxes and all masks, thresholded on the device
+    boxes = results.boxes.xyxy.cpu().numpy()
+    masks = (results.masks.data > 0.5).cpu().numpy()
+    # only the box of every mask is kept, the full-frame masks are freed with this frame
+    return [{"box": box, "mask": crop_mask(mask, box)} for box, mask in zip(boxes, masks)]
+
+def connect_eeg():
+    """Connect the EEG processor, raising if the data server is unreachable"""
+    eeg_processor = EEGProcessor(srate=500, n_chan=9)
+    if not eeg_processor.connect(ip="127.0.0.1", port=8712):
+        raise ConnectionError("EEG模块连接失败")
+    return eeg_processor
+
+def connect_trigger_box(port):
+    """Open the TriggerBox and start its non-blocking output queue"""
+    from neuracle_lib.triggerBox import TriggerBox, AsyncTriggerOutput
+    trigger_output = AsyncTriggerOutput(TriggerBox(port))
+    trigger_output.start()
+    return trigger_output
+
+def connect_hololens(tcp_server, timeout):
+    """
+    Start the TCP client and wait until HoloLens is connected; the client keeps
+    reconnecting in the background after this gives up
+    Args:
+        timeout (float): seconds to wait, the startup timeout of the subsystem
+    """
+    tcp_server.start()
+    deadline = time.monotonic() + timeout
+    while not tcp_server.is_client_connected():
+        if not tcp_server.is_running:
+            raise ConnectionError("TCP客户端已停止")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{timeout:g}s内未连接")
+        time.sleep(0.1)
+    return tcp_server
+
+
+
 if __name__ == "__main__":
 
     HOLOLENS_IP = "127.0.0.1"
@@ -72,33 +148,64 @@ if __name__ == "__main__":
     TCP_PORT = 9998
     WIDTH, HEIGHT, FPS = 640, 480, 30
 
-    
-    eeg_processor = None
-    if USE_EEG:
-        print("[INFO] 正在尝试启用EEG增强模式...")
-        eeg_processor = EEGProcessor(srate=500, n_chan=9) 
-        if not eeg_processor.connect(ip="127.0.0.1", port=8712):
-            print("[警告] EEG模块连接失败，系统将以无脑电模式运行。")
-            eeg_processor = None
-    else:
-        print("[INFO] EEG功能已禁用，系统将以纯视觉模式运行。")
-
+    # Persistent, MTU-sized UDP senders for the whole video stream, paced per receiver.
+    # Encoding and sending run on their own workers: the loops below only drop the latest frame in.
+    # Protocol v2: frame IDs, capture timestamps and one XOR parity packet per 8 data packets.
+    # Every frame is encoded once per tier and fanned out to that tier's receivers.
+    # HoloLens tier: JPEG quality and resolution follow the link through quality_controller
+    # (see quality_controller.stats()) and frame_encoder sends a gaze-foveated frame, or keyframes plus the tiles that changed
+    video_stream = Img_sender.FanoutImageSender(protocol=2, fec_group=8)
+    video_stream.add_tier("hololens", codec=jpeg_codec, frame_encoder=frame_encoder, controller=quality_controller)
+    video_stream.subscribe(HOLOLENS_IP, UDP_PORT, tier="hololens", rate_mbps=100.0)
+    video_stream.add_tier("monitor", quality=50, codec=jpeg_codec)
+    for viewer_host, viewer_port in MONITOR_VIEWERS:
+        video_stream.subscribe(viewer_host, viewer_port, tier="monitor", rate_mbps=50.0)
+    image_sender = Img_sender.AsyncImageSender(video_stream)
+
+    # Loaded and warmed up once during startup, every task reuses the same instance
+    seg_model_manager = SegmentationModelManager("assets/yolov8n-seg.pt", WIDTH, HEIGHT, warmup_runs=3)
 
-    pipeline = rs.pipeline()
-    config = rs.config()
-    config.enable_stream(rs.stream.color, WIDTH, HEIGHT, rs.format.bgr8, FPS)
-    pipeline.start(config)
-    
     tcp_server = TCPClient(HOLOLENS_IP, TCP_PORT)
     tcp_server.register_callback("ack", handle_hololens_acknowledgment)
     tcp_server.register_callback("command", handle_hololens_command)
     tcp_server.register_callback("gaze", handle_gaze_position)
-    tcp_server.start()
-
-    print("[INFO] 系统初始化完成。等待HoloLens连接...")
-    while not tcp_server.is_client_connected():
-        time.sleep(1)
-    print("[INFO] HoloLens 已成功连接！")
+    tcp_server.register_callback("stream_feedback", handle_stream_feedback)
+
+    # Model load/warmup, camera, EEG and HoloLens come up concurrently,
+    # so startup takes as long as the slowest subsystem rather than their sum
+    print("[INFO] 系统初始化中。等待相机、分割模型和HoloLens连接...")
+    startup = StartupOrchestrator()
+    # stop_func releases a subsystem that came up only after its timeout and was never used
+    startup.add("camera", lambda: start_camera(WIDTH, HEIGHT, FPS), timeout=10.0, stop_func=lambda p: p.stop())
+    startup.add("model", seg_model_manager.load, timeout=60.0, required=False)
+    # optional and reconnected in the background anyway: do not hold up the launch for the headset
+    startup.add("hololens", lambda: connect_hololens(tcp_server, timeout=5.0), timeout=5.0, required=False,
+                stop_func=lambda client: client.stop())
+    if USE_EEG:
+        print("[INFO] 正在尝试启用EEG增强模式...")
+        startup.add("eeg", connect_eeg, timeout=10.0, required=False, stop_func=lambda e: e.stop())
+    else:
+        print("[INFO] EEG功能已禁用，系统将以纯视觉模式运行。")
+    if USE_TRIGGER:
+        startup.add("trigger", lambda: connect_trigger_box(TRIGGER_PORT), timeout=10.0, required=False,
+                    stop_func=lambda t: t.stop())
+
+    startup_ok = startup.run()
+    pipeline = startup.result("camera")
+    eeg_processor = startup.result("eeg") if USE_EEG else None
+    # AsyncTriggerOutput.output_event_data() only enqueues, so markers cost microseconds in the loops below
+    trigger_output = startup.result("trigger") if USE_TRIGGER else None
+    if USE_EEG and eeg_processor is None:
+        print("[警告] EEG模块连接失败，系统将以无脑电模式运行。")
+    if not startup_ok:
+        print("[ERROR] 相机启动失败，程序退出。")
+        tcp_server.stop()
+        startup.shutdown()
+        raise SystemExit(1)
+    if startup.result("hololens"):
+        print("[INFO] HoloLens 已成功连接！")
+    else:
+        print("[警告] HoloLens 尚未连接，TCP客户端将在后台继续重试。")
 
     try:
         while True:
@@ -106,13 +213,16 @@ if __name__ == "__main__":
             # Phase 1: Idle and Waiting 
             # =================================================
             print("\n----------------------------------------------------")
+            print(f"[INFO] 视频流工作点: {quality_controller.stats()}")
+            print(f"[INFO] 视频流接收端: {video_stream.subscriber_stats()}")
+            print(f"[INFO] HoloLens时钟偏移/往返时延: {tcp_server.clock_stats()}")
             print("[STATE] 空闲模式: 按下【空格键】开始新一轮任务，按【ESC】退出。")
             while True:
                 frames = pipeline.wait_for_frames()
                 color_frame = frames.get_color_frame()
                 if not color_frame: continue
                 idle_image = np.asanyarray(color_frame.get_data())
-                Img_sender.send_image(idle_image, HOLOLENS_IP, UDP_PORT)
+                image_sender.submit(idle_image)
                 cv2.putText(idle_image, "IDLE: Press SPACE to Start", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
                 cv2.imshow("PC Main Control", idle_image)
                 key = cv2.waitKey(1) & 0xFF
@@ -126,6 +236,7 @@ if __name__ == "__main__":
             hololens_command_received = None
             handshake_event.clear()
             tcp_server.send("start_signal", "")
+            if trigger_output: trigger_output.output_event_data(MARKER_TASK_START)
             if not handshake_event.wait(timeout=5.0):
                 print("[ERROR] 握手超时，返回空闲模式。")
                 continue
@@ -136,7 +247,7 @@ if __name__ == "__main__":
                 color_frame = frames.get_color_frame()
                 if not color_frame: continue
                 wait_image = np.asanyarray(color_frame.get_data())
-                Img_sender.send_image(wait_image, HOLOLENS_IP, UDP_PORT)
+                image_sender.submit(wait_image)
                 cv2.putText(wait_image, "WAITING FOR COMMAND...", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
                 cv2.imshow("PC Main Control", wait_image)
                 if cv2.waitKey(1) & 0xFF == 27: raise KeyboardInterrupt
@@ -144,13 +255,16 @@ if __name__ == "__main__":
             # =================================================
             # Phase 4: Real-time EEG-integrated Interaction
             # =================================================
+            if trigger_output: trigger_output.output_event_data(MARKER_COMMAND_RECEIVED)
             print(f"[STATE] 收到指令'{hololens_command_received}': 进入【EEG增强】实时交互模式...")
             tcp_server.send("subtitle", "请用您的视线选择一个目标。")
 
             is_object_selected = False
             final_selected_tracker = None
-            tracked_objects = {}
-            next_track_id = 0
+            # interact only with objects that have appeared stably for at least three frames
+            object_tracker = ObjectTracker(iou_threshold=0.3, patience=15, min_hits=3)
+            # the stable tracks' masks fused into one label image, hit-tested with the gaze point
+            label_map = LabelMap(WIDTH, HEIGHT)
             
             gaze_hover_start_time = 0
             highlighted_track_id = -1
@@ -160,124 +274,111 @@ if __name__ == "__main__":
             BASE_DWELL_TIME = 2.5       # Default selection time 
             MAX_REDUCTION = 1.2         # Reduced duration when attention is maximal
             
-            try:
-                seg_model = YOLO("assets/yolov8n-seg.pt")
-                print("[INFO] 分割模型yolov8n-seg.pt加载成功！")
-            except Exception as e:
-                print(f"[ERROR] 加载分割模型失败: {e}。")
+            # A model that finished loading after its startup timeout is picked up here,
+            # one whose load failed is loaded again
+            seg_model = seg_model_manager.get()
+            if seg_model is None:
+                print("[ERROR] 分割模型未加载，无法进入交互模式。")
                 continue
 
-            while not is_object_selected:
-                frames = pipeline.wait_for_frames()
-                color_frame = frames.get_color_frame()
-                if not color_frame: continue
-                frame = np.asanyarray(color_frame.get_data())
-
-                # --- Phase 4.1: Fetch the detection results for the current frame ---
-                results = seg_model(frame, verbose=False)[0]
-                current_detections = []
-                if results.masks is not None:
-                    for i in range(len(results.masks.data)):
-                        current_detections.append({
-                            "box": results.boxes.xyxy[i].cpu().numpy().flatten(),
-                            "mask": results.masks.data[i].cpu().numpy() > 0.5
-                        })
-
-                # --- Phase 4.2: Update the Object-tracking list  ---
-                unmatched_detections = list(range(len(current_detections)))
-                
-                # Update the coordinates of existing objects 
-                for track_id, tobj in list(tracked_objects.items()):
-                    tobj["last_seen"] += 1
-                    best_match_iou = 0.3
-                    best_match_idx = -1
-                    for det_idx in unmatched_detections:
-                        iou = calculate_iou(tobj["box"], current_detections[det_idx]["box"])
-                        if iou > best_match_iou:
-                            best_match_iou = iou
-                            best_match_idx = det_idx
-                    if best_match_idx != -1:
-                        tracked_objects[track_id].update({
-                            "box": current_detections[best_match_idx]["box"],
-                            "mask": current_detections[best_match_idx]["mask"],
-                            "last_seen": 0, "hits": tobj["hits"] + 1
-                        })
-                        unmatched_detections.remove(best_match_idx)
-                
-                # Delete old objects
-                for track_id, tobj in list(tracked_objects.items()):
-                    if tobj["last_seen"] > 15: # patience is 15
-                        del tracked_objects[track_id]
-                
-                # Add new objects
-                for det_idx in unmatched_detections:
-                    tracked_objects[next_track_id] = {
-                        "box": current_detections[det_idx]["box"],
-                        "mask": current_detections[det_idx]["mask"],
-                        "last_seen": 0, "hits": 1
-                    }
-                    next_track_id += 1
-
-                # --- Phase 4.3: Render EEG-enhanced interactions ---
-                is_gazing_at_object = False
+            # Capture, inference and this render loop run as pipelined stages (ar_system/frame_pipeline.py),
+            # handing over only the newest frame. With VECTOR_OVERLAY the clean video is streamed
+            # from the capture thread at the camera rate, the overlay follows at the inference rate.
+            # captured frames are read-only and shared, so the sender keeps them without a copy
+            stream_clean = (lambda f: image_sender.submit(f.image, copy=False, capture_ts_us=f.capture_ts_us)) if VECTOR_OVERLAY else None
+            capture = RealSenseCapture(pipeline, on_frame=stream_clean).start()
+            inference = InferenceWorker(lambda image: detect_objects(seg_model, image), capture.frames).start()
+            pipeline_stats = PipelineStats()
+            try:
+                while not is_object_selected:
+                    # --- Phase 4.1: Fetch the detection results of the newest frame ---
+                    result = inference.results.get(timeout=0.1)
+                    if result is None:
+                        if cv2.waitKey(1) & 0xFF == 27: raise KeyboardInterrupt
+                        continue
+                    render_start = time.perf_counter()
+                    # the captured image is shared with the sender, draw on a copy
+                    frame, capture_ts_us = result.frame.image.copy(), result.frame.capture_ts_us
+                    current_detections = result.detections
+                    overlay = OverlayFrame(capture_ts_us, frame.shape[1], frame.shape[0])
+
+                    # --- Phase 4.2: Update the Object-tracking list  ---
+                    object_tracker.update([d["box"] for d in current_detections],
+                                          [d["mask"] for d in current_detections])
+
+                    # --- Phase 4.3: Render EEG-enhanced interactions ---
+                    is_gazing_at_object = False
                 
-                # --- At the start of the interaction loop,get the focus score ---
-                focus_score = 0.5 # A safe default value 
-                if eeg_processor: 
-                    focus_score = eeg_processor.get_focus_score()
+                    # --- At the start of the interaction loop,get the focus score ---
+                    focus_score = 0.5 # A safe default value 
+                    if eeg_processor: 
+                        focus_score = eeg_processor.get_focus_score()
                 
-                # --- Calculate the current frame's dynamic selection time based on focus level ---
-                dynamic_select_time = BASE_DWELL_TIME - (focus_score * MAX_REDUCTION)
-
-                for track_id, tobj in tracked_objects.items():
-                    # interact only with objects that have appeared stably for at least three consecutive frames
-                    if tobj["hits"] < 3: continue 
-
-                    mask = tobj["mask"]
-                    mask_uint8 = (mask * 255).astype(np.uint8)
-                    contours, _ = cv2.findContours(mask_uint8, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    cv2.drawContours(frame, contours, -1, (255, 0, 0), 2) # blue contour
-
-                    mx, my = gaze_position
-                    if 0 <= my < frame.shape[0] and 0 <= mx < frame.shape[1] and mask[my, mx]:
-                        is_gazing_at_object = True
-                        if highlighted_track_id != track_id:
-                            highlighted_track_id = track_id
-                            gaze_hover_start_time = time.time()
+                    # --- Calculate the current frame's dynamic selection time based on focus level ---
+                    dynamic_select_time = BASE_DWELL_TIME - (focus_score * MAX_REDUCTION)
+                    # the gaze when the frame was captured, not the newest one: inference took a while.
+                    # During a fixation its centroid, steadier on mask edges than a single sample
+                    fixation = gaze_history.fixation(t_us=capture_ts_us)
+                    gaze = (fixation.x, fixation.y) if fixation else gaze_history.at(capture_ts_us)
+                    mx, my = (int(gaze[0]), int(gaze[1])) if gaze else (-1, -1)
+
+                    confirmed_tracks = object_tracker.confirmed()
+                    label_map.update(confirmed_tracks)
+                    gazed_track = label_map.at(mx, my)
+                    gazed_track_id = gazed_track[0] if gazed_track else -1
+
+                    for track_id, _, crop in confirmed_tracks:
+                        # contours of the crop, offset back to frame coordinates
+                        contours, _ = cv2.findContours(crop.mask.view(np.uint8), cv2.RETR_EXTERNAL,
+                                                       cv2.CHAIN_APPROX_SIMPLE, offset=(crop.x, crop.y))
+                        highlighted = False
+
+                        if track_id == gazed_track_id:
+                            is_gazing_at_object = True
+                            if highlighted_track_id != track_id:
+                                highlighted_track_id = track_id
+                                gaze_hover_start_time = time.time()
                         
-                        hover_duration = time.time() - gaze_hover_start_time
+                            hover_duration = time.time() - gaze_hover_start_time
                         
-                        # Calculate the progress bar using dynamic timing
-                        progress = min(hover_duration / dynamic_select_time, 1.0)
-                        bar_width = 100; bar_height = 10
-                        bar_x = mx + 20; bar_y = my - 20
-                        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (100, 100, 100), -1)
-                        fill_color = (0, 255, 0) if hover_duration > HOVER_TO_HIGHLIGHT_TIME else (255, 255, 255) 
-                        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + int(bar_width * progress), bar_y + bar_height), fill_color, -1)
-                        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (255, 255, 255), 1)
+                            # Calculate the progress bar using dynamic timing
+                            progress = min(hover_duration / dynamic_select_time, 1.0)
+                            overlay.set_progress(track_id, mx, my, progress, hover_duration > HOVER_TO_HIGHLIGHT_TIME)
                         
-                        # Use dynamic time for judgment
-                        if hover_duration > dynamic_select_time:
-                            print(f"此时专注度为{focus_score}")
-                            is_object_selected = True
-                            ys, xs = np.where(mask)
-                            x1, y1, x2, y2 = np.min(xs), np.min(ys), np.max(xs), np.max(ys)
-                            final_selected_tracker = cv2.TrackerCSRT_create()
-                            final_selected_tracker.init(frame, (x1, y1, x2 - x1, y2 - y1))
-                            tcp_server.send("selection_confirmed", "")
-                            tcp_server.send("subtitle", f"已锁定目标，准备执行任务。")
-                            break
-                        elif hover_duration > HOVER_TO_HIGHLIGHT_TIME:
-                            # highlight object 
-                            frame[mask] = frame[mask] * 0.5 + np.array([0, 255, 0]) * 0.5
+                            # Use dynamic time for judgment
+                            if hover_duration > dynamic_select_time:
+                                if trigger_output: trigger_output.output_event_data(MARKER_TARGET_SELECTED)
+                                print(f"此时专注度为{focus_score}")
+                                is_object_selected = True
+                                ys, xs = np.where(crop.mask)
+                                x1, y1 = crop.x + np.min(xs), crop.y + np.min(ys)
+                                x2, y2 = crop.x + np.max(xs), crop.y + np.max(ys)
+                                final_selected_tracker = cv2.TrackerCSRT_create()
+                                final_selected_tracker.init(frame, (x1, y1, x2 - x1, y2 - y1))
+                                tcp_server.send("selection_confirmed", "")
+                                tcp_server.send("subtitle", f"已锁定目标，准备执行任务。")
+                                break
+                            elif hover_duration > HOVER_TO_HIGHLIGHT_TIME:
+                                # highlight object 
+                                highlighted = True
+                        overlay.add_track(track_id, contours, highlighted)
                 
-                if not is_gazing_at_object:
-                    highlighted_track_id = -1
-                if is_object_selected: break
+                    if not is_gazing_at_object:
+                        highlighted_track_id = -1
+                    if is_object_selected: break
                 
-                Img_sender.send_image(frame, HOLOLENS_IP, UDP_PORT)
-                cv2.imshow("PC Main Control", frame)
-                if cv2.waitKey(1) & 0xFF == 27: raise KeyboardInterrupt
+                    if VECTOR_OVERLAY and tcp_server.is_client_connected():
+                        tcp_server.send("overlay", overlay.to_json())
+                    render_overlay(frame, overlay.to_dict())
+                    if not VECTOR_OVERLAY:
+                        image_sender.submit(frame, copy=False, capture_ts_us=capture_ts_us)
+                    cv2.imshow("PC Main Control", frame)
+                    pipeline_stats.add(capture_ts_us, render_start)
+                    if cv2.waitKey(1) & 0xFF == 27: raise KeyboardInterrupt
+            finally:
+                inference.stop()
+                capture.stop()  # Phase 5 reads the camera directly again
+                print(f"[INFO] 交互流水线: {pipeline_stats.report(capture, inference)}")
 
             # =================================================
             # Phase 5: Execute the final task 
@@ -305,10 +406,11 @@ if __name__ == "__main__":
                         cv2.putText(frame, "TRACKING LOST", (100, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
 
                     # Keep the display updated
-                    Img_sender.send_image(frame, HOLOLENS_IP, UDP_PORT)
+                    image_sender.submit(frame)
                     cv2.imshow("PC Main Control", frame)
                     if cv2.waitKey(1) & 0xFF == 27: raise KeyboardInterrupt
                 
+                if trigger_output: trigger_output.output_event_data(MARKER_TASK_DONE)
                 print("[SUCCESS] 任务执行完毕。")
                 tcp_server.send("subtitle", "任务已完成。")
                 time.sleep(2) 
@@ -323,8 +425,12 @@ if __name__ == "__main__":
         # =================================================
         print("[INFO] 正在关闭所有服务...")
         pipeline.stop()
+        image_sender.close()
         tcp_server.stop()
         if eeg_processor: 
             eeg_processor.stop()
+        if trigger_output:
+            trigger_output.stop()
+        startup.shutdown()
         cv2.destroyAllWindows()
         print("[INFO] 程序已安全退出。")
\ No newline at end of file
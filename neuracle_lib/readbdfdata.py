@@ -13,7 +13,7 @@
 
 # Copyright (c) 2016 Neuracle, Inc. All Rights Reserved. http://neuracle.cn/
 
-import mne,os,re
+import os,re
 import numpy as np
 
 def read_annotations_bdf(annotations):
@@ -67,6 +67,7 @@ def readbdfdata(filename, pathname):
     raw, mne Raw object
 
     '''
+    import mne  # imported here so that read_annotations_bdf() does not pull in mne
     raw = []
     if 'edf' in filename[0]:  ## DSI
         raw = mne.io.read_raw_edf(os.path.join(pathname[0],filename[0]))
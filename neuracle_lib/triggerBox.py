@@ -7,11 +7,17 @@
 # 	v0.1: 2020-02-20, orignal
 #   v1.0：2022-12-02， add TriggerIn
 #   v2.0: 2024-04-25,  support Mac
+#   v2.1: 2026-10-18,  add AsyncTriggerOutput (non-blocking trigger queue)
+#   v2.2: 2026-10-18,  cache device metadata and sensor parameters, add configure_sensors
 # Copyright (c) 2020 Neuracle, Inc. All Rights Reserved. http://neuracle.cn/
 
 import serial
 import serial.tools.list_ports  # need to pip packet 'pyserial'
+import os
 import time
+import threading
+import queue
+from collections import deque
 from ctypes import *
 
 '''
@@ -90,16 +96,37 @@ class TriggerBox(object):
     _deviceID = 1
     _sensor_info = []
 
-    def __init__(self, serial_name):
+    def __init__(self, serial_name, verbose=False):
         self._serial_name = serial_name
+        self._verbose = verbose
         self._port_list = self.refresh_serial_list()
         self._device_comport_handle = None
+        # serializes request/response pairs, e.g. AsyncTriggerOutput's writer thread vs. configuration calls
+        self._serial_lock = threading.RLock()
         self._device_name = None
         self._device_info = None
-        self.validate_device()
-        self.get_device_name()
+        self._sensor_info = []
+        # sensorID -> PackageSensorPara, filled by discover_sensors and kept in sync by every set
+        self._sensor_para = {}
+        # discover_sensors runs on the first use of the parameter cache, not here: an event-only
+        # TriggerBox needs none of it and must not fail on a sensor query
+        self._discovered = False
+        # validate_device already caches the device name, so it is not requested a second time
+        if not self.validate_device():
+            raise Exception("Invalid TriggerBox device: %s" % (self._serial_name))
         self.get_device_info()
-        # self.get_sensor_info()
+
+    @property
+    def device_name(self):
+        return self._device_name
+
+    @property
+    def device_info(self):
+        return self._device_info
+
+    @property
+    def sensor_info(self):
+        return self._sensor_info
 
     def refresh_serial_list(self):
         return list(serial.tools.list_ports.comports())
@@ -126,8 +153,7 @@ class TriggerBox(object):
         cmd.deviceID = self._deviceID
         cmd.functionID = self.functionIDDeviceNameGet
         cmd.payload = 0
-        self.send(cmd)
-        data = self.read(cmd.functionID)
+        data = self.query(cmd, cmd.functionID)
         # data[0] = deviceID, data[1] = functionID, data[2:3] = payload,device_name = str(data[4:])
         device_name = str(data)
         return device_name
@@ -139,8 +165,7 @@ class TriggerBox(object):
         cmd.frame.functionID = self.functionIDDeviceInfoGet
         # cmd.frame.payload = len(cmd.command)
         cmd.frame.payload = 1
-        self.send(cmd)
-        data = self.read(cmd.frame.functionID)
+        data = self.query(cmd, cmd.frame.functionID)
         '''
             # rspPayload = data[2] | (data[3] << 8)
             # print("getDeviceInfo response payload : %d" % (rspPayload))
@@ -170,7 +195,7 @@ class TriggerBox(object):
             return "Undefined"
         return self.sensorTypeMap[sensorType]
 
-    def get_sensor_info(self):
+    def get_sensor_info(self, show=True):
         '''
         a little strange:
         SensorType :           Light, SensorNum: 1
@@ -189,19 +214,41 @@ class TriggerBox(object):
         cmd.deviceID = self._deviceID
         cmd.functionID = self.functionIDSensorInfoGet
         cmd.payload = 0
-        self.send(cmd)
-        info = self.read(cmd.functionID)
+        info = self.query(cmd, cmd.functionID)
         if len(info) % 2 != 0:
             raise Exception("Response length is not correct %d" % (len(info)))
+        self._sensor_info = []
+        self._sensor_para = {}
         for i in range(int(len(info) / 2)):
             sensorTypeIdx = info[i * 2]
             sensorNum = info[i * 2 + 1]
             sensorType = self._getSensorTypeString(sensorTypeIdx)
-            print("SensorType : %15s, SensorNum: %d " % (sensorType, sensorNum))
+            if show:
+                print("SensorType : %15s, SensorNum: %d " % (sensorType, sensorNum))
             self._sensor_info.append(dict(Type=sensorType, Number=sensorNum))
         # print(self._sensor_info)
         return
 
+    def discover_sensors(self):
+        '''
+        One discovery pass: the sensor table, then the parameters of every defined sensor,
+        requested back to back and read together (one serial round trip for all sensors).
+        '''
+        self.get_sensor_info(show=self._verbose)
+        sensorIDs = [i for i, sensor in enumerate(self._sensor_info) if sensor['Type'] in self.sensorTypeMap.values()]
+        cmds = [self._get_sensor_para_command(sensorID) for sensorID in sensorIDs]
+        responses = self.query_batch(cmds, [self.functionIDSensorParaGet] * len(cmds))
+        for sensorID, para in zip(sensorIDs, responses):
+            if not isinstance(para, Exception):
+                self._sensor_para[sensorID] = self._parse_sensor_para(para)
+        self._discovered = True
+        return self._sensor_para
+
+    def _ensure_discovered(self):
+        '''Run the discovery pass once, on the first use of the parameter cache'''
+        if not self._discovered:
+            self.discover_sensors()
+
     def _sensor_type(self, typeString):
         if typeString == 'DigitalIN':
             typeNum = self.sensorTypeDigitalIN
@@ -225,7 +272,7 @@ class TriggerBox(object):
             raise Exception('Undefined sensor type')
         return typeNum
 
-    def get_sensor_para(self, sensorID):
+    def _get_sensor_para_command(self, sensorID):
         sensor = self._sensor_info[sensorID]
         cmd = PackageGetSensorPara()
         cmd.sensorInfo.sensorType = self._sensor_type(typeString=sensor['Type'])
@@ -233,8 +280,24 @@ class TriggerBox(object):
         cmd.frame.deviceID = 1
         cmd.frame.functionID = self.functionIDSensorParaGet
         cmd.frame.payload = 2
-        self.send(cmd)
-        para = self.read(cmd.frame.functionID)
+        return cmd
+
+    def get_sensor_para(self, sensorID):
+        '''Read the parameters from the device (and refresh the cache), see cached_sensor_para'''
+        cmd = self._get_sensor_para_command(sensorID)
+        para = self.query(cmd, cmd.frame.functionID)
+        sensorPara = self._parse_sensor_para(para)
+        self._sensor_para[sensorID] = sensorPara
+        return sensorPara
+
+    def cached_sensor_para(self, sensorID):
+        '''Parameters from the discovery pass / last successful set, read from the device only once'''
+        self._ensure_discovered()
+        if sensorID not in self._sensor_para:
+            self.get_sensor_para(sensorID)
+        return PackageSensorPara.from_buffer_copy(self._sensor_para[sensorID])
+
+    def _parse_sensor_para(self, para):
         sensorPara = PackageSensorPara()
         sensorPara.Edge = para[0]
         sensorPara.OutputChannel = para[1]
@@ -245,7 +308,7 @@ class TriggerBox(object):
         # sensorPara.Edge, sensorPara.OutputChannel, sensorPara.TriggerToBeOut, sensorPara.Threshold, sensorPara.EventData))
         return sensorPara
 
-    def set_sensor_para(self, sensorID, sensorPara):
+    def _set_sensor_para_command(self, sensorID, sensorPara):
         sensor = self._sensor_info[sensorID]
         cmd = PackageSetSensorPara()
         cmd.frame.deviceID = self._deviceID
@@ -258,14 +321,50 @@ class TriggerBox(object):
         cmd.sensorPara.TriggerToBeOut = sensorPara.TriggerToBeOut
         cmd.sensorPara.Threshold = sensorPara.Threshold
         cmd.sensorPara.EventData = sensorPara.EventData
-        self.send(cmd)
-        data = self.read(cmd.frame.functionID)
-        if data[0] == cmd.sensorInfo.sensorType and data[1] == cmd.sensorInfo.sensorNum:
+        return cmd
+
+    def _cache_if_set(self, sensorID, cmd, data):
+        if len(data) >= 2 and data[0] == cmd.sensorInfo.sensorType and data[1] == cmd.sensorInfo.sensorNum:
+            self._sensor_para[sensorID] = cmd.sensorPara
+            return True
+        return False
+
+    def set_sensor_para(self, sensorID, sensorPara):
+        cmd = self._set_sensor_para_command(sensorID, sensorPara)
+        data = self.query(cmd, cmd.frame.functionID)
+        if self._cache_if_set(sensorID, cmd, data):
             print("setSensorPara successfully...")
         else:
             print("setSensorPara failed...")
         return
 
+    def configure_sensors(self, config):
+        '''
+        Set the parameters of several sensors in one serial round trip:
+        all set requests are written at once and the responses verified together.
+        :param config: {sensorID: {'EventData': 3, 'TriggerToBeOut': 1, ...} or PackageSensorPara}
+                       missing fields keep their cached value
+        :return: {sensorID: True/False}
+        '''
+        self._ensure_discovered()
+        sensorIDs, cmds = [], []
+        for sensorID, para in config.items():
+            if isinstance(para, PackageSensorPara):
+                sensorPara = para
+            else:
+                sensorPara = self.cached_sensor_para(sensorID)
+                for field, value in para.items():
+                    setattr(sensorPara, field, value)
+            sensorIDs.append(sensorID)
+            cmds.append(self._set_sensor_para_command(sensorID, sensorPara))
+        responses = self.query_batch(cmds, [cmd.frame.functionID for cmd in cmds])
+        result = {}
+        for sensorID, cmd, data in zip(sensorIDs, cmds, responses):
+            result[sensorID] = not isinstance(data, Exception) and self._cache_if_set(sensorID, cmd, data)
+            if not result[sensorID]:
+                print("configure_sensors: sensor %d failed (%s)" % (sensorID, data))
+        return result
+
     def get_sensor_sample(self, sensorID):
         sensor = self._sensor_info[sensorID]
         cmd = PackageGetSensorPara()
@@ -274,8 +373,7 @@ class TriggerBox(object):
         cmd.frame.payload = 2
         cmd.sensorInfo.sensorType = self._sensor_type(typeString=sensor['Type'])
         cmd.sensorInfo.sensorNum = sensor['Number']
-        self.send(cmd)
-        data = self.read(cmd.frame.functionID)
+        data = self.query(cmd, cmd.frame.functionID)
         adcResult = 0
         if data[0] == cmd.sensorInfo.sensorType and data[1] == cmd.sensorInfo.sensorNum:
             adcResult = data[2] | (data[3] << 8)
@@ -285,15 +383,24 @@ class TriggerBox(object):
         return adcResult
 
     def set_event_data(self, sensorID, eventData, triggerTOBeOut=1):
-        sensorPara = self.get_sensor_para(sensorID)
+        # read-modify-write on the cached parameters: only the set request goes over the wire
+        sensorPara = self.cached_sensor_para(sensorID)
         sensorPara.TriggerToBeOut = triggerTOBeOut
         sensorPara.EventData = eventData
         self.set_sensor_para(sensorID, sensorPara)
         return
 
+    def _event_command(self, eventData):
+        cmd = PackageGetDeviceInfo()
+        cmd.command = eventData
+        cmd.frame.deviceID = self._deviceID
+        cmd.frame.functionID = self.functionIDOutputEventData
+        cmd.frame.payload = 1
+        return cmd
+
     def output_event_data(self, eventData, triggerToBeOut=1):
         '''
-
+        Blocking output: waits for the echo of the box. Use AsyncTriggerOutput from a render loop.
         :param eventData:
         :param triggerToBeOut:
         :return:
@@ -309,30 +416,104 @@ class TriggerBox(object):
         # sensorPara.EventData = eventData
         # self.set_sensor_para(sensorID, sensorPara)
 
-        cmd = PackageGetDeviceInfo()
-        cmd.command = eventData
-        cmd.frame.deviceID = self._deviceID
-        cmd.frame.functionID = self.functionIDOutputEventData
-        cmd.frame.payload = 1
-        self.send(cmd)
-        data = self.read(cmd.frame.functionID)
+        cmd = self._event_command(eventData)
+        data = self.query(cmd, cmd.frame.functionID)
         isSucceed = data[0] == self.functionIDOutputEventData
         return
 
-    def check_online(self):
-        if len(self._port_list) <= 0:
-            print("Can't find any serial port online.")
+    def write_event(self, eventData):
+        # write only, the echo is read by read_event_ack()
+        self._device_comport_handle.write(self._event_command(eventData))
+
+    def read_event_ack(self, eventData=None, max_stale=4):
+        '''
+        Read the echo of an output event.
+        :param eventData: the event that was written; echoes of other events (late echoes
+            of earlier ones) are skipped instead of being taken as this event's
+        :param max_stale: echoes skipped at most
+        '''
+        for _ in range(max_stale + 1):
+            data = self.read(self.functionIDOutputEventData)
+            if eventData is None or len(data) < 2 or data[1] == eventData:
+                return len(data) > 0 and data[0] == self.functionIDOutputEventData
+        return False
+
+    @staticmethod
+    def _is_terminal(path):
+        '''True if path opens as a terminal device, e.g. a pty (/dev/pts/N on Linux, /dev/ttysN on macOS)'''
+        if not os.path.exists(path):
             return False
+        try:
+            fd = os.open(path, os.O_RDWR | getattr(os, 'O_NOCTTY', 0) | getattr(os, 'O_NONBLOCK', 0))
+        except OSError:
+            return False
+        try:
+            return os.isatty(fd)
+        finally:
+            os.close(fd)
+
+    def check_online(self):
         for idx, p in enumerate(self._port_list):
             if p.device == self._serial_name:
                 print("Target serial [%s] port (%s) online." % (p.device, p.description))
                 return True
+        # pseudo terminals (e.g. neuracle_lib.triggerBoxEmulator) are not listed by list_ports
+        if self._is_terminal(self._serial_name):
+            print("Target serial [%s] is a terminal device not listed as a serial port." % (self._serial_name))
+            return True
+        if len(self._port_list) <= 0:
+            print("Can't find any serial port online.")
+            return False
         print("Target serial [%s] port offline.\n" % (self._serial_name))
         print("Online serial list:")
         for idx, p in enumerate(self._port_list):
             print("%s : %s" % (p.device, p.description))
         return False
 
+    def query(self, cmd, functionID):
+        with self._serial_lock:
+            self.send(cmd)
+            return self.read(functionID)
+
+    def query_batch(self, cmds, functionIDs):
+        '''
+        Write all requests back to back, then read the responses in order.
+        A failed response is returned as its Exception instead of aborting the batch.
+        After a short read or an error frame the following responses would be read at
+        the wrong offsets: the input is drained and the rest is queried one by one.
+        '''
+        responses = []
+        with self._serial_lock:
+            self._device_comport_handle.reset_input_buffer()
+            self._device_comport_handle.write(b''.join(bytes(cmd) for cmd in cmds))
+            for functionID in functionIDs:
+                try:
+                    responses.append(self.read(functionID))
+                except Exception as e:
+                    responses.append(e)
+                    break
+            if len(responses) < len(cmds):
+                self._drain_input()
+                for cmd, functionID in zip(cmds[len(responses):], functionIDs[len(responses):]):
+                    try:
+                        responses.append(self.query(cmd, functionID))
+                    except Exception as e:
+                        responses.append(e)
+                        self._drain_input()
+        return responses
+
+    def _drain_input(self, quiet=0.05):
+        '''Discard the input, including responses still arriving, until the line is quiet for `quiet` seconds'''
+        handle = self._device_comport_handle
+        saved_timeout = handle.timeout
+        handle.timeout = quiet
+        try:
+            handle.reset_input_buffer()
+            while handle.read(4096):
+                pass
+        finally:
+            handle.timeout = saved_timeout
+
     def send(self, data):
         self._device_comport_handle.flushInput()
         self._device_comport_handle.flushOutput()
@@ -343,6 +524,8 @@ class TriggerBox(object):
     def read(self, functionID):
         # self._device_comport_handle.flushOutput() # should delete (for read correct response)
         message = self._device_comport_handle.read(4)
+        if len(message) < 4:
+            raise Exception("Response error: %d of 4 header bytes before the timeout" % (len(message)))
         if message[0] != self._deviceID:
             raise Exception("Response error: request deviceID %d, return deviceID %d" % (self._deviceID, message[0]))
         if message[1] != functionID:
@@ -373,7 +556,10 @@ class TriggerBox(object):
         # print("getDeviceInfo response payload : %d" % (rspPayload))
         # recv = self._device_comport_handle.read_all()
         recv = self._device_comport_handle.read(rspPayload)
-        print(str(recv))
+        if len(recv) < rspPayload:
+            raise Exception("Response error: %d of %d payload bytes before the timeout" % (len(recv), rspPayload))
+        if self._verbose:
+            print(str(recv))
         return recv
 
     def set_audioSensor_threshold(self, sensorID):
@@ -420,18 +606,128 @@ class TriggerIn(object):
             return False
 
     def output_event_data(self, eventData):
+        self._device_comport_handle.flushInput()
+        self.write_event(eventData)
+
+    def write_event(self, eventData):
         cmd = PackageGetDeviceInfo()
         cmd.command = eventData
         cmd.frame.deviceID = 1
         cmd.frame.functionID = 225
         cmd.frame.payload = 1
-        self._device_comport_handle.flushInput()
         self._device_comport_handle.write(cmd)
 
+    def read_event_ack(self, eventData=None):
+        # TriggerIn does not echo events
+        return None
+
     def closeSerial(self):
         self._device_comport_handle.close()
 
 
+class AsyncTriggerOutput(object):
+    '''
+    Non-blocking trigger channel for TriggerBox / TriggerIn.
+
+    output_event_data() only puts the event into a bounded queue and returns immediately;
+    a writer thread takes a time.perf_counter_ns() timestamp right before the serial write
+    and verifies the echo (TriggerBox only) off the caller's thread.
+    '''
+
+    def __init__(self, device, maxsize=64, ack_timeout=1.0, history=1024):
+        self._device = device
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._ack_timeout = ack_timeout
+        self._saved_timeout = None
+        self._thread = None
+        # set after a missing or partial echo: its rest may still arrive, drop it before the next write
+        self._resync = False
+        # one record per written event, see _writer_loop
+        self.sent_events = deque(maxlen=history)
+        self.dropped = 0
+        self.ack_failures = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        handle = self._device._device_comport_handle
+        # a missing echo must not stall the queue for the 60 s default timeout of TriggerBox
+        if self._ack_timeout is not None and handle.timeout != 0:
+            self._saved_timeout = handle.timeout
+            handle.timeout = self._ack_timeout
+        self._thread = threading.Thread(target=self._writer_loop, name='trigger-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def output_event_data(self, eventData):
+        '''
+        Queue an event for output, never blocks.
+        :return: False if the queue is full and the event was dropped
+        '''
+        try:
+            self._queue.put_nowait((eventData, time.perf_counter_ns()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_loop(self):
+        lock = getattr(self._device, '_serial_lock', None) or threading.Lock()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            eventData, t_queued = item
+            error = None
+            with lock:
+                if self._resync:
+                    self._resync = False
+                    self._reset_input()
+                t_send = time.perf_counter_ns()
+                try:
+                    self._device.write_event(eventData)
+                    ack = self._device.read_event_ack(eventData)
+                except Exception as e:
+                    ack, error = False, e
+                t_ack = time.perf_counter_ns() if ack is not None else None
+                if ack is False:
+                    # timeout, short read or error frame: the next read must start at a frame
+                    # header, not in the middle of (or at the late echo of) this one
+                    self._reset_input()
+                    self._resync = True
+            if ack is False:
+                self.ack_failures += 1
+            self.sent_events.append(dict(EventData=eventData, QueuedNs=t_queued, SendNs=t_send,
+                                         AckNs=t_ack, Ack=ack, Error=error))
+            self._queue.task_done()
+
+    def _reset_input(self):
+        try:
+            self._device._device_comport_handle.reset_input_buffer()
+        except Exception:
+            pass  # port closed or gone, the next write reports it
+
+    def flush(self, timeout=None):
+        '''Wait until every queued event has been written (and acknowledged).'''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._saved_timeout is not None:
+            self._device._device_comport_handle.timeout = self._saved_timeout
+            self._saved_timeout = None
+
+
 if __name__ == '__main__':
     isMac = False
     isTriggerIn = False
@@ -0,0 +1,198 @@
+#! /usr/bin/env python
+#  -*- coding:utf-8 -*-
+#
+# Pseudo-terminal emulator of the Neuracle TriggerBox (Linux / macOS only).
+#
+# Opens a pty pair and answers PackageTriggerBoxBaseFrame requests on the master side,
+# so TriggerBox and TriggerIn can be opened on the slave device name without hardware.
+# Every received output event is stamped with time.perf_counter_ns() for latency benchmarks,
+# see tests/bench_trigger_latency.py.
+
+import os
+import select
+import threading
+import time
+import tty
+from struct import pack, unpack
+
+from neuracle_lib.triggerBox import TriggerBox
+
+
+class TriggerBoxEmulator(object):
+    errorNone = 0
+    errorFrameHeader = 1
+    errorFramePayload = 2
+    errorChannelNotExist = 3
+    errorDeviceID = 4
+    errorFunctionID = 5
+    errorSensorType = 6
+
+    # (sensorType, sensorNum) pairs reported by a real box, see TriggerBox.get_sensor_info
+    default_sensors = [(TriggerBox.sensorTypeLight, 1), (TriggerBox.sensorTypeLight, 2),
+                       (TriggerBox.sensorTypeLineIN, 1), (TriggerBox.sensorTypeLineIN, 2),
+                       (TriggerBox.sensorTypeAmbientlight, 1), (TriggerBox.sensorTypeMic, 1),
+                       (TriggerBox.sensorTypeHumidity, 1), (TriggerBox.sensorTypeTemperature, 1),
+                       (TriggerBox.sensorTypeDebug, 1)]
+
+    def __init__(self, device_name='TriggerBox-Emulator', echo_events=True, response_delay=0.0,
+                 sensors=None, history=100000):
+        '''
+        :param device_name: name returned for functionIDDeviceNameGet
+        :param echo_events: answer output events (TriggerBox) or stay silent (TriggerIn)
+        :param response_delay: seconds to wait before every response, emulates the device
+        :param sensors: list of (sensorType, sensorNum), defaults to default_sensors
+        '''
+        self.device_name = device_name
+        self.echo_events = echo_events
+        self.response_delay = response_delay
+        self.device_info = dict(HardwareVersion=1, FirmwareVersion=2, ID=0x4E52434C)
+        sensors = self.default_sensors if sensors is None else sensors
+        # (sensorType, sensorNum) -> [Edge, OutputChannel, TriggerToBeOut, Threshold, EventData]
+        self.sensor_para = {s: [1, 1, 0, 0, 0] for s in sensors}
+        self.events = []  # (perf_counter_ns at reception, eventData)
+        self._history = history
+        self._pending_error = None
+        self._pending_delay = 0.0
+        self._pending_truncate = None
+        self._master_fd = None
+        self._slave_fd = None
+        self.port = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        '''Open the pty pair and serve requests, returns the slave device name to open'''
+        self._master_fd, self._slave_fd = os.openpty()
+        # raw mode: no echo, no newline translation on the emulated serial line
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='triggerbox-emulator')
+        self._thread.daemon = True
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self._master_fd = self._slave_fd = None
+
+    def inject_error(self, error_type):
+        '''Answer the next request with an error frame of the given type'''
+        self._pending_error = error_type
+
+    def delay_next(self, seconds):
+        '''Answer the next request only after the given extra delay, e.g. an echo arriving after the ack timeout'''
+        self._pending_delay = seconds
+
+    def truncate_next(self, nbytes, skip=0):
+        '''Send only the first nbytes of the next response after `skip` complete ones, e.g. a reply cut short on the line'''
+        self._pending_truncate = (nbytes, skip)
+
+    def _read_exact(self, n):
+        data = b''
+        while len(data) < n and self._running:
+            r, _, _ = select.select([self._master_fd], [], [], 0.1)
+            if r:
+                chunk = os.read(self._master_fd, n - len(data))
+                if not chunk:
+                    break
+                data += chunk
+        return data if len(data) == n else None
+
+    def _serve(self):
+        while self._running:
+            header = self._read_exact(4)
+            if header is None:
+                continue
+            t_recv = time.perf_counter_ns()
+            deviceID, functionID, payloadLen = unpack('<BBH', header)
+            payload = self._read_exact(payloadLen) if payloadLen else b''
+            if payload is None:
+                continue
+            response = self._handle(deviceID, functionID, payload, t_recv)
+            if response is None:
+                continue
+            delay, self._pending_delay = self.response_delay + self._pending_delay, 0.0
+            if delay:
+                time.sleep(delay)
+            if self._pending_truncate is not None:
+                nbytes, skip = self._pending_truncate
+                if skip:
+                    self._pending_truncate = (nbytes, skip - 1)
+                else:
+                    response, self._pending_truncate = response[:nbytes], None
+            os.write(self._master_fd, response)
+
+    def _frame(self, functionID, payload=b''):
+        return pack('<BBH', TriggerBox._deviceID, functionID, len(payload)) + payload
+
+    def _error(self, error_type):
+        return self._frame(TriggerBox.functionIDError, bytes([error_type]))
+
+    def _handle(self, deviceID, functionID, payload, t_recv):
+        if self._pending_error is not None:
+            error_type, self._pending_error = self._pending_error, None
+            return self._error(error_type)
+        if deviceID != TriggerBox._deviceID:
+            return self._error(self.errorDeviceID)
+
+        if functionID == TriggerBox.functionIDDeviceNameGet:
+            return self._frame(functionID, self.device_name.encode('ascii'))
+
+        if functionID == TriggerBox.functionIDDeviceInfoGet:
+            info = self.device_info
+            return self._frame(functionID, pack('>BBBBI', info['HardwareVersion'], info['FirmwareVersion'],
+                                                len(self.sensor_para), 0, info['ID']))
+
+        if functionID == TriggerBox.functionIDSensorInfoGet:
+            return self._frame(functionID, b''.join(pack('BB', *s) for s in self.sensor_para))
+
+        if functionID in (TriggerBox.functionIDSensorParaGet, TriggerBox.functionIDSensorSampleGet):
+            if len(payload) != 2:
+                return self._error(self.errorFramePayload)
+            sensor = tuple(payload)
+            if sensor not in self.sensor_para:
+                return self._error(self.errorChannelNotExist)
+            if functionID == TriggerBox.functionIDSensorSampleGet:
+                return self._frame(functionID, payload + pack('<H', 512))
+            return self._frame(functionID, pack('<BBHHH', *self.sensor_para[sensor]))
+
+        # TriggerBox.set_sensor_para sends its 10 byte payload with functionIDOutputEventData
+        if functionID in (TriggerBox.functionIDSensorParaSet, TriggerBox.functionIDOutputEventData) \
+                and len(payload) == 10:
+            sensor = tuple(payload[:2])
+            if sensor not in self.sensor_para:
+                return self._error(self.errorChannelNotExist)
+            self.sensor_para[sensor] = list(unpack('<BBHHH', payload[2:]))
+            return self._frame(functionID, payload[:2])
+
+        if functionID == TriggerBox.functionIDOutputEventData:
+            if len(payload) != 1:
+                return self._error(self.errorFramePayload)
+            if len(self.events) < self._history:
+                self.events.append((t_recv, payload[0]))
+            if not self.echo_events:
+                return None
+            return self._frame(functionID, bytes([TriggerBox.functionIDOutputEventData, payload[0]]))
+
+        return self._error(self.errorFunctionID)
+
+
+if __name__ == '__main__':
+    emulator = TriggerBoxEmulator()
+    port = emulator.start()
+    print('TriggerBox emulator listening on %s, press Ctrl+C to stop.' % port)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print('received %d events' % len(emulator.events))
+        emulator.stop()
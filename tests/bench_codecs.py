@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Image codec benchmark: encode / decode time, frame size and PSNR
+
+Runs every codec from ar_system/image_codecs.py whose dependencies are installed
+(PyTurboJPEG and lz4 are optional) on recorded frames, or on a synthetic scene,
+at 640x480 and 1280x720.
+
+Usage (from the repository root):
+    python tests/bench_codecs.py
+    python tests/bench_codecs.py --source recording.mp4 --quality 10 50 80
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.image_codecs import available_codecs
+from bench_common import read_video, psnr
+
+
+def load_frames(source, count, rng):
+    """Frames from a video file / image, or a synthetic table scene, at their native size"""
+    if source:
+        return read_video(source, count)
+    frames = []
+    scene = cv2.GaussianBlur(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8), (15, 15), 0)
+    for i in range(12):
+        center = (int(rng.integers(100, 1180)), int(rng.integers(100, 620)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(scene, center, int(rng.integers(20, 80)), color, -1)
+    cv2.putText(scene, "EEG-MRControl", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+    for i in range(count):
+        frame = np.roll(scene, 4 * i, axis=1)
+        frames.append(cv2.add(frame, rng.integers(0, 4, frame.shape, dtype=np.uint8)))
+    return frames
+
+
+def measure(codec, frames, quality):
+    encode_ms, decode_ms, sizes, quality_db = [], [], [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        data = codec.encode(frame, quality)
+        t1 = time.perf_counter()
+        image = codec.decode(data)
+        t2 = time.perf_counter()
+        encode_ms.append((t1 - t0) * 1000)
+        decode_ms.append((t2 - t1) * 1000)
+        sizes.append(len(data))
+        quality_db.append(psnr(frame, image))
+    return np.median(encode_ms), np.median(decode_ms), np.mean(sizes) / 1024, np.mean(quality_db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image codec benchmark")
+    parser.add_argument("--source", help="video file, default: synthetic scene")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--quality", type=int, nargs="+", default=[10, 50, 80])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = load_frames(args.source, args.frames, rng)
+    codecs = available_codecs()
+    print(f"codecs: {', '.join(c.name for c in codecs)}")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        scaled = [cv2.resize(f, (width, height), interpolation=cv2.INTER_AREA) for f in frames]
+        print(f"\n{width}x{height}, {len(scaled)} frames")
+        print(f"{'codec':>10s} {'quality':>8s} {'encode ms':>10s} {'decode ms':>10s} {'KB/frame':>9s} {'PSNR dB':>8s}")
+        for codec in codecs:
+            # raw is lossless, quality does not apply
+            for quality in (args.quality if codec.name not in ("raw", "raw+lz4") else [None]):
+                enc, dec, kb, db = measure(codec, scaled, quality)
+                label = "-" if quality is None else str(quality)
+                print(f"{codec.name:>10s} {label:>8s} {enc:10.2f} {dec:10.2f} {kb:9.1f} {db:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
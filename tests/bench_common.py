@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers shared by the image benchmarks in this directory
+
+Each benchmark keeps its own synthetic scene (the content decides what is measured),
+but reads real footage and scores quality the same way through these functions.
+"""
+
+import cv2
+import numpy as np
+
+
+def read_video(source, count, size=None):
+    """
+    The first frames of a video file or an image
+    Args:
+        source (str): path readable by cv2.VideoCapture
+        count (int): maximum number of frames
+        size (tuple): (width, height) to resize to, None keeps the native size
+    Returns:
+        list: BGR frames; exits with a message if nothing could be read
+    """
+    frames = []
+    cap = cv2.VideoCapture(source)
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, size) if size else frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"无法读取 {source}")
+    return frames
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio of two 8-bit images in dB, 99 for identical images"""
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return 99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Gaze-foveated encoding versus full JPEG frames
+
+Encodes frames (recorded, or a synthetic detailed scene) with a gaze point wandering
+over the image, both as full JPEG and as foveated ROI + periphery layers, composites the
+layers with the Python reference decoder and reports bytes per frame, encode time and
+PSNR inside the gaze ROI and over the whole frame.
+
+Usage (from the repository root):
+    python tests/bench_foveated.py
+    python tests/bench_foveated.py --source video.mp4 --quality 30 --roi 0.3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.img_receiver import Frame, FrameDecoder
+from ar_system.foveated_codec import FoveatedEncoder
+from bench_common import read_video, psnr
+
+
+def load_frames(source, width, height, count, rng):
+    """Frames from a video file, or a detailed synthetic scene"""
+    if source:
+        return read_video(source, count, (width, height))
+    frames = []
+    scene = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (5, 5), 0)
+    for y in range(20, height, 40):
+        cv2.putText(scene, "EEG-MRControl 0123456789", (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    for i in range(count):
+        frames.append(np.roll(scene, i, axis=1))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Foveated encoding benchmark")
+    parser.add_argument("--source", help="video file, default: synthetic scene")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--quality", type=int, default=50, help="full JPEG / periphery quality")
+    parser.add_argument("--roi", type=float, default=0.35, help="ROI size as a fraction of the frame")
+    parser.add_argument("--scale", type=float, default=0.5, help="periphery downscale factor")
+    parser.add_argument("--boost", type=int, default=30, help="ROI quality above --quality")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = load_frames(args.source, args.width, args.height, args.frames, rng)
+    encoder = FoveatedEncoder(roi_fraction=args.roi, periphery_scale=args.scale, roi_quality_boost=args.boost)
+    decoder = FrameDecoder()
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), args.quality]
+
+    results = {"full JPEG": ([], [], [], []), "foveated": ([], [], [], [])}
+    for frame_id, frame in enumerate(frames):
+        # gaze on a slow Lissajous path over the frame
+        encoder.set_gaze(0.5 + 0.35 * np.sin(frame_id / 17.0), 0.5 + 0.35 * np.sin(frame_id / 11.0))
+        x, y, rw, rh = encoder.roi(args.width, args.height)
+
+        t0 = time.perf_counter()
+        _, jpeg = cv2.imencode('.jpg', frame, encode_param)
+        full_ms = (time.perf_counter() - t0) * 1000
+        full = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+        t0 = time.perf_counter()
+        payload, kind = encoder.encode(frame, args.quality)
+        fov_ms = (time.perf_counter() - t0) * 1000
+        fov = decoder.decode(Frame(frame_id, None, kind, bytes(payload), False))
+
+        for name, size, ms, image in (("full JPEG", len(jpeg), full_ms, full), ("foveated", len(payload), fov_ms, fov)):
+            r = results[name]
+            r[0].append(size)
+            r[1].append(ms)
+            r[2].append(psnr(frame[y:y + rh, x:x + rw], image[y:y + rh, x:x + rw]))
+            r[3].append(psnr(frame, image))
+
+    print(f"{len(frames)} frames {args.width}x{args.height}, quality {args.quality} (ROI +{args.boost}), "
+          f"ROI {args.roi:.0%} of the frame, periphery x{args.scale}")
+    print(f"{'':10s} {'KB/frame':>9s} {'encode ms':>10s} {'ROI PSNR':>9s} {'frame PSNR':>11s}")
+    for name, (size, ms, roi_psnr, frame_psnr) in results.items():
+        print(f"{name:10s} {np.mean(size) / 1024:9.1f} {np.mean(ms):10.2f} {np.mean(roi_psnr):9.2f} {np.mean(frame_psnr):11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Serial versus pipelined interaction loop, with simulated stage times
+
+A fake RealSense pipeline delivers frames at the camera rate, inference and rendering
+are simulated with sleeps. Runs the old serial loop (wait for a frame, infer, render)
+and the stages of ar_system/frame_pipeline.py, and reports the rendered fps and the
+capture-to-render latency of both.
+
+Usage (from the repository root):
+    python tests/bench_frame_pipeline.py
+    python tests/bench_frame_pipeline.py --camera-fps 30 --infer-ms 45 --render-ms 15
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.frame_pipeline import RealSenseCapture, InferenceWorker, PipelineStats
+
+
+class FakeFrame:
+    def __init__(self, image, capture_ts_us):
+        self.image = image
+        self.capture_ts_us = capture_ts_us  # when the camera exposed it, time.monotonic() clock
+
+    def get_color_frame(self):
+        return self
+
+    def get_data(self):
+        return self.image
+
+    def get_timestamp(self):
+        """ms of the host system clock, like the global_time domain of a RealSense camera"""
+        return (self.capture_ts_us + (time.time_ns() - time.monotonic_ns()) // 1000) / 1000.0
+
+
+class FakeRealSense:
+    """wait_for_frames / poll_for_frames at a fixed frame rate"""
+
+    def __init__(self, fps, width=640, height=480):
+        self.period = 1.0 / fps
+        self.next = time.monotonic()
+        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def poll_for_frames(self):
+        now = time.monotonic()
+        if now < self.next:
+            return None
+        # only the newest frame is queued, like a RealSense frame queue of 1
+        captured = self.next + self.period * int((now - self.next) / self.period)
+        self.next = captured + self.period
+        return FakeFrame(self.image, int(captured * 1e6))
+
+    def wait_for_frames(self):
+        while True:
+            frames = self.poll_for_frames()
+            if frames:
+                return frames
+            time.sleep(max(0.0, self.next - time.monotonic()))
+
+
+def run_serial(args):
+    camera = FakeRealSense(args.camera_fps)
+    latency, rendered = [], 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        capture_ts_us = camera.wait_for_frames().capture_ts_us
+        time.sleep(args.infer_ms / 1000.0)
+        time.sleep(args.render_ms / 1000.0)
+        rendered += 1
+        latency.append((time.monotonic_ns() // 1000 - capture_ts_us) / 1000.0)
+    return rendered / args.duration, np.percentile(latency, [50, 99])
+
+
+def run_pipelined(args):
+    capture = RealSenseCapture(FakeRealSense(args.camera_fps)).start()
+    inference = InferenceWorker(lambda image: time.sleep(args.infer_ms / 1000.0), capture.frames).start()
+    stats = PipelineStats(maxlen=100000)
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        result = inference.results.get(timeout=0.1)
+        if result is None:
+            continue
+        render_start = time.perf_counter()
+        time.sleep(args.render_ms / 1000.0)
+        stats.add(result.frame.capture_ts_us, render_start)
+    inference.stop()
+    capture.stop()
+    return stats.rendered / args.duration, np.percentile(stats.latency_ms, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs pipelined interaction loop")
+    parser.add_argument("--camera-fps", type=float, default=30)
+    parser.add_argument("--infer-ms", type=float, default=35)
+    parser.add_argument("--render-ms", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"camera {args.camera_fps:.0f} fps, inference {args.infer_ms:.0f} ms, render {args.render_ms:.0f} ms")
+    print(f"{'loop':>10s} {'fps':>6s} {'latency p50 ms':>15s} {'p99 ms':>7s}")
+    for name, run in (("serial", run_serial), ("pipelined", run_pipelined)):
+        fps, (p50, p99) = run(args)
+        print(f"{name:>10s} {fps:6.1f} {p50:15.1f} {p99:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Loopback streaming benchmark for Img_sender + the Python reference receiver
+
+Streams recorded or synthetic frames over loopback at fixed frame rates and reports
+the achieved fps, frame loss and encode->reassemble latency percentiles. Loss and
+delay can be injected by a local UDP relay between sender and receiver.
+
+Latency needs the capture timestamp of protocol v2; with --protocol 1 only fps and
+loss are reported.
+
+Usage (from the repository root):
+    python tests/bench_image_stream.py                          # 30/60/90 fps, synthetic frames
+    python tests/bench_image_stream.py --source video.mp4 --fps 30 60
+    python tests/bench_image_stream.py --loss 2 --delay-ms 5 --jitter-ms 2 --fec 8
+"""
+
+import argparse
+import heapq
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.Img_sender import ImageSender
+from ar_system.img_receiver import ImageReceiver
+from bench_common import read_video
+
+
+class UdpRelay:
+    def __init__(self, target_port, loss=0.0, delay_ms=0.0, jitter_ms=0.0, seed=0):
+        """
+        Forward datagrams from a local port to target_port, dropping and delaying them
+        Args:
+            target_port (int): loopback port of the receiver
+            loss (float): drop probability per datagram
+            delay_ms (float): added one-way delay
+            jitter_ms (float): uniform random extra delay (0..jitter_ms), reorders packets
+        """
+        self.target = ("127.0.0.1", target_port)
+        self.loss = loss
+        self.delay = delay_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.001)
+        self.port = self.sock.getsockname()[1]
+        self.out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.queue = []  # (due time, seq, packet)
+        self.seq = 0
+        self.is_running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while self.is_running:
+            try:
+                packet = self.sock.recv(65536)
+                if self.rng.random() >= self.loss:
+                    due = time.perf_counter() + self.delay + self.rng.random() * self.jitter
+                    heapq.heappush(self.queue, (due, self.seq, packet))
+                    self.seq += 1
+            except socket.timeout:
+                pass
+            now = time.perf_counter()
+            while self.queue and self.queue[0][0] <= now:
+                self.out.sendto(heapq.heappop(self.queue)[2], self.target)
+
+    def stop(self):
+        self.is_running = False
+        self.thread.join()
+        self.sock.close()
+        self.out.close()
+
+
+def load_frames(source, width, height, count=120):
+    """Frames from a video file / image, or a moving synthetic test pattern"""
+    if source:
+        return read_video(source, count, (width, height))
+    frames = []
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    for i in range(count):
+        frame = background.copy()
+        x = int((width - 100) * (0.5 + 0.5 * np.sin(i / 15.0)))
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (0, 0, 255), -1)
+        cv2.putText(frame, f"{i:04d}", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+        frames.append(frame)
+    return frames
+
+
+def run(frames, fps, duration, args):
+    latencies, received = [], []
+
+    def on_frame(frame, recv_ns):
+        if args.decode:
+            cv2.imdecode(np.frombuffer(frame.data, np.uint8), cv2.IMREAD_COLOR)
+            recv_ns = time.monotonic_ns()
+        received.append(recv_ns)
+        if frame.capture_ts_us is not None:
+            latencies.append(recv_ns / 1000.0 - frame.capture_ts_us)
+
+    receiver = ImageReceiver(port=0, host="127.0.0.1", on_frame=on_frame).start()
+    relay = None
+    port = receiver.port
+    if args.loss or args.delay_ms or args.jitter_ms:
+        relay = UdpRelay(receiver.port, args.loss / 100.0, args.delay_ms, args.jitter_ms)
+        port = relay.port
+    sender = ImageSender("127.0.0.1", port, mtu=args.mtu, rate_mbps=args.rate_mbps, batch=args.batch,
+                         jpeg_quality=args.quality, protocol=args.protocol, fec_group=args.fec)
+
+    n_frames = int(duration * fps)
+    start = time.perf_counter()
+    send_ms = []
+    for i in range(n_frames):
+        due = start + i / fps
+        wait = due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        capture_ts_us = time.monotonic_ns() // 1000
+        t0 = time.perf_counter()
+        sender.send_image(frames[i % len(frames)], capture_ts_us)
+        send_ms.append((time.perf_counter() - t0) * 1000)
+    # the last frame still owns its interval
+    elapsed = max(time.perf_counter() - start, n_frames / fps)
+    time.sleep(0.2 + args.delay_ms / 1000.0 + args.jitter_ms / 1000.0)
+    if relay:
+        relay.stop()
+    receiver.stop()
+    sender.close()
+
+    lat = np.array(latencies) / 1000.0
+    return {
+        "target fps": fps,
+        "sent fps": n_frames / elapsed,
+        "recv fps": len(received) / elapsed,
+        "loss": 1 - len(received) / n_frames,
+        "encode+send ms": float(np.mean(send_ms)),
+        "latency ms": np.percentile(lat, [50, 90, 99]) if len(lat) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loopback image streaming benchmark")
+    parser.add_argument("--source", help="video file or image, default: synthetic frames")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, nargs="+", default=[30, 60, 90])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per frame rate")
+    parser.add_argument("--protocol", type=int, default=2, choices=[1, 2])
+    parser.add_argument("--fec", type=int, default=0, help="protocol 2 XOR parity group size")
+    parser.add_argument("--quality", type=int, default=50)
+    parser.add_argument("--mtu", type=int, default=1500)
+    parser.add_argument("--rate-mbps", type=float, default=100.0)
+    parser.add_argument("--batch", action="store_true", help="send with UDP GSO")
+    parser.add_argument("--decode", action="store_true", help="include JPEG decoding in the latency")
+    parser.add_argument("--loss", type=float, default=0.0, help="relay drop rate in percent")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="relay one-way delay")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="relay random extra delay")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.width, args.height)
+    print(f"{args.width}x{args.height}, protocol v{args.protocol}, FEC {args.fec or 'off'}, "
+          f"loss {args.loss}%, delay {args.delay_ms}+{args.jitter_ms} ms")
+    print(f"{'target':>7s} {'sent':>7s} {'recv':>7s} {'loss':>7s} {'send ms':>8s} "
+          f"{'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s}")
+    for fps in args.fps:
+        r = run(frames, fps, args.duration, args)
+        lat = "".join(f"{v:9.2f}" for v in r["latency ms"]) if r["latency ms"] is not None else "      n/a"
+        print(f"{r['target fps']:7d} {r['sent fps']:7.1f} {r['recv fps']:7.1f} {r['loss']:7.1%} "
+              f"{r['encode+send ms']:8.2f}{lat}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+TCP message framing benchmark: one recv per message versus MessageFramer
+
+Streams length-prefixed gaze envelopes, as the HoloLens sends them, through a local
+socket pair in bursts and counts the recv calls and the time needed to frame them,
+once with the old recv(4) + recv(length) loop and once with MessageFramer. Random
+write sizes also exercise the short-read handling, every message is checked.
+
+Usage (from the repository root):
+    python tests/bench_tcp_framing.py
+    python tests/bench_tcp_framing.py --messages 100000 --burst 8
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.tcp_manager import LENGTH_PREFIX, MessageFramer
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        payload = json.dumps({"x": 320 + i % 100, "y": 240 - i % 50})
+        messages.append(json.dumps({"type": "gaze", "payload": payload}).encode('utf-8'))
+    return messages
+
+
+def writer(sock, messages, burst, chunked, rng):
+    """Write the messages in bursts, optionally split at random byte positions"""
+    for i in range(0, len(messages), burst):
+        data = b"".join(LENGTH_PREFIX.pack(len(m)) + m for m in messages[i:i + burst])
+        if chunked:
+            pos = 0
+            while pos < len(data):
+                n = rng.randint(1, 64)
+                sock.sendall(data[pos:pos + n])
+                pos += n
+        else:
+            sock.sendall(data)
+    sock.shutdown(socket.SHUT_WR)
+
+
+def read_per_message(sock):
+    """The old TCPClient loop: recv(4) for the prefix, then grow the message until complete"""
+    received, reads = [], 0
+    while True:
+        prefix = sock.recv(4)
+        reads += 1
+        if not prefix:
+            return received, reads
+        while len(prefix) < 4:
+            prefix += sock.recv(4 - len(prefix))
+            reads += 1
+        length = int.from_bytes(prefix, 'big')
+        data = b''
+        while len(data) < length:
+            data += sock.recv(length - len(data))
+            reads += 1
+        received.append(data)
+
+
+def read_framer(sock):
+    framer = MessageFramer()
+    received = []
+    try:
+        while True:
+            for message in framer.recv(sock):
+                received.append(bytes(message))
+    except ConnectionError:
+        return received, framer.stats["reads"] + 1
+
+
+def run(reader, messages, burst, chunked, seed):
+    a, b = socket.socketpair()
+    thread = threading.Thread(target=writer, args=(a, messages, burst, chunked, random.Random(seed)))
+    t0 = time.perf_counter()
+    thread.start()
+    received, reads = reader(b)
+    elapsed = time.perf_counter() - t0
+    thread.join()
+    a.close()
+    b.close()
+    return received == messages, reads, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP framing benchmark")
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--burst", type=int, default=4, help="messages written together, as 90-120 Hz gaze arrives")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    print(f"{args.messages} gaze messages, bursts of {args.burst}")
+    print(f"{'reader':>18s} {'writes':>8s} {'ok':>4s} {'recv calls':>11s} {'msgs/recv':>10s} {'us/msg':>8s}")
+    for chunked in (False, True):
+        for name, reader in (("recv per message", read_per_message), ("MessageFramer", read_framer)):
+            ok, reads, elapsed = run(reader, messages, args.burst, chunked, args.seed)
+            print(f"{name:>18s} {'split' if chunked else 'whole':>8s} {'yes' if ok else 'NO':>4s} {reads:11d} "
+                  f"{len(messages) / reads:10.1f} {elapsed / len(messages) * 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tile delta encoding versus full JPEG frames
+
+Encodes a mostly static sequence (recorded, or a synthetic table scene with a small
+moving object and sensor noise) both ways, decodes the tile stream with the Python
+reference decoder and reports bytes per frame, encode time and PSNR against the source.
+--drop discards whole frames before the decoder to show how keyframes and the rolling
+tile refresh repair the picture.
+
+Usage (from the repository root):
+    python tests/bench_tile_delta.py
+    python tests/bench_tile_delta.py --source idle.mp4 --quality 50 --drop 2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.img_receiver import Frame, FrameDecoder
+from ar_system.tile_codec import TileDeltaEncoder
+from bench_common import read_video, psnr
+
+
+def load_frames(source, width, height, count, noise, rng):
+    """Frames from a video file, or a static scene with one small moving object"""
+    if source:
+        return read_video(source, count, (width, height))
+    frames = []
+    background = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (21, 21), 0)
+    for i in range(count):
+        frame = background.copy()
+        x = int((width - 60) * (0.5 + 0.4 * np.sin(i / 20.0)))
+        cv2.circle(frame, (x + 30, height // 2), 25, (0, 0, 255), -1)
+        if noise:
+            frame = cv2.add(frame, rng.integers(0, noise + 1, frame.shape, dtype=np.uint8))
+        frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tile delta encoding benchmark")
+    parser.add_argument("--source", help="video file, default: synthetic static scene")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--quality", type=int, default=50)
+    parser.add_argument("--tile", type=int, default=64)
+    parser.add_argument("--threshold", type=float, default=6.0)
+    parser.add_argument("--keyframe", type=int, default=60, help="keyframe interval in frames")
+    parser.add_argument("--noise", type=int, default=3, help="synthetic sensor noise amplitude")
+    parser.add_argument("--drop", type=float, default=0.0, help="frames lost before the decoder, percent")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = load_frames(args.source, args.width, args.height, args.frames, args.noise, rng)
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), args.quality]
+    encoder = TileDeltaEncoder(tile_size=args.tile, threshold=args.threshold, keyframe_interval=args.keyframe)
+    decoder = FrameDecoder()
+
+    full_bytes, full_ms, full_psnr = [], [], []
+    tile_bytes, tile_ms, tile_psnr = [], [], []
+    for frame_id, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        _, jpeg = cv2.imencode('.jpg', frame, encode_param)
+        full_ms.append((time.perf_counter() - t0) * 1000)
+        full_bytes.append(len(jpeg))
+        full_psnr.append(psnr(frame, cv2.imdecode(jpeg, cv2.IMREAD_COLOR)))
+
+        t0 = time.perf_counter()
+        payload, kind = encoder.encode(frame, args.quality)
+        tile_ms.append((time.perf_counter() - t0) * 1000)
+        tile_bytes.append(len(payload))
+        if rng.random() < args.drop / 100.0:
+            continue
+        image = decoder.decode(Frame(frame_id, None, kind, bytes(payload), False))
+        if image is not None:
+            tile_psnr.append(psnr(frame, image))
+
+    n = len(frames)
+    print(f"{n} frames {args.width}x{args.height}, JPEG quality {args.quality}, tile {args.tile}, "
+          f"keyframe every {args.keyframe}, drop {args.drop}%")
+    print(f"{'':12s} {'KB/frame':>9s} {'encode ms':>10s} {'PSNR dB':>8s}")
+    print(f"{'full JPEG':12s} {np.mean(full_bytes) / 1024:9.1f} {np.mean(full_ms):10.2f} {np.mean(full_psnr):8.2f}")
+    print(f"{'tile delta':12s} {np.mean(tile_bytes) / 1024:9.1f} {np.mean(tile_ms):10.2f} {np.mean(tile_psnr):8.2f}")
+    print(f"keyframes {encoder.stats['keyframes']}, delta frames {encoder.stats['delta_frames']}, "
+          f"tiles per delta frame {encoder.stats['tiles_sent'] / max(1, encoder.stats['delta_frames']):.1f}, "
+          f"bandwidth {np.sum(tile_bytes) / np.sum(full_bytes):.1%} of full JPEG")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Greedy per-track IoU matching versus ar_system/object_tracker.py
+
+Simulates N boxes drifting through the frame with jitter and missed detections, feeds
+the detections (shuffled every frame, like a detector's output order) to the old dict
+based greedy tracker of the Phase 4 loop and to ObjectTracker, and reports the time per
+frame and the number of track ID switches of both.
+
+Usage (from the repository root):
+    python tests/bench_tracker.py
+    python tests/bench_tracker.py --objects 80 --frames 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.object_tracker import ObjectTracker
+
+
+def calculate_iou(box1, box2):
+    x1, y1, x2, y2 = box1
+    x3, y3, x4, y4 = box2
+    inter_area = max(0, min(x2, x4) - max(x1, x3)) * max(0, min(y2, y4) - max(y1, y3))
+    union_area = (x2 - x1) * (y2 - y1) + (x4 - x3) * (y4 - y3) - inter_area
+    return inter_area / union_area if union_area > 0 else 0
+
+
+class GreedyTracker:
+    """The tracker the Phase 4 loop used before ObjectTracker"""
+
+    def __init__(self):
+        self.tracked_objects = {}
+        self.next_track_id = 0
+
+    def update(self, boxes, masks):
+        unmatched_detections = list(range(len(boxes)))
+        for track_id, tobj in list(self.tracked_objects.items()):
+            tobj["last_seen"] += 1
+            best_match_iou = 0.3
+            best_match_idx = -1
+            for det_idx in unmatched_detections:
+                iou = calculate_iou(tobj["box"], boxes[det_idx])
+                if iou > best_match_iou:
+                    best_match_iou = iou
+                    best_match_idx = det_idx
+            if best_match_idx != -1:
+                tobj.update({"box": boxes[best_match_idx], "mask": masks[best_match_idx],
+                             "last_seen": 0, "hits": tobj["hits"] + 1})
+                unmatched_detections.remove(best_match_idx)
+        for track_id, tobj in list(self.tracked_objects.items()):
+            if tobj["last_seen"] > 15:
+                del self.tracked_objects[track_id]
+        for det_idx in unmatched_detections:
+            self.tracked_objects[self.next_track_id] = {"box": boxes[det_idx], "mask": masks[det_idx],
+                                                        "last_seen": 0, "hits": 1}
+            self.next_track_id += 1
+
+    def confirmed(self):
+        return [(track_id, tobj["box"], tobj["mask"])
+                for track_id, tobj in self.tracked_objects.items() if tobj["hits"] >= 3]
+
+
+def make_scene(args):
+    """Per frame: (boxes, truth) with truth the index of the simulated object of each box"""
+    rng = np.random.default_rng(args.seed)
+    pos = rng.uniform([0, 0], [args.width - 60, args.height - 60], (args.objects, 2))
+    size = rng.uniform(25, 60, (args.objects, 2))
+    vel = rng.normal(0, 2.0, (args.objects, 2))
+    frames = []
+    for _ in range(args.frames):
+        pos = np.clip(pos + vel, 0, [args.width - 60, args.height - 60])
+        boxes = np.hstack((pos, pos + size)) + rng.normal(0, args.jitter, (args.objects, 4))
+        visible = np.flatnonzero(rng.random(args.objects) > args.miss_rate)
+        rng.shuffle(visible)
+        frames.append((boxes[visible].astype(np.float32), visible))
+    return frames
+
+
+def run(tracker, frames):
+    times, switches, owner = [], 0, {}
+    for i, (boxes, truth) in enumerate(frames):
+        # (frame, simulated object) stands in for the mask, so IDs can be checked
+        start = time.perf_counter()
+        tracker.update(boxes, [(i, obj) for obj in truth])
+        confirmed = tracker.confirmed()
+        times.append((time.perf_counter() - start) * 1000)
+        for track_id, _, (frame, obj) in confirmed:
+            # tracks coasting on an old detection keep their old mask, they are not switches
+            if frame == i and owner.setdefault(obj, track_id) != track_id:
+                switches += 1
+                owner[obj] = track_id
+    return np.median(times), np.percentile(times, 99), switches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Greedy vs optimal-assignment object tracking")
+    parser.add_argument("--objects", type=int, default=60)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--jitter", type=float, default=3.0, help="box corner noise, pixels")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="chance an object is not detected")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = make_scene(args)
+    print(f"{args.objects} objects, {args.frames} frames, jitter {args.jitter} px, miss rate {args.miss_rate}")
+    print(f"{'tracker':>10s} {'median ms':>10s} {'p99 ms':>7s} {'ID switches':>12s}")
+    for name, tracker in (("greedy", GreedyTracker()), ("assignment", ObjectTracker())):
+        median, p99, switches = run(tracker, frames)
+        print(f"{name:>10s} {median:10.3f} {p99:7.3f} {switches:12d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+TriggerBox / TriggerIn marker latency benchmark on the pty emulator (no hardware needed)
+
+Measured per marker, in microseconds:
+- call:      time spent inside output_event_data() by the caller (render-loop cost)
+- round trip: TriggerBox only, request written until the echo has been read
+- one-way:   send timestamp until the emulator received the complete frame
+
+Usage (from the repository root, Linux/macOS):
+    python tests/bench_trigger_latency.py -n 1000
+    python tests/bench_trigger_latency.py -n 1000 --budget-us 2000   # exit 1 on p99 regressions
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from neuracle_lib.triggerBox import TriggerBox, TriggerIn, AsyncTriggerOutput
+from neuracle_lib.triggerBoxEmulator import TriggerBoxEmulator
+
+
+def _one_way(send_ns, emulator, first_event):
+    recv_ns = [t for t, _ in emulator.events[first_event:first_event + len(send_ns)]]
+    if len(recv_ns) != len(send_ns):
+        raise RuntimeError("emulator received %d of %d markers" % (len(recv_ns), len(send_ns)))
+    return (np.array(recv_ns) - np.array(send_ns)) / 1000.0
+
+
+def bench_triggerbox_sync(emulator, port, n, interval):
+    box = TriggerBox(port)
+    first = len(emulator.events)
+    call, send = [], []
+    for i in range(n):
+        t0 = time.perf_counter_ns()
+        box.output_event_data(i % 255 + 1)
+        call.append((time.perf_counter_ns() - t0) / 1000.0)
+        send.append(t0)
+        time.sleep(interval)
+    box.closeSerial()
+    # for the blocking call, the call time is the round trip
+    return {"call": np.array(call), "round trip": np.array(call), "one-way": _one_way(send, emulator, first)}
+
+
+def bench_async(emulator, device, n, interval):
+    output = AsyncTriggerOutput(device, maxsize=max(n, 1))
+    output.start()
+    first = len(emulator.events)
+    call = []
+    for i in range(n):
+        t0 = time.perf_counter_ns()
+        output.output_event_data(i % 255 + 1)
+        call.append((time.perf_counter_ns() - t0) / 1000.0)
+        time.sleep(interval)
+    output.flush(timeout=10)
+    time.sleep(0.05)  # let the emulator take in the last frames of a silent TriggerIn
+    output.stop()
+    device.closeSerial()
+    events = list(output.sent_events)
+    result = {"call": np.array(call), "one-way": _one_way([e["SendNs"] for e in events], emulator, first)}
+    if all(e["AckNs"] is not None for e in events):
+        result["round trip"] = np.array([(e["AckNs"] - e["SendNs"]) / 1000.0 for e in events])
+    return result
+
+
+def bench_triggerin_sync(emulator, port, n, interval):
+    trigger_in = TriggerIn(port)
+    trigger_in.validate_device()
+    first = len(emulator.events)
+    call, send = [], []
+    for i in range(n):
+        t0 = time.perf_counter_ns()
+        trigger_in.output_event_data(i % 255 + 1)
+        call.append((time.perf_counter_ns() - t0) / 1000.0)
+        send.append(t0)
+        time.sleep(interval)
+    time.sleep(0.05)
+    trigger_in.closeSerial()
+    return {"call": np.array(call), "one-way": _one_way(send, emulator, first)}
+
+
+def print_stats(name, result):
+    print(f"\n{name}")
+    print(f"  {'metric':12s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s}   (us)")
+    for metric, values in result.items():
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"  {metric:12s} {p50:9.1f} {p90:9.1f} {p99:9.1f} {values.max():9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigger latency benchmark on the pty emulator")
+    parser.add_argument("-n", type=int, default=500, help="markers per scenario")
+    parser.add_argument("--interval", type=float, default=0.002, help="seconds between markers")
+    parser.add_argument("--delay", type=float, default=0.0, help="emulated device response delay in seconds")
+    parser.add_argument("--budget-us", type=float, default=None, help="fail if any one-way p99 exceeds this")
+    args = parser.parse_args()
+
+    box_emulator = TriggerBoxEmulator(response_delay=args.delay)
+    box_port = box_emulator.start()
+    in_emulator = TriggerBoxEmulator(echo_events=False)
+    in_port = in_emulator.start()
+    try:
+        results = {
+            "TriggerBox (blocking)": bench_triggerbox_sync(box_emulator, box_port, args.n, args.interval),
+            "TriggerBox + AsyncTriggerOutput": bench_async(box_emulator, TriggerBox(box_port), args.n, args.interval),
+            "TriggerIn (blocking)": bench_triggerin_sync(in_emulator, in_port, args.n, args.interval),
+        }
+        trigger_in = TriggerIn(in_port)
+        trigger_in.validate_device()
+        results["TriggerIn + AsyncTriggerOutput"] = bench_async(in_emulator, trigger_in, args.n, args.interval)
+    finally:
+        box_emulator.stop()
+        in_emulator.stop()
+
+    failed = False
+    for name, result in results.items():
+        print_stats(name, result)
+        if args.budget_us is not None and np.percentile(result["one-way"], 99) > args.budget_us:
+            print(f"  [FAIL] one-way p99 exceeds {args.budget_us:.0f} us")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Sender restart check for the UDP image protocol v2 reassembly
+
+Feeds FrameAssemblerV2 a short sender run, then a restarted run whose frame IDs start
+at 0 again, and fails unless the restarted stream is delivered almost completely.
+Late packets within the reorder window must still be dropped as stale.
+
+Usage (from the repository root):
+    python tests/check_frame_restart.py
+    python tests/check_frame_restart.py --first-run 20 --second-run 600
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.Img_sender import build_packets_v2
+from ar_system.img_receiver import FrameAssemblerV2, REORDER_WINDOW
+
+PACKET_SIZE = 1400
+
+
+def send_run(assembler, n_frames, frame_bytes=3000):
+    """Push n_frames frames with IDs 0..n-1, like a freshly started sender; returns the delivered count"""
+    delivered = 0
+    for frame_id in range(n_frames):
+        buf, n = build_packets_v2(bytes(frame_bytes), PACKET_SIZE, frame_id, frame_id * 33333)
+        for i in range(n):
+            delivered += assembler.push(bytes(buf[i * PACKET_SIZE:(i + 1) * PACKET_SIZE])) is not None
+    return delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--first-run", type=int, default=100, help="frames before the restart")
+    parser.add_argument("--second-run", type=int, default=600, help="frames after the restart")
+    args = parser.parse_args()
+
+    failed = False
+    assembler = FrameAssemblerV2()
+    send_run(assembler, args.first_run)
+    delivered = send_run(assembler, args.second_run)
+    # a restart inside the reorder window costs at most the frames up to the old ID
+    expected = args.second_run - min(args.first_run, REORDER_WINDOW + 1)
+    ok = delivered >= expected
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] restart after {args.first_run} frames: "
+          f"{delivered}/{args.second_run} frames delivered (expected >= {expected})")
+
+    # a late packet of a frame just behind the newest one is not a restart
+    assembler = FrameAssemblerV2()
+    late, _ = build_packets_v2(bytes(100), PACKET_SIZE, 5, 0)
+    send_run(assembler, 10)
+    ok = assembler.push(bytes(late[:PACKET_SIZE])) is None and assembler.stats["stale_packets"] == 1
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] late packet inside the reorder window dropped as stale")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+GazeHistory interpolation, ring wraparound, stale stream and fixation check
+
+- at() interpolates linearly between the samples around the query time.
+- After the ring buffer wrapped around, queries still see the newest samples in order.
+- A query more than max_age_us past the newest sample (stalled gaze stream) finds no gaze.
+- fixation() finds a fixation at the capture time of a frame even after a saccade that
+  came later, and none during the saccade or on a stalled stream.
+
+Usage (from the repository root):
+    python tests/check_gaze_history.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.gaze_history import GazeHistory
+
+PERIOD_US = 8333  # 120 Hz
+
+
+def check_interpolation():
+    history = GazeHistory(capacity=16)
+    history.push(1000, 0, 100)
+    history.push(2000, 10, 200)
+    ok = history.at(1500) == (5.0, 150.0) and history.at(500) == (0.0, 100.0)
+    return ok, f"interpolation between samples and clamp before the history: {history.at(1500)}"
+
+
+def check_wraparound():
+    history = GazeHistory(capacity=16)
+    for i in range(40):
+        history.push(i * PERIOD_US, i, -i)
+    t, x, _ = history.last()
+    ok = (len(t) == 16 and x.tolist() == list(range(24, 40))
+          and history.at(30.5 * PERIOD_US) == (30.5, -30.5))
+    return ok, f"ring buffer wrapped after 40 samples: oldest x {x[0]:.0f}, newest x {x[-1]:.0f}"
+
+
+def check_stale():
+    history = GazeHistory(capacity=16, max_age_us=100000)
+    history.push(0, 50, 50)
+    ok = history.at(90000) == (50.0, 50.0) and history.at(110000) is None and GazeHistory().at(0) is None
+    return ok, "no gaze point more than max_age_us after the newest sample"
+
+
+def check_fixation():
+    history = GazeHistory(capacity=512, max_age_us=100000)
+    # 300 ms fixation around (100, 100), a saccade to (400, 300), then 300 ms there
+    t = 0
+    for i in range(36):
+        history.push(t, 100 + i % 3, 100 - i % 2)
+        t += PERIOD_US
+    fixation_end = t - PERIOD_US
+    for i in range(4):
+        history.push(t, 100 + 75 * (i + 1), 100 + 50 * (i + 1))
+        t += PERIOD_US
+    saccade_end = t - PERIOD_US
+    for i in range(36):
+        history.push(t, 400 + i % 2, 300)
+        t += PERIOD_US
+
+    at_capture = history.fixation(t_us=fixation_end)
+    in_saccade = history.fixation(t_us=saccade_end)
+    newest = history.fixation()
+    stalled = history.fixation(t_us=t + 200000)
+    ok = (at_capture is not None and abs(at_capture.x - 101) < 1 and abs(at_capture.y - 99.5) < 1
+          and in_saccade is None
+          and newest is not None and abs(newest.x - 400.5) < 1 and newest.duration_us >= 100000
+          and stalled is None)
+    detail = f"at capture {at_capture and (round(at_capture.x), round(at_capture.y))}, " \
+             f"newest {newest and (round(newest.x), round(newest.y))}"
+    return ok, f"fixation before the saccade found at its time, none in the saccade or when stalled ({detail})"
+
+
+def main():
+    failed = False
+    for check in (check_interpolation, check_wraparound, check_stale, check_fixation):
+        ok, message = check()
+        failed |= not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {message}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
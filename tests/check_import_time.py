@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time budget check for every entry point
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+entry point, sums the cumulative import time of everything the module pulled in,
+and fails if the budget is exceeded, a heavy dependency was loaded eagerly or the
+module does not import at all. Only a module whose third-party dependency is not
+installed here is skipped.
+
+Usage (from the repository root):
+    python tests/check_import_time.py            # default budgets
+    python tests/check_import_time.py --scale 2  # slower machine, double budgets
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy packages that must only be imported when their feature is first used
+HEAVY_MODULES = ("ultralytics", "torch", "pyrealsense2", "scipy", "mne")
+
+# entry point -> import-time budget in milliseconds
+IMPORT_BUDGETS_MS = {
+    "mian": 400,
+    "ar_system.Img_sender": 400,
+    "ar_system.eeg_processor": 250,
+    "ar_system.tcp_manager": 50,
+    "ar_system.model_manager": 250,
+    "ar_system.object_tracker": 250,
+    "neuracle_lib.dataServer": 250,
+    "neuracle_lib.readbdfdata": 250,
+    "neuracle_lib.triggerBox": 100,
+}
+
+
+class MissingDependency(RuntimeError):
+    """The import failed because a third-party package is not installed"""
+
+
+def _is_local(module):
+    """True if the top-level package of module is part of this repository"""
+    top = module.split(".")[0]
+    return os.path.isdir(os.path.join(REPO_ROOT, top)) or os.path.isfile(os.path.join(REPO_ROOT, top + ".py"))
+
+
+def _run_importtime(code):
+    """Return the parsed `-X importtime` records as (depth, cumulative_us, name)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1]
+        missing = re.match(r"ModuleNotFoundError: No module named '([\w.]+)'", error)
+        if missing and not _is_local(missing.group(1)):
+            raise MissingDependency(error)
+        raise RuntimeError(error)
+    records = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((depth, int(cumulative), name.strip()))
+    return records
+
+
+def measure(module):
+    """
+    Measure the import of one module in a fresh interpreter
+    Returns:
+        (float, list): import time in ms, heavy modules that were imported
+    """
+    startup = {name for depth, _, name in _run_importtime("pass") if depth == 0}
+    records = _run_importtime(f"import {module}")
+    total_us = sum(cum for depth, cum, name in records if depth == 0 and name not in startup)
+    heavy = sorted({name.split(".")[0] for _, _, name in records
+                    if name.split(".")[0] in HEAVY_MODULES})
+    return total_us / 1000.0, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this factor")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        budget_ms *= args.scale
+        try:
+            elapsed_ms, heavy = measure(module)
+        except MissingDependency as e:
+            print(f"[SKIP] {module:28s} 缺少依赖: {e}")
+            continue
+        except RuntimeError as e:
+            failed = True
+            print(f"[FAIL] {module:28s} 无法导入: {e}")
+            continue
+        ok = elapsed_ms <= budget_ms and not heavy
+        failed |= not ok
+        note = f"  eager heavy imports: {', '.join(heavy)}" if heavy else ""
+        print(f"[{'OK' if ok else 'FAIL'}] {module:28s} {elapsed_ms:8.1f} ms / {budget_ms:6.0f} ms{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
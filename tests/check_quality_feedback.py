@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+AdaptiveQualityController receiver feedback check
+
+A stream_feedback report arrives about once per second while update() runs once per
+frame. A lossy report must step quality down once, not on every frame until the next
+report; quality must not climb back while that report is the newest one, and must climb
+again after a loss-free report.
+
+Usage (from the repository root):
+    python tests/check_quality_feedback.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.quality_controller import AdaptiveQualityController
+
+FPS = 30
+
+
+def run_second(controller):
+    """One second of frames well under the bitrate and time budget"""
+    for _ in range(FPS):
+        controller.update(encode_ms=2.0, frame_bytes=10000, send_ms=1.0)
+    return controller.quality
+
+
+def main():
+    controller = AdaptiveQualityController(fps=FPS)
+    before = run_second(controller)
+    controller.on_receiver_feedback(loss=0.05)
+    controller.update(encode_ms=2.0, frame_bytes=10000, send_ms=1.0)
+    after_report = controller.quality
+    after_second = run_second(controller)
+    controller.on_receiver_feedback(loss=0.0)
+    recovered = run_second(controller)
+
+    failed = False
+    ok = after_report < before and after_second == after_report
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] one lossy report, one step down: quality {before} -> {after_report}, "
+          f"{after_second} a second later")
+    ok = recovered > after_second
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] quality rises again after a loss-free report: {recovered}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
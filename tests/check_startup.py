@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+StartupOrchestrator timeout race and late-subsystem cleanup check
+
+- A subsystem that finishes right at its timeout must end up READY, never TIMEOUT with its
+  handle lost (run many times to hit the race between the worker and run()).
+- A subsystem ready after its timeout and never taken is stopped by shutdown().
+- A subsystem still starting at shutdown() is stopped as soon as it is ready.
+
+Usage (from the repository root):
+    python tests/check_startup.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.startup import StartupOrchestrator
+
+
+class Handle:
+    def __init__(self):
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def slow(seconds):
+    def start():
+        time.sleep(seconds)
+        return Handle()
+    return start
+
+
+def check_race(rounds=200):
+    lost = 0
+    for _ in range(rounds):
+        startup = StartupOrchestrator()
+        startup.add("edge", slow(0.002), timeout=0.002)
+        with contextlib.redirect_stdout(io.StringIO()):
+            startup.run()
+            startup._subsystems["edge"]["done"].wait()
+        lost += startup.result("edge") is None
+    return lost == 0, f"subsystem finishing at its timeout lost in {lost}/{rounds} runs"
+
+
+def check_late_ready():
+    startup = StartupOrchestrator()
+    startup.add("late", slow(0.1), timeout=0.01, required=False, stop_func=lambda h: h.stop())
+    startup.add("taken", slow(0.0), timeout=1.0, stop_func=lambda h: h.stop())
+    with contextlib.redirect_stdout(io.StringIO()):
+        startup.run()
+        taken = startup.result("taken")
+        startup._subsystems["late"]["done"].wait()
+        late = startup._subsystems["late"]["result"]
+        startup.shutdown()
+    ok = late.stopped.is_set() and not taken.stopped.is_set()
+    return ok, "late subsystem stopped by shutdown(), taken one left to its owner"
+
+
+def check_ready_after_shutdown():
+    startup = StartupOrchestrator()
+    startup.add("hanging", slow(0.2), timeout=0.01, required=False, stop_func=lambda h: h.stop())
+    with contextlib.redirect_stdout(io.StringIO()):
+        startup.run()
+        startup.shutdown()
+        startup._subsystems["hanging"]["done"].wait()
+        handle = startup._subsystems["hanging"]["result"]
+        stopped = handle.stopped.wait(1.0)
+    return stopped, "subsystem ready after shutdown() stopped right away"
+
+
+def main():
+    failed = False
+    for check in (check_race, check_late_ready, check_ready_after_shutdown):
+        ok, message = check()
+        failed |= not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {message}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
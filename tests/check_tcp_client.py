@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+TCPClient idle CPU and gaze burst check
+
+- Starts a TCPClient (clock pings enabled) against a port nobody listens on and fails if
+  its threads burn CPU while it is disconnected: the writer thread must block on the
+  send queue, not poll it.
+- A burst of binary gaze messages arriving in one read must reach the "gaze" callback
+  sample by sample, while latest_gaze() holds the newest one.
+
+Usage (from the repository root):
+    python tests/check_tcp_client.py
+    python tests/check_tcp_client.py --seconds 5 --max-cpu 0.1
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.tcp_manager import TCPClient, LENGTH_PREFIX, GAZE_MESSAGE, MSG_GAZE_BINARY
+
+
+def _closed_port():
+    """A local port with no listener, connect() is refused"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def check_idle_cpu(args):
+    client = TCPClient("127.0.0.1", _closed_port(), ping_interval=1.0)
+    client.start()
+    time.sleep(0.2)  # first connect attempt refused, now waiting to retry
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(args.seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    client.is_running = False  # stop() would wait for the 5 s reconnect delay
+    client.send_queue.close()
+
+    ok = cpu / wall <= args.max_cpu
+    return ok, (f"disconnected TCPClient: {cpu:.3f} CPU s in {wall:.1f} s "
+                f"(max {args.max_cpu:.2f} CPU s/s)")
+
+
+def check_gaze_burst(n=20):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    samples = []
+    client = TCPClient("127.0.0.1", server.getsockname()[1], ping_interval=0)
+    client.register_callback("gaze", samples.append)
+    client.start()
+    conn, _ = server.accept()
+    burst = b"".join(LENGTH_PREFIX.pack(GAZE_MESSAGE.size) + GAZE_MESSAGE.pack(MSG_GAZE_BINARY, i * 8333, i, i, 1.0)
+                     for i in range(n))
+    conn.sendall(burst)  # one write, read by the client in one recv
+    deadline = time.monotonic() + 2.0
+    while len(samples) < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    latest = client.latest_gaze()
+    client.is_running = False
+    client.send_queue.close()
+    conn.close()
+    server.close()
+
+    ok = [s.x for s in samples] == list(range(n)) and latest is not None and latest.x == n - 1
+    return ok, f"gaze burst of {n}: {len(samples)} samples to the callback, latest x {latest.x if latest else None}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="measurement time")
+    parser.add_argument("--max-cpu", type=float, default=0.1, help="allowed CPU seconds per wall second")
+    args = parser.parse_args()
+
+    failed = False
+    for ok, message in (check_idle_cpu(args), check_gaze_burst()):
+        failed |= not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {message}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+TriggerBox batch query resynchronisation and lazy sensor discovery check (pty emulator)
+
+- Constructing a TriggerBox sends no sensor queries, they run on the first use of the
+  parameter cache.
+- configure_sensors() with one reply cut short in the middle of the batch: that sensor
+  fails, every other sensor is set, and the serial line is in sync afterwards.
+
+Usage (from the repository root, Linux/macOS):
+    python tests/check_trigger_batch.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from neuracle_lib.triggerBox import TriggerBox
+from neuracle_lib.triggerBoxEmulator import TriggerBoxEmulator
+
+BROKEN = 3  # index of the reply cut short in the batch
+
+
+def main():
+    emulator = TriggerBoxEmulator()
+    port = emulator.start()
+    failed = False
+    with contextlib.redirect_stdout(io.StringIO()):
+        box = TriggerBox(port)
+    box._device_comport_handle.timeout = 0.5
+
+    ok = not box._discovered and not box._sensor_para
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] no sensor discovery in the constructor")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sensorIDs = sorted(box.discover_sensors())
+        # the header of this reply is cut after two bytes, the next reply's bytes follow it
+        emulator.truncate_next(2, skip=BROKEN)
+        result = box.configure_sensors({sensorID: {'EventData': 10 + sensorID} for sensorID in sensorIDs})
+        name = box.get_device_name()
+    box.closeSerial()
+    emulator.stop()
+
+    expected = {sensorID: i != BROKEN for i, sensorID in enumerate(sensorIDs)}
+    stored = [emulator.sensor_para[(box._sensor_type(box.sensor_info[s]['Type']), box.sensor_info[s]['Number'])][4]
+              for s in sensorIDs]
+    ok = result == expected and all(event == 10 + s for s, event in zip(sensorIDs, stored) if expected[s])
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] reply {BROKEN} of {len(sensorIDs)} cut short: "
+          f"{sum(result.values())} sensors set, failed {[s for s, r in result.items() if not r]}")
+    ok = name == str(emulator.device_name.encode('ascii'))
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] serial line in sync after the batch (device name {name})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
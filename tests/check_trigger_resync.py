@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+AsyncTriggerOutput echo resynchronisation check on the pty emulator (no hardware needed)
+
+The emulator answers every event after a short delay and the first one only after the
+ack timeout, while the second event is already waiting for its echo. The first event must
+count as unacknowledged, and no later event may be acknowledged by the echo of an earlier
+one: every later round trip has to be at least as long as the emulator's response delay.
+
+Usage (from the repository root, Linux/macOS):
+    python tests/check_trigger_resync.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from neuracle_lib.triggerBox import TriggerBox, AsyncTriggerOutput
+from neuracle_lib.triggerBoxEmulator import TriggerBoxEmulator
+
+RESPONSE_DELAY = 0.01
+ACK_TIMEOUT = 0.1
+
+
+def main():
+    emulator = TriggerBoxEmulator(response_delay=RESPONSE_DELAY)
+    port = emulator.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        box = TriggerBox(port)
+    output = AsyncTriggerOutput(box, ack_timeout=ACK_TIMEOUT)
+    output.start()
+
+    # the first echo arrives after its ack timeout but before the second event's timeout
+    emulator.delay_next(1.5 * ACK_TIMEOUT)
+    output.output_event_data(1)
+    time.sleep(1.2 * ACK_TIMEOUT)  # the first echo is overdue, but has not arrived yet
+    for event in range(2, 8):
+        output.output_event_data(event)
+        time.sleep(5 * RESPONSE_DELAY)
+    output.flush(timeout=5)
+    output.stop()
+    box.closeSerial()
+    emulator.stop()
+
+    events = list(output.sent_events)
+    failed = False
+    ok = not events[0]["Ack"]
+    failed |= not ok
+    print(f"[{'OK' if ok else 'FAIL'}] echo later than the ack timeout counted as missing")
+    round_trips = [(e["EventData"], (e["AckNs"] - e["SendNs"]) / 1e6) for e in events[1:]]
+    ok = all(e["Ack"] for e in events[1:]) and all(ms >= RESPONSE_DELAY * 1000 for _, ms in round_trips)
+    failed |= not ok
+    detail = ", ".join(f"{event}: {ms:.1f}" for event, ms in round_trips)
+    print(f"[{'OK' if ok else 'FAIL'}] later events acknowledged by their own echo (round trips ms {detail})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
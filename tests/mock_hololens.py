@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Mock HoloLens: the headset side of the TCP envelope protocol and the UDP video stream
+
+Listens where TCPManager.cs listens (TCP 9998) and where UDPImageReceiver.cs listens
+(UDP 9999), so mian.py on the same machine connects to it as if it were the headset:
+- answers start_signal with ack "start_signal_received" and sends a command after it
+- sends gaze samples at a configurable rate along a scripted trajectory, as binary
+  gaze messages (TCPManager.binaryGaze) or as JSON envelopes
+- answers the PC's clock synchronisation pings, in a clock that can be shifted
+  (--clock-offset-ms) to check the PC's offset estimate
+- reassembles the UDP image stream with the Python reference receiver and reports the
+  frame loss back every second as stream_feedback, like UDPImageReceiver.cs
+and periodically reports video fps, frame loss and latency, the received TCP messages
+and the overlay latency. Timestamps are compared in the local monotonic clock, which
+the PC shares when both run on one machine.
+
+With --loopback it also plays the PC side in-process (TCPClient + FanoutImageSender with
+synthetic frames and per-frame overlays), to stress-test both transports without a
+camera, and reports the PC-side gaze latency and clock estimate.
+
+Usage (from the repository root):
+    python tests/mock_hololens.py                                  # then start mian.py
+    python tests/mock_hololens.py --gaze-hz 120 --trajectory saccades
+    python tests/mock_hololens.py --trajectory gaze.csv            # t (s), x, y per line
+    python tests/mock_hololens.py --loopback --fps 60 --gaze-hz 120 --duration 10
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ar_system.tcp_manager import LENGTH_PREFIX, GAZE_MESSAGE, MSG_GAZE_BINARY, MessageFramer
+from ar_system.img_receiver import ImageReceiver
+
+
+class GazeScript:
+    def __init__(self, trajectory, width, height, seed=0):
+        """
+        Scripted gaze trajectory in video pixels
+        Args:
+            trajectory (str): fixed, circle, lissajous, saccades, or a CSV file of t, x, y rows
+            width, height (int): video frame size
+        """
+        self.width, self.height = width, height
+        self.kind = trajectory
+        if trajectory not in ("fixed", "circle", "lissajous", "saccades"):
+            data = np.loadtxt(trajectory, delimiter=",", ndmin=2)
+            self.t, self.x, self.y = data[:, 0], data[:, 1], data[:, 2]
+            self.kind = "file"
+        elif trajectory == "saccades":
+            # fixations of 200-800 ms on random points, joined by instantaneous jumps
+            rng = np.random.default_rng(seed)
+            durations = rng.uniform(0.2, 0.8, 1000)
+            self.t = np.concatenate(([0.0], np.cumsum(durations)))
+            self.x = rng.uniform(0.1, 0.9, len(self.t)) * width
+            self.y = rng.uniform(0.1, 0.9, len(self.t)) * height
+
+    def at(self, t):
+        """Gaze point (x, y) t seconds after the start"""
+        w, h = self.width, self.height
+        if self.kind == "fixed":
+            return w / 2, h / 2
+        if self.kind == "circle":
+            return w / 2 + 0.3 * w * np.cos(t), h / 2 + 0.3 * h * np.sin(t)
+        if self.kind == "lissajous":
+            return w / 2 + 0.4 * w * np.sin(1.3 * t), h / 2 + 0.4 * h * np.sin(1.7 * t)
+        if self.kind == "saccades":
+            i = min(np.searchsorted(self.t, t, side="right") - 1, len(self.x) - 1)
+            return self.x[i], self.y[i]
+        # recorded trajectory, looped
+        t = t % self.t[-1] if self.t[-1] > 0 else 0.0
+        return float(np.interp(t, self.t, self.x)), float(np.interp(t, self.t, self.y))
+
+
+def percentiles(values):
+    if not values:
+        return "-"
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return f"p50 {p50:.1f} / p90 {p90:.1f} / p99 {p99:.1f} ms"
+
+
+class MockHololens:
+    def __init__(self, tcp_port=9998, udp_port=9999, width=640, height=480, gaze_hz=90.0,
+                 trajectory="lissajous", binary_gaze=True, command="pick", command_delay=1.0, host="0.0.0.0",
+                 clock_offset_ms=0.0, feedback_interval=1.0):
+        """
+        Args:
+            tcp_port (int): TCP port the PC's TCPClient connects to
+            udp_port (int): UDP port the video is streamed to
+            width, height (int): video frame size, gaze is sent in these pixels
+            gaze_hz (float): gaze sample rate, 0 disables gaze
+            trajectory (str): see GazeScript
+            binary_gaze (bool): 21-byte binary gaze messages, JSON envelopes otherwise
+            command (str): command sent command_delay seconds after the handshake
+            clock_offset_ms (float): the mock's clock runs this far ahead of time.monotonic()
+            feedback_interval (float): seconds between stream_feedback messages, 0 disables them
+        """
+        self.gaze_hz = gaze_hz
+        self.gaze = GazeScript(trajectory, width, height)
+        self.binary_gaze = binary_gaze
+        self.command = command
+        self.command_delay = command_delay
+        self.clock_offset_us = int(clock_offset_ms * 1000)
+        self.feedback_interval = feedback_interval
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, tcp_port))
+        self.listener.listen(1)
+        self.listener.settimeout(0.2)
+        self.tcp_port = self.listener.getsockname()[1]
+        self.conn = None
+        self._send_lock = threading.Lock()
+
+        self.receiver = ImageReceiver(port=udp_port, host=host, on_frame=self._on_frame)
+        self.udp_port = self.receiver.port
+
+        self._lock = threading.Lock()  # guards the statistics below
+        self._reset_stats()
+        # frames received / lost since the last stream_feedback
+        self.feedback_frames = 0
+        self.feedback_lost = 0
+        self.messages_total = Counter()
+        self.is_running = False
+        self.threads = []
+
+    def _reset_stats(self):
+        self.frame_ids = []
+        self.frame_latency_ms = []
+        self.overlay_latency_ms = []
+        self.messages = Counter()
+        self.gaze_sent = 0
+        self.last_frame_id = None
+        self.lost_frames = 0
+
+    def now_us(self):
+        """The headset clock, microseconds"""
+        return time.monotonic_ns() // 1000 + self.clock_offset_us
+
+    def start(self):
+        self.is_running = True
+        self.receiver.start()
+        for target in (self._accept_loop, self._gaze_loop, self._feedback_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        print(f"[MOCK] 模拟HoloLens: TCP端口 {self.tcp_port}, UDP端口 {self.udp_port}")
+        return self
+
+    # ---------------- UDP video ----------------
+    def _on_frame(self, frame, recv_ns):
+        with self._lock:
+            if frame.frame_id is not None:
+                if self.last_frame_id is not None and frame.frame_id > self.last_frame_id + 1:
+                    self.lost_frames += frame.frame_id - self.last_frame_id - 1
+                    self.feedback_lost += frame.frame_id - self.last_frame_id - 1
+                self.last_frame_id = frame.frame_id
+            self.feedback_frames += 1
+            self.frame_ids.append(frame.frame_id)
+            if frame.capture_ts_us is not None:
+                self.frame_latency_ms.append((recv_ns / 1000.0 - frame.capture_ts_us) / 1000.0)
+
+    def _feedback_loop(self):
+        """stream_feedback like UDPImageReceiver.cs: loss of the last interval, keyframe after a lost frame"""
+        if self.feedback_interval <= 0:
+            return
+        while self.is_running:
+            time.sleep(self.feedback_interval)
+            with self._lock:
+                frames, lost = self.feedback_frames, self.feedback_lost
+                self.feedback_frames = self.feedback_lost = 0
+            if frames + lost:
+                # a skipped frame may have carried tiles: the image is stale until a keyframe
+                self.send("stream_feedback", json.dumps({"loss": lost / (frames + lost), "keyframe": lost > 0}))
+
+    # ---------------- TCP ----------------
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                conn, addr = self.listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            print(f"[MOCK] PC已连接: {addr}")
+            self.conn = conn
+            self._receive_loop(conn)
+            self.conn = None
+            conn.close()
+            print("[MOCK] PC已断开，等待新的连接...")
+
+    def _receive_loop(self, conn):
+        framer = MessageFramer()
+        while self.is_running:
+            try:
+                messages = framer.recv(conn)
+            except (ConnectionError, OSError):
+                return
+            received_us = self.now_us()
+            for message in messages:
+                envelope = json.loads(str(message, 'utf-8'))
+                self._handle(envelope.get("type"), envelope.get("payload"), received_us)
+
+    def _handle(self, msg_type, payload, received_us):
+        with self._lock:
+            self.messages[msg_type] += 1
+            self.messages_total[msg_type] += 1
+            if msg_type == "overlay":
+                ts = json.loads(payload)["ts"]
+                self.overlay_latency_ms.append((time.monotonic_ns() // 1000 - ts) / 1000.0)
+        if msg_type == "ping":
+            ping = json.loads(payload)
+            self.send("pong", json.dumps({"seq": ping["seq"], "t0": ping["t0"], "t1": received_us, "t2": self.now_us()}))
+        elif msg_type == "start_signal":
+            print("[MOCK] 收到 start_signal，回复ack")
+            self.send("ack", "start_signal_received")
+            if self.command:
+                timer = threading.Timer(self.command_delay, self.send, args=("command", self.command))
+                timer.daemon = True
+                timer.start()
+        elif msg_type == "subtitle":
+            print(f"[MOCK] 字幕: {payload}")
+        elif msg_type == "selection_confirmed":
+            print("[MOCK] 收到选择确认")
+
+    def send(self, msg_type, payload):
+        """Send one envelope like TCPManager.Send, False if no PC is connected"""
+        data = json.dumps({"type": msg_type, "payload": payload}).encode('utf-8')
+        return self.send_raw(data)
+
+    def send_raw(self, data):
+        conn = self.conn
+        if conn is None:
+            return False
+        try:
+            with self._send_lock:
+                conn.sendall(LENGTH_PREFIX.pack(len(data)) + data)
+            return True
+        except OSError:
+            return False
+
+    def _gaze_loop(self):
+        if self.gaze_hz <= 0:
+            return
+        period = 1.0 / self.gaze_hz
+        start = time.perf_counter()
+        i = 0
+        while self.is_running:
+            i += 1
+            wait = start + i * period - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if self.conn is None:
+                continue
+            x, y = self.gaze.at(time.perf_counter() - start)
+            if self.binary_gaze:
+                ok = self.send_raw(GAZE_MESSAGE.pack(MSG_GAZE_BINARY, self.now_us(), x, y, 1.0))
+            else:
+                ok = self.send("gaze", json.dumps({"x": int(x), "y": int(y)}))
+            if ok:
+                with self._lock:
+                    self.gaze_sent += 1
+
+    def report(self, interval):
+        """Print and reset the statistics of the last interval seconds"""
+        with self._lock:
+            frames, lost = len(self.frame_ids), self.lost_frames
+            line = (f"[MOCK] 视频 {frames / interval:5.1f} fps, 丢帧 {lost / max(1, frames + lost):.1%}, "
+                    f"延迟 {percentiles(self.frame_latency_ms)} | gaze发送 {self.gaze_sent / interval:.0f} Hz | "
+                    f"TCP {dict(self.messages)}")
+            if self.overlay_latency_ms:
+                line += f" | overlay延迟 {percentiles(self.overlay_latency_ms)}"
+            self._reset_stats()
+        print(line)
+
+    def stop(self):
+        self.is_running = False
+        self.listener.close()
+        if self.conn:
+            try:
+                self.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.receiver.stop()
+
+
+def run_loopback_pc(mock, args):
+    """Play the PC side in this process: handshake, then synthetic frames and overlays at args.fps"""
+    import cv2
+    from ar_system.tcp_manager import TCPClient
+    from ar_system.Img_sender import FanoutImageSender
+    from ar_system.overlay import OverlayFrame
+
+    handshake = threading.Event()
+    gaze_latency_ms = []
+    client = TCPClient("127.0.0.1", mock.tcp_port)
+    client.register_callback("ack", lambda payload: handshake.set())
+    client.register_callback("command", lambda payload: None)
+    feedback = []
+    client.register_callback("stream_feedback", lambda payload: feedback.append(json.loads(payload)))
+    # age of the sample when it reached the callback, through the estimated clock offset
+    client.register_callback("gaze", lambda sample: gaze_latency_ms.append(
+        (time.monotonic_ns() / 1000.0 - sample.pc_time_us) / 1000.0))
+    client.start()
+    while not client.is_client_connected():
+        time.sleep(0.05)
+    stream = FanoutImageSender(protocol=2, fec_group=8)
+    stream.add_tier("hololens", quality=args.quality)
+    stream.subscribe("127.0.0.1", mock.udp_port, tier="hololens", rate_mbps=args.rate_mbps)
+
+    client.send("start_signal", "")
+    if not handshake.wait(5.0):
+        print("[MOCK] 握手超时")
+
+    rng = np.random.default_rng(0)
+    scene = cv2.GaussianBlur(rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8), (9, 9), 0)
+    contour = cv2.ellipse2Poly((args.width // 2, args.height // 2), (80, 50), 0, 0, 360, 10).reshape(-1, 1, 2)
+    n_frames = int(args.duration * args.fps)
+    start = time.perf_counter()
+    next_report = start + args.report
+    for i in range(n_frames):
+        wait = start + i / args.fps - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        capture_ts_us = time.monotonic_ns() // 1000
+        stream.send_image(np.roll(scene, 2 * i, axis=1), capture_ts_us)
+        overlay = OverlayFrame(capture_ts_us, args.width, args.height)
+        overlay.add_track(0, [contour], highlighted=(i // args.fps) % 2 == 1)
+        client.send("overlay", overlay.to_json())
+        if time.perf_counter() >= next_report:
+            next_report += args.report
+            mock.report(args.report)
+            print(f"[PC]   gaze延迟 {percentiles(gaze_latency_ms)} (回调 {len(gaze_latency_ms) / args.report:.0f} Hz), "
+                  f"时钟 {client.clock_stats()}, 发送队列 {client.send_queue.stats}, "
+                  f"接收反馈 {feedback[-1] if feedback else None}")
+            gaze_latency_ms.clear()
+    time.sleep(0.2)
+    stream.close()
+    client.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock HoloLens server and TCP/UDP load generator")
+    parser.add_argument("--tcp-port", type=int, default=9998)
+    parser.add_argument("--udp-port", type=int, default=9999)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--gaze-hz", type=float, default=90.0, help="0 disables gaze")
+    parser.add_argument("--trajectory", default="lissajous", help="fixed, circle, lissajous, saccades or a CSV file")
+    parser.add_argument("--json-gaze", action="store_true", help="JSON gaze envelopes instead of binary messages")
+    parser.add_argument("--command", default="pick", help="command sent after the handshake, empty for none")
+    parser.add_argument("--command-delay", type=float, default=1.0)
+    parser.add_argument("--report", type=float, default=2.0, help="report interval in seconds")
+    parser.add_argument("--clock-offset-ms", type=float, default=0.0, help="shift of the mock's clock")
+    parser.add_argument("--feedback-interval", type=float, default=1.0, help="stream_feedback period, 0 disables")
+    parser.add_argument("--loopback", action="store_true", help="also run the PC side in this process")
+    parser.add_argument("--duration", type=float, default=10.0, help="--loopback run time")
+    parser.add_argument("--fps", type=int, default=30, help="--loopback video frame rate")
+    parser.add_argument("--quality", type=int, default=70, help="--loopback JPEG quality")
+    parser.add_argument("--rate-mbps", type=float, default=100.0, help="--loopback pacing rate")
+    args = parser.parse_args()
+
+    if args.loopback:
+        # free ports, so a running mian.py or headset does not collide
+        args.tcp_port = args.udp_port = 0
+    mock = MockHololens(args.tcp_port, args.udp_port, args.width, args.height, args.gaze_hz, args.trajectory,
+                        binary_gaze=not args.json_gaze, command=args.command, command_delay=args.command_delay,
+                        host="127.0.0.1" if args.loopback else "0.0.0.0",
+                        clock_offset_ms=args.clock_offset_ms,
+                        feedback_interval=args.feedback_interval).start()
+    try:
+        if args.loopback:
+            run_loopback_pc(mock, args)
+        else:
+            while True:
+                time.sleep(args.report)
+                mock.report(args.report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+        print(f"[MOCK] 共收到TCP消息: {dict(mock.messages_total)}")
+
+
+if __name__ == "__main__":
+    main()
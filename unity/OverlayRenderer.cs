@@ -0,0 +1,175 @@
+﻿// OverlayRenderer.cs
+
+// Responsibilities:
+// Draw the vector overlay (object contours, highlight, dwell progress bar) sent by the PC
+// as "overlay" TCP messages on top of the video, instead of the PC burning it into the pixels.
+// Put it on a child of the Display Image, stretched over it (anchors 0..1), so image pixels map onto the video.
+
+using UnityEngine;
+using UnityEngine.UI;
+using System;
+
+[RequireComponent(typeof(CanvasRenderer))]
+public class OverlayRenderer : MaskableGraphic
+{
+    [Tooltip("物体轮廓颜色")]
+    public Color contourColor = Color.blue;
+
+    [Tooltip("高亮物体(注视足够久)的轮廓颜色")]
+    public Color highlightColor = Color.green;
+
+    [Tooltip("轮廓线宽(视频像素)")]
+    public float lineWidth = 2f;
+
+    [Tooltip("高亮轮廓线宽(视频像素)")]
+    public float highlightLineWidth = 4f;
+
+    [Tooltip("超过该时间(秒)未收到新的overlay则清空，避免连接中断后残留")]
+    public float staleTimeout = 0.5f;
+
+    // ---- overlay消息结构，与 ar_system/overlay.py 一致 ----
+    [Serializable]
+    private class OverlayTrack
+    {
+        public int id;
+        public int[] poly; // x0, y0, x1, y1, ... (视频像素)
+        public bool hl;
+    }
+
+    [Serializable]
+    private class OverlayProgress
+    {
+        public bool active; // JsonUtility总会创建progress对象，没有进度条时该字段为false
+        public int id;
+        public int x;
+        public int y;
+        public float value;
+        public bool armed;
+    }
+
+    [Serializable]
+    private class OverlayPayload
+    {
+        public long ts; // 对应视频帧的采集时间戳(微秒)
+        public int w;
+        public int h;
+        public OverlayTrack[] tracks;
+        public OverlayProgress progress;
+    }
+
+    private const float BarWidth = 100f;
+    private const float BarHeight = 10f;
+
+    private OverlayPayload current;
+    private float lastReceivedTime;
+
+    protected override void OnEnable()
+    {
+        base.OnEnable();
+        raycastTarget = false;
+        TCPManager.OnOverlayReceived += HandleOverlay;
+        TCPManager.OnSelectionConfirmed += Clear;
+    }
+
+    protected override void OnDisable()
+    {
+        TCPManager.OnOverlayReceived -= HandleOverlay;
+        TCPManager.OnSelectionConfirmed -= Clear;
+        base.OnDisable();
+    }
+
+    private void HandleOverlay(string payload)
+    {
+        try
+        {
+            current = JsonUtility.FromJson<OverlayPayload>(payload);
+            lastReceivedTime = Time.time;
+            SetVerticesDirty();
+        }
+        catch (Exception e)
+        {
+            Debug.LogWarning($"[Overlay] 解析overlay失败: {e.Message}");
+        }
+    }
+
+    public void Clear()
+    {
+        current = null;
+        SetVerticesDirty();
+    }
+
+    void Update()
+    {
+        if (current != null && Time.time - lastReceivedTime > staleTimeout)
+        {
+            Clear();
+        }
+    }
+
+    protected override void OnPopulateMesh(VertexHelper vh)
+    {
+        vh.Clear();
+        if (current == null || current.w <= 0 || current.h <= 0) return;
+
+        Rect rect = rectTransform.rect;
+        Vector2 scale = new Vector2(rect.width / current.w, rect.height / current.h);
+        // 视频像素 -> 本地坐标，图像y轴向下，UI y轴向上
+        Func<float, float, Vector2> toLocal = (px, py) =>
+            new Vector2(rect.xMin + px * scale.x, rect.yMax - py * scale.y);
+        float pixelScale = Mathf.Min(scale.x, scale.y);
+
+        if (current.tracks != null)
+        {
+            foreach (OverlayTrack track in current.tracks)
+            {
+                if (track.poly == null || track.poly.Length < 4) continue;
+                Color c = track.hl ? highlightColor : contourColor;
+                float width = (track.hl ? highlightLineWidth : lineWidth) * pixelScale;
+                int n = track.poly.Length / 2;
+                for (int i = 0; i < n; i++)
+                {
+                    int j = (i + 1) % n;
+                    AddLine(vh, toLocal(track.poly[2 * i], track.poly[2 * i + 1]),
+                            toLocal(track.poly[2 * j], track.poly[2 * j + 1]), width, c);
+                }
+            }
+        }
+
+        OverlayProgress p = current.progress;
+        if (p != null && p.active)
+        {
+            // 与PC端 render_overlay() 相同: 注视点右上方的进度条
+            float bx = p.x + 20, by = p.y - 20;
+            AddRect(vh, toLocal(bx, by + BarHeight), toLocal(bx + BarWidth, by), new Color32(100, 100, 100, 255));
+            Color fill = p.armed ? highlightColor : Color.white;
+            AddRect(vh, toLocal(bx, by + BarHeight), toLocal(bx + BarWidth * Mathf.Clamp01(p.value), by), fill);
+        }
+    }
+
+    private void AddLine(VertexHelper vh, Vector2 a, Vector2 b, float width, Color c)
+    {
+        Vector2 dir = b - a;
+        if (dir.sqrMagnitude < 1e-6f) return;
+        Vector2 normal = new Vector2(-dir.y, dir.x).normalized * (width * 0.5f);
+        AddQuad(vh, a - normal, a + normal, b + normal, b - normal, c);
+    }
+
+    private void AddRect(VertexHelper vh, Vector2 bottomLeft, Vector2 topRight, Color c)
+    {
+        AddQuad(vh, bottomLeft, new Vector2(bottomLeft.x, topRight.y), topRight,
+                new Vector2(topRight.x, bottomLeft.y), c);
+    }
+
+    private void AddQuad(VertexHelper vh, Vector2 v0, Vector2 v1, Vector2 v2, Vector2 v3, Color c)
+    {
+        int start = vh.currentVertCount;
+        UIVertex vert = UIVertex.simpleVert;
+        vert.color = c * color;
+        vert.position = v0; vh.AddVert(vert);
+        vert.position = v1; vh.AddVert(vert);
+        vert.position = v2; vh.AddVert(vert);
+        vert.position = v3; vh.AddVert(vert);
+        vh.AddTriangle(start, start + 1, start + 2);
+        vh.AddTriangle(start + 2, start + 3, start);
+    }
+}
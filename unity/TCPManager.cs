@@ -3,7 +3,7 @@
 // Responsibilities:
 // 1. Provide a global,singleton TCP communication interface
 // 2. Act as a TCP server: listen for and maintain the connection from the PC client
-// 3. Receive PC messages (e.g start_singal,selection_confirmed,subtitle) and broadcast them via events
+// 3. Receive PC messages (e.g start_singal,selection_confirmed,subtitle,overlay) and broadcast them via events
 // 4. Expose clear public methods so other scripts can send messages (e.g ack,command,gaze)to the PC
 
 using UnityEngine;
@@ -13,6 +13,8 @@ using System.Net.Sockets;
 using System.Text;
 using System.Threading;
 using System.Collections.Concurrent;
+using System.Diagnostics;
+using Debug = UnityEngine.Debug;
 
 
 
@@ -23,6 +25,7 @@ public class TCPManager : MonoBehaviour
     public static event Action OnStartSignalReceived;
     public static event Action<string> OnSubtitleReceived;
     public static event Action OnSelectionConfirmed;
+    public static event Action<string> OnOverlayReceived;
     #endregion
 
     #region 内部数据结构 
@@ -39,6 +42,31 @@ public class TCPManager : MonoBehaviour
         public int x;
         public int y;
     }
+
+    // 时钟同步: PC发送ping(t0为PC时钟)，这里回复pong，t1/t2为本机收到/发出的时间(微秒)
+    [System.Serializable]
+    private class PingPayload
+    {
+        public long seq;
+        public long t0;
+    }
+
+    [System.Serializable]
+    private class PongPayload
+    {
+        public long seq;
+        public long t0;
+        public long t1;
+        public long t2;
+    }
+
+    // 视频流接收反馈: 最近一个统计周期的丢帧率，以及是否需要PC发送关键帧
+    [System.Serializable]
+    private class StreamFeedbackPayload
+    {
+        public float loss;
+        public bool keyframe;
+    }
     #endregion
 
     #region 单例模式
@@ -61,12 +89,20 @@ public class TCPManager : MonoBehaviour
     [Header("服务器网络设置")]
     public int serverPort = 9998; 
 
+    [Tooltip("以21字节的二进制消息发送眼动坐标(PC端解析开销更小)，关闭则使用JSON信封")]
+    public bool binaryGaze = true;
+
+    // 二进制眼动消息，大端: [类型 0x01 (1字节)] + [时间戳 微秒 (8字节)] + [x (float)] + [y (float)] + [置信度 (float)]
+    private const byte GazeBinaryType = 0x01;
+    private const int GazeBinarySize = 21;
+
     private TcpListener _listener;
     private TcpClient _client; 
     private NetworkStream _stream;
     private Thread _listenThread;
     private bool _isClientConnected = false;
-    private readonly ConcurrentQueue<string> _receivedMessages = new ConcurrentQueue<string>();
+    // 消息及其到达时间(微秒，NowUs)，在接收线程上记录
+    private readonly ConcurrentQueue<(string message, long receivedUs)> _receivedMessages = new ConcurrentQueue<(string message, long receivedUs)>();
     private bool _isAppQuitting = false;
     #endregion
 
@@ -93,9 +129,9 @@ public class TCPManager : MonoBehaviour
     void Update()
     {
         // 在主线程处理消息队列 
-        while (_receivedMessages.TryDequeue(out string message))
+        while (_receivedMessages.TryDequeue(out var received))
         {
-            ProcessMessage(message);
+            ProcessMessage(received.message, received.receivedUs);
         }
     }
 
@@ -114,12 +150,45 @@ public class TCPManager : MonoBehaviour
     #region 公共发送接口
     public void SendAcknowledgement(string payload) { Send("ack", payload); }
     public void SendCommand(string command) { Send("command", command); }
-    public void SendGazePosition(Vector2Int coords)
+    public void SendStreamFeedback(float loss, bool keyframe)
     {
+        Send("stream_feedback", JsonUtility.ToJson(new StreamFeedbackPayload { loss = loss, keyframe = keyframe }));
+    }
+    public bool IsConnected { get { return _isClientConnected; } }
+    public void SendGazePosition(Vector2Int coords, float confidence = 1f)
+    {
+        if (binaryGaze)
+        {
+            byte[] message = new byte[GazeBinarySize];
+            message[0] = GazeBinaryType;
+            WriteBigEndian(message, 1, BitConverter.GetBytes(NowUs()));
+            WriteBigEndian(message, 9, BitConverter.GetBytes((float)coords.x));
+            WriteBigEndian(message, 13, BitConverter.GetBytes((float)coords.y));
+            WriteBigEndian(message, 17, BitConverter.GetBytes(confidence));
+            SendMessageBytes("gaze", message);
+            return;
+        }
         GazePayload payload = new GazePayload { x = coords.x, y = coords.y };
         string payloadJson = JsonUtility.ToJson(payload);
         Send("gaze", payloadJson);
     }
+
+    // 本机单调时钟(微秒)，眼动时间戳和时钟同步都使用它
+    public static long NowUs()
+    {
+        long ticks = Stopwatch.GetTimestamp();
+        // 分开计算秒和余数，避免 ticks * 1000000 溢出
+        return ticks / Stopwatch.Frequency * 1000000L + ticks % Stopwatch.Frequency * 1000000L / Stopwatch.Frequency;
+    }
+
+    private static void WriteBigEndian(byte[] buffer, int offset, byte[] value)
+    {
+        if (BitConverter.IsLittleEndian)
+        {
+            Array.Reverse(value);
+        }
+        Buffer.BlockCopy(value, 0, buffer, offset, value.Length);
+    }
     #endregion
 
     #region 核心网络逻辑 
@@ -199,7 +268,7 @@ public class TCPManager : MonoBehaviour
                 if (totalBytesRead == messageLength)
                 {
                     string message = Encoding.UTF8.GetString(messageBytes);
-                    _receivedMessages.Enqueue(message);
+                    _receivedMessages.Enqueue((message, NowUs()));
                 }
             }
         }
@@ -218,13 +287,18 @@ public class TCPManager : MonoBehaviour
         }
     }
 
-    private void ProcessMessage(string message) // (无变化)
+    private void ProcessMessage(string message, long receivedUs)
     {
         try
         {
             MessageEnvelope envelope = JsonUtility.FromJson<MessageEnvelope>(message);
             switch (envelope.type)
             {
+                case "ping":
+                    PingPayload ping = JsonUtility.FromJson<PingPayload>(envelope.payload);
+                    PongPayload pong = new PongPayload { seq = ping.seq, t0 = ping.t0, t1 = receivedUs, t2 = NowUs() };
+                    Send("pong", JsonUtility.ToJson(pong));
+                    break;
                 case "start_signal":
                     Debug.Log("[TCP] 收到消息: 'start_signal'");
                     OnStartSignalReceived?.Invoke();
@@ -237,6 +311,10 @@ public class TCPManager : MonoBehaviour
                     Debug.Log("[TCP] <color=cyan>收到来自PC的选择确认信号！</color>");
                     OnSelectionConfirmed?.Invoke();
                     break;
+                case "overlay":
+                    // 每帧一条，不打印日志
+                    OnOverlayReceived?.Invoke(envelope.payload);
+                    break;
                 default:
                     Debug.LogWarning($"[TCP] 收到未定义的消息类型: '{envelope.type}'");
                     break;
@@ -250,7 +328,14 @@ public class TCPManager : MonoBehaviour
 
     private void Send(string msgType, string payload) 
     {
-        
+        MessageEnvelope envelope = new MessageEnvelope { type = msgType, payload = payload };
+        string messageJson = JsonUtility.ToJson(envelope);
+        SendMessageBytes(msgType, Encoding.UTF8.GetBytes(messageJson));
+    }
+
+    // 长度前缀和消息一次写出
+    private void SendMessageBytes(string msgType, byte[] messageBytes)
+    {
         if (!_isClientConnected || _stream == null || !_stream.CanWrite)
         {
             Debug.LogError("[TCP] 没有客户端连接，无法发送消息。");
@@ -259,16 +344,10 @@ public class TCPManager : MonoBehaviour
 
         try
         {
-            MessageEnvelope envelope = new MessageEnvelope { type = msgType, payload = payload };
-            string messageJson = JsonUtility.ToJson(envelope);
-            byte[] messageBytes = Encoding.UTF8.GetBytes(messageJson);
-            byte[] lengthPrefix = BitConverter.GetBytes(messageBytes.Length);
-            if (BitConverter.IsLittleEndian)
-            {
-                Array.Reverse(lengthPrefix);
-            }
-            _stream.Write(lengthPrefix, 0, 4);
-            _stream.Write(messageBytes, 0, messageBytes.Length);
+            byte[] frame = new byte[4 + messageBytes.Length];
+            WriteBigEndian(frame, 0, BitConverter.GetBytes(messageBytes.Length));
+            Buffer.BlockCopy(messageBytes, 0, frame, 4, messageBytes.Length);
+            _stream.Write(frame, 0, frame.Length);
         }
         catch (Exception e)
         {
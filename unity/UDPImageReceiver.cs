@@ -21,6 +21,9 @@ public class UDPImageReceiver : MonoBehaviour
     public RawImage displayImage;
 
 
+    [Tooltip("注视点区域的高清图层(可选)，作为Display Image的子物体，注视点编码时叠加在外围图像上")]
+    public RawImage foveaImage;
+
     [Tooltip("用于显示帧率的UI Text组件")]
     public TextMeshProUGUI fpsText; // 用于显示FPS的文本组件
 
@@ -41,10 +44,57 @@ public class UDPImageReceiver : MonoBehaviour
     // 预期的总包数
     private int expectedPackets = 0;
 
+    // ---- 协议v2 (帧ID + 采集时间戳 + 异或校验包) ----
+    private const int V2HeaderSize = 23;
+    private const int MaxPendingFramesV2 = 4;
+    // 帧ID回退超过这么多帧不是乱序的迟到包，而是PC端重启了发送器 (与img_receiver.py的REORDER_WINDOW一致)
+    private const int ReorderWindowV2 = 8;
+
+    private class FrameV2
+    {
+        public long captureTimestampUs;
+        public int numData;
+        public int frameSize;
+        public int fecGroup;
+        public int kind;
+        public Dictionary<int, byte[]> data = new Dictionary<int, byte[]>();
+        public Dictionary<int, byte[]> parity = new Dictionary<int, byte[]>();
+    }
+
+    // 按帧ID保存尚未拼完整的帧，可同时容纳乱序到达的多帧数据
+    private Dictionary<uint, FrameV2> pendingFramesV2 = new Dictionary<uint, FrameV2>();
+    private long lastFrameIdV2 = -1;
+
+    // 完整帧的内容类型: 0 = JPEG整帧, 1 = 变化的tile (粘贴到上一帧画面上), 2 = 注视点区域 + 缩小的外围
+    private const int KindJpeg = 0;
+    private const int KindTiles = 1;
+    private const int KindFoveated = 2;
+    private volatile int fullFrameKind = KindJpeg;
+    // 当前显示的画面，tile帧直接在它上面更新
+    private Texture2D canvasTexture;
+    private Texture2D tileTexture;
+    private Texture2D peripheryTexture;
+    private Texture2D foveaTexture;
+
+    // 最新一帧的采集时间戳(PC单调时钟, 微秒)，仅协议v2
+    [HideInInspector]
+    public long latestCaptureTimestampUs = 0;
+
     // 用于计算FPS的变量
     private int frameCount = 0;
     private float timer = 0f;
 
+    [Tooltip("通过TCP向PC发送接收统计(丢帧率、关键帧请求)，供PC端自适应画质使用")]
+    public bool sendStreamFeedback = true;
+    // 接收线程统计，每秒随stream_feedback发送后清零
+    private readonly object statsLock = new object();
+    private int framesReceived = 0;
+    private int framesLost = 0;
+    // 跳过的帧可能带有tile，或画面已不是完整关键帧: 需要PC尽快发送关键帧
+    private volatile bool keyframeNeeded = false;
+    private float lastKeyframeRequestTime = -1f;
+    private const float KeyframeRequestInterval = 0.25f;
+
     void Start()
     {
         if (displayImage == null)
@@ -93,6 +143,10 @@ public class UDPImageReceiver : MonoBehaviour
                 {
                     if (data.Length == 3)
                     {
+                        if (expectedPackets > 0)
+                        {
+                            CountFrames(0, 1); // 上一帧没有收到结束信号
+                        }
                         frameChunks.Clear();
                         expectedPackets = (data[1] << 8) | data[2];
                         isFrameReady = false;
@@ -122,13 +176,27 @@ public class UDPImageReceiver : MonoBehaviour
                             if (fullDataList.Count > 0)
                             {
                                 fullFrameData = fullDataList.ToArray(); // 可变的list 变成不可变的数组
+                                fullFrameKind = KindJpeg;
                                 isFrameReady = true;
+                                CountFrames(1, 0);
+                            }
+                            else
+                            {
+                                CountFrames(0, 1);
                             }
                         }
+                        else if (expectedPackets > 0)
+                        {
+                            CountFrames(0, 1);
+                        }
                         frameChunks.Clear();
                         expectedPackets = 0;
                     }
                 }
+                else if (packetType == 0x10 || packetType == 0x11) // --- 协议v2 数据包/校验包 ---
+                {
+                    HandlePacketV2(data);
+                }
                 else if (packetType == 0x00) // --- 数据包 ---
                 {
                     if (data.Length > 3) // 1字节类型 + 2字节序号
@@ -151,6 +219,160 @@ public class UDPImageReceiver : MonoBehaviour
         }
     }
 
+    private void HandlePacketV2(byte[] data)
+    {
+        if (data.Length <= V2HeaderSize)
+        {
+            return;
+        }
+
+        // 帧头: 类型(1) 帧ID(4) 时间戳(8) 序号(2) 数据包总数(2) 帧字节数(4) 校验组大小(1) 内容类型(1)，大端
+        uint frameId = ((uint)data[1] << 24) | ((uint)data[2] << 16) | ((uint)data[3] << 8) | data[4];
+        long timestampUs = 0;
+        for (int i = 5; i < 13; i++)
+        {
+            timestampUs = (timestampUs << 8) | data[i];
+        }
+        int index = (data[13] << 8) | data[14];
+        int numData = (data[15] << 8) | data[16];
+        int frameSize = (data[17] << 24) | (data[18] << 16) | (data[19] << 8) | data[20];
+        int fecGroup = data[21];
+
+        // 已经显示过更新的帧，丢弃迟到的包；帧ID回退超出乱序窗口说明PC端重启了发送器
+        if (frameId <= lastFrameIdV2)
+        {
+            if (lastFrameIdV2 - frameId <= ReorderWindowV2)
+            {
+                return;
+            }
+            pendingFramesV2.Clear();
+            lastFrameIdV2 = -1;
+        }
+
+        FrameV2 frame;
+        if (!pendingFramesV2.TryGetValue(frameId, out frame))
+        {
+            if (pendingFramesV2.Count >= MaxPendingFramesV2)
+            {
+                uint oldest = uint.MaxValue;
+                foreach (uint id in pendingFramesV2.Keys)
+                {
+                    oldest = Math.Min(oldest, id);
+                }
+                pendingFramesV2.Remove(oldest);
+            }
+            frame = new FrameV2 { captureTimestampUs = timestampUs, numData = numData, frameSize = frameSize, fecGroup = fecGroup, kind = data[22] };
+            pendingFramesV2[frameId] = frame;
+        }
+
+        byte[] payload = new byte[data.Length - V2HeaderSize];
+        Array.Copy(data, V2HeaderSize, payload, 0, payload.Length);
+
+        int group = -1;
+        if (data[0] == 0x10)
+        {
+            frame.data[index] = payload;
+            if (frame.fecGroup > 0)
+            {
+                group = index / frame.fecGroup;
+            }
+        }
+        else
+        {
+            frame.parity[index] = payload;
+            group = index;
+        }
+        if (group >= 0)
+        {
+            RecoverGroupV2(frame, group);
+        }
+
+        if (frame.data.Count < frame.numData)
+        {
+            return;
+        }
+
+        byte[] fullData = new byte[frame.frameSize];
+        int offset = 0;
+        for (int i = 0; i < frame.numData && offset < frame.frameSize; i++)
+        {
+            int length = Math.Min(frame.data[i].Length, frame.frameSize - offset);
+            Array.Copy(frame.data[i], 0, fullData, offset, length);
+            offset += length;
+        }
+
+        // 更早的未完成帧已经过时，一并丢弃
+        List<uint> finished = new List<uint>();
+        foreach (uint id in pendingFramesV2.Keys)
+        {
+            if (id <= frameId)
+            {
+                finished.Add(id);
+            }
+        }
+        foreach (uint id in finished)
+        {
+            pendingFramesV2.Remove(id);
+        }
+
+        // 帧ID不连续: 中间的帧丢失了
+        long skipped = lastFrameIdV2 >= 0 ? frameId - lastFrameIdV2 - 1 : 0;
+        if (skipped > 0)
+        {
+            keyframeNeeded = true;
+        }
+        CountFrames(1, (int)Math.Max(0, skipped));
+
+        lastFrameIdV2 = frameId;
+        latestCaptureTimestampUs = frame.captureTimestampUs;
+        fullFrameData = fullData;
+        fullFrameKind = frame.kind;
+        isFrameReady = true;
+    }
+
+    // 一个校验组内只丢了一个数据包时，用校验包和其余数据包异或恢复它
+    private void RecoverGroupV2(FrameV2 frame, int group)
+    {
+        byte[] parity;
+        if (!frame.parity.TryGetValue(group, out parity))
+        {
+            return;
+        }
+        int first = group * frame.fecGroup;
+        int last = Math.Min(first + frame.fecGroup, frame.numData);
+        int missing = -1;
+        for (int i = first; i < last; i++)
+        {
+            if (!frame.data.ContainsKey(i))
+            {
+                if (missing >= 0)
+                {
+                    return; // 丢了两个以上，无法恢复
+                }
+                missing = i;
+            }
+        }
+        if (missing < 0)
+        {
+            return;
+        }
+
+        byte[] recovered = (byte[])parity.Clone();
+        for (int i = first; i < last; i++)
+        {
+            if (i == missing)
+            {
+                continue;
+            }
+            byte[] chunk = frame.data[i];
+            for (int j = 0; j < recovered.Length && j < chunk.Length; j++)
+            {
+                recovered[j] ^= chunk[j];
+            }
+        }
+        frame.data[missing] = recovered;
+    }
+
     void Update()
     {
         // 只在主线程中操作Unity的UI和纹理
@@ -159,7 +381,25 @@ public class UDPImageReceiver : MonoBehaviour
         {
             // 重置标志，防止重复进行
             isFrameReady = false;
-            if (fullFrameData != null && fullFrameData.Length > 0)
+            if (fullFrameData != null && fullFrameData.Length > 0 && fullFrameKind == KindTiles)
+            {
+                if (ApplyTiles(fullFrameData))
+                {
+                    frameCount++;
+                }
+                else
+                {
+                    keyframeNeeded = true; // 没有可以粘贴tile的完整画面
+                }
+            }
+            else if (fullFrameData != null && fullFrameData.Length > 0 && fullFrameKind == KindFoveated)
+            {
+                if (ApplyFoveated(fullFrameData))
+                {
+                    frameCount++;
+                }
+            }
+            else if (fullFrameData != null && fullFrameData.Length > 0 && fullFrameKind == KindJpeg)
             {
                 // 创建一个新的纹理
                 Texture2D texture = new Texture2D(2, 2);
@@ -171,13 +411,30 @@ public class UDPImageReceiver : MonoBehaviour
                 if (texture.LoadImage(fullFrameData))
                 {
                     // 将新纹理应用到UI上
+                    if (canvasTexture != null)
+                    {
+                        Destroy(canvasTexture);
+                    }
+                    canvasTexture = texture;
                     displayImage.texture = texture;
+                    if (foveaImage != null)
+                    {
+                        foveaImage.enabled = false;
+                    }
+                    keyframeNeeded = false;
                     // 成功显示一帧，计数器加1
                     frameCount++;
                 }
             }
         }
 
+        // 关键帧请求不等每秒的统计，限制发送频率
+        if (keyframeNeeded && Time.time - lastKeyframeRequestTime > KeyframeRequestInterval)
+        {
+            lastKeyframeRequestTime = Time.time;
+            SendStreamFeedback(false);
+        }
+
         timer += Time.deltaTime;
         if (timer >= 1.0f) // 每隔1秒更新一次FPS显示
         {
@@ -185,12 +442,160 @@ public class UDPImageReceiver : MonoBehaviour
             {
                 fpsText.text = "FPS: " + Mathf.RoundToInt(frameCount / timer);
             }
+            SendStreamFeedback(true);
             // 重置计时器和计数器
             timer = 0f;
             frameCount = 0;
         }
     }
 
+    private void CountFrames(int received, int lost)
+    {
+        lock (statsLock)
+        {
+            framesReceived += received;
+            framesLost += lost;
+        }
+    }
+
+    // 发送 stream_feedback (格式见 mian.py 的 handle_stream_feedback)；withLoss为false时只请求关键帧
+    private void SendStreamFeedback(bool withLoss)
+    {
+        if (!sendStreamFeedback || !TCPManager.Instance.IsConnected)
+        {
+            return;
+        }
+        float loss = -1f;
+        if (withLoss)
+        {
+            lock (statsLock)
+            {
+                int total = framesReceived + framesLost;
+                loss = total > 0 ? (float)framesLost / total : 0f;
+                framesReceived = 0;
+                framesLost = 0;
+            }
+        }
+        TCPManager.Instance.SendStreamFeedback(loss, keyframeNeeded);
+    }
+
+    // 把变化的tile解码后贴到当前画面上，格式见 ar_system/tile_codec.py
+    private bool ApplyTiles(byte[] payload)
+    {
+        if (canvasTexture == null || payload.Length < 8)
+        {
+            return false; // 还没有收到关键帧
+        }
+        int width = (payload[0] << 8) | payload[1];
+        int height = (payload[2] << 8) | payload[3];
+        int tileSize = (payload[4] << 8) | payload[5];
+        int numTiles = (payload[6] << 8) | payload[7];
+        if (width != canvasTexture.width || height != canvasTexture.height || tileSize == 0)
+        {
+            return false; // 分辨率变了，等待下一个关键帧
+        }
+        if (tileTexture == null)
+        {
+            tileTexture = new Texture2D(2, 2);
+        }
+
+        int cols = (width + tileSize - 1) / tileSize;
+        int offset = 8;
+        for (int t = 0; t < numTiles && offset + 6 <= payload.Length; t++)
+        {
+            int index = (payload[offset] << 8) | payload[offset + 1];
+            int length = (payload[offset + 2] << 24) | (payload[offset + 3] << 16) | (payload[offset + 4] << 8) | payload[offset + 5];
+            offset += 6;
+            if (length <= 0 || offset + length > payload.Length)
+            {
+                break;
+            }
+            byte[] jpeg = new byte[length];
+            Array.Copy(payload, offset, jpeg, 0, length);
+            offset += length;
+            if (!tileTexture.LoadImage(jpeg))
+            {
+                continue;
+            }
+
+            int x = (index % cols) * tileSize;
+            int y = (index / cols) * tileSize;
+            int w = Math.Min(tileTexture.width, width - x);
+            int h = Math.Min(tileTexture.height, height - y);
+            if (w <= 0 || h <= 0)
+            {
+                continue;
+            }
+            // 图像坐标原点在左上角，Unity纹理原点在左下角
+            canvasTexture.SetPixels(x, height - y - h, w, h, tileTexture.GetPixels(0, tileTexture.height - h, w, h));
+        }
+        canvasTexture.Apply();
+        return true;
+    }
+
+    // 外围图像拉伸到整个画面，注视点区域按原分辨率叠加在对应位置，格式见 ar_system/foveated_codec.py
+    private bool ApplyFoveated(byte[] payload)
+    {
+        if (payload.Length < 16)
+        {
+            return false;
+        }
+        int width = (payload[0] << 8) | payload[1];
+        int height = (payload[2] << 8) | payload[3];
+        int roiX = (payload[4] << 8) | payload[5];
+        int roiY = (payload[6] << 8) | payload[7];
+        int roiW = (payload[8] << 8) | payload[9];
+        int roiH = (payload[10] << 8) | payload[11];
+        int peripheryLength = (payload[12] << 24) | (payload[13] << 16) | (payload[14] << 8) | payload[15];
+        if (width == 0 || height == 0 || peripheryLength <= 0 || 16 + peripheryLength >= payload.Length)
+        {
+            return false;
+        }
+
+        byte[] peripheryJpeg = new byte[peripheryLength];
+        Array.Copy(payload, 16, peripheryJpeg, 0, peripheryLength);
+        if (peripheryTexture == null)
+        {
+            peripheryTexture = new Texture2D(2, 2);
+        }
+        if (!peripheryTexture.LoadImage(peripheryJpeg))
+        {
+            return false;
+        }
+        displayImage.texture = peripheryTexture;
+        // 画面不再是完整分辨率的关键帧，之后的tile帧要等下一个关键帧
+        if (canvasTexture != null)
+        {
+            Destroy(canvasTexture);
+            canvasTexture = null;
+        }
+
+        if (foveaImage == null)
+        {
+            return true;
+        }
+        byte[] roiJpeg = new byte[payload.Length - 16 - peripheryLength];
+        Array.Copy(payload, 16 + peripheryLength, roiJpeg, 0, roiJpeg.Length);
+        if (foveaTexture == null)
+        {
+            foveaTexture = new Texture2D(2, 2);
+        }
+        if (!foveaTexture.LoadImage(roiJpeg))
+        {
+            foveaImage.enabled = false;
+            return true;
+        }
+        // 图像坐标原点在左上角，UI锚点原点在左下角
+        RectTransform rect = foveaImage.rectTransform;
+        rect.anchorMin = new Vector2((float)roiX / width, 1f - (float)(roiY + roiH) / height);
+        rect.anchorMax = new Vector2((float)(roiX + roiW) / width, 1f - (float)roiY / height);
+        rect.offsetMin = Vector2.zero;
+        rect.offsetMax = Vector2.zero;
+        foveaImage.texture = foveaTexture;
+        foveaImage.enabled = true;
+        return true;
+    }
+
     void OnApplicationQuit()
     {
         // 关闭线程和客户端